@@ -1,8 +1,25 @@
 #!/usr/bin/env python3
+import functools
+import json
+import os
 import sys
+from dataclasses import asdict
 from pathlib import Path
 
-from raq import parse_definitions, parse_query, evaluate, print_relation
+from raq import parse_query, evaluate, evaluate_batch, evaluate_pipelined, optimize, print_relation
+from raq.cache import ResultCache
+from raq.defs_parser import (
+    iter_lines, load_definitions, parse_definition_lines, reload_definitions, scan_blocks, session_dictionaries,
+)
+from raq.executor import BatchStats
+from raq.explain import explain, explain_analyze, explain_json, format_explain
+from raq.external import FileRows
+from raq.indexes import apply_indexes, describe_index, parse_index_spec
+from raq.parallel import evaluate_parallel, run_queries
+from raq.printer import format_plan, format_relation
+from raq.schema import output_schema
+from raq.snapshot import SNAPSHOT_SUFFIX, load_snapshot, save_snapshot, snapshot_source, source_digest
+from raq.stats import Estimator, analyze
 
 
 def read_input_text(path: str | None) -> str:
@@ -10,23 +27,157 @@ def read_input_text(path: str | None) -> str:
         return Path(path).read_text(encoding="utf-8")
     return sys.stdin.read()
 
+def pop_flag(argv: list[str], *names: str) -> bool:
+    """Remove every occurrence of the given flags from argv; True if any was present."""
+    found = False
+    for name in names:
+        while name in argv[1:]:
+            argv.remove(name)
+            found = True
+    return found
+
+
+def pop_option(argv: list[str], name: str) -> str | None:
+    """Remove ``name VALUE`` from argv and return VALUE; None if the option is absent."""
+    if name not in argv[1:-1]:
+        return None
+    i = argv.index(name, 1)
+    value = argv[i + 1]
+    del argv[i:i + 2]
+    return value
+
+
+def load_relations(lines, layout: str, with_stats: bool, base_dir: str | None = None):
+    relations = parse_definition_lines(lines, layout, base_dir)
+    if with_stats:
+        # Collect the optimizer's statistics up front rather than on the first query.
+        analyze_loaded(relations)
+    return relations
+
+
+def load_relations_file(path: str, layout: str, with_stats: bool, snapshot: bool = False):
+    relations, digest = read_snapshot(path, layout, snapshot)
+    if relations is None:
+        relations = load_relations(iter_lines(path), layout, False, os.path.dirname(path))
+        write_snapshot(path, relations, digest)
+    if with_stats:
+        analyze_loaded(relations)
+    return relations
+
+
+def read_snapshot(path: str, layout: str, snapshot: bool):
+    """Relations from ``path``'s snapshot if it was saved from the file as it is now.
+
+    Returns (relations, None) on a hit. Otherwise returns (None, digest), with
+    the digest to save a new snapshot under when one is wanted: when it exists
+    but is stale, or ``snapshot`` is set. Without either, the file is not hashed.
+    """
+    snap = path + SNAPSHOT_SUFFIX
+    if not snapshot and not os.path.exists(snap):
+        return None, None
+    digest = source_digest(path)
+    if snapshot_source(snap) == digest:
+        try:
+            return load_snapshot(snap, layout), None
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Ignoring snapshot '{snap}': {e}", file=sys.stderr)
+    return None, digest
+
+
+def write_snapshot(path: str, relations, digest: str | None) -> None:
+    if digest is None:
+        return
+    try:
+        save_snapshot(relations, path + SNAPSHOT_SUFFIX, digest)
+    except OSError as e:
+        print(f"Could not save snapshot '{path + SNAPSHOT_SUFFIX}': {e}", file=sys.stderr)
+
+
+def analyze_loaded(relations) -> None:
+    """``analyze`` the relations held in memory; file-backed ones are read when a query first needs them."""
+    analyze({name: rel for name, rel in relations.items() if not isinstance(rel.rows, FileRows)})
+
+
+def make_runner(pipeline: bool, optimized: bool, workers: int = 0):
+    if workers:
+        run = functools.partial(evaluate_parallel, workers=workers)
+    else:
+        run = evaluate_pipelined if pipeline else evaluate
+    if not optimized:
+        return run
+
+    def run_optimized(ast, relations):
+        result = run(optimize(ast, relations), relations)
+        # Rewrites rename intermediate results; report the query's own name.
+        result.name = output_schema(ast, relations)[0]
+        return result
+
+    return run_optimized
+
+
+def print_plans(ast, relations) -> None:
+    estimator = Estimator(relations)
+
+    def annotate(node) -> str:
+        try:
+            return f"  (est. {estimator.rows(node):,.0f} rows)"
+        except (KeyError, ValueError):
+            return ""
+
+    print("Plan:")
+    print(format_plan(ast, annotate))
+    print("Optimized plan:")
+    print(format_plan(optimize(ast, relations), annotate))
+
 
 def main(argv: list[str]) -> int:
+    argv = list(argv)
+    layout = "columnar" if pop_flag(argv, "--columnar") else "rows"
+    if pop_flag(argv, "--dictionary"):
+        layout = "dictionary"
+    show_plan = pop_flag(argv, "--plan")
+    optimized = pop_flag(argv, "--optimize", "-O")
+    pipeline = pop_flag(argv, "--pipeline")
+    snapshot = pop_flag(argv, "--snapshot")
+    workers = pop_option(argv, "--workers")
+    batch = pop_flag(argv, "--batch")
+    jobs = pop_option(argv, "--jobs")
+    explain_json_lines = pop_flag(argv, "--explain-json")
+    explain_plans = pop_flag(argv, "--explain") or explain_json_lines
+    if workers is not None and (not workers.isdigit() or pipeline):
+        print("--workers takes a process count and cannot be combined with --pipeline")
+        return 2
+    if batch and (pipeline or workers is not None):
+        print("--batch cannot be combined with --pipeline or --workers")
+        return 2
+    if jobs is not None and (not jobs.isdigit() or batch or workers is not None):
+        print("--jobs takes a process count and cannot be combined with --batch or --workers")
+        return 2
+    if explain_plans and (pipeline or workers is not None or batch or jobs is not None):
+        print("--explain cannot be combined with --pipeline, --workers, --batch or --jobs")
+        return 2
+    run = make_runner(pipeline, optimized, int(workers or 0))
+
     if len(argv) >= 2 and argv[1] in ("--repl", "-i"):
         if len(argv) < 3:
-            print("Usage: python3 main.py --repl <defs-file>")
+            print("Usage: python3 main.py [--columnar | --dictionary] [--pipeline | --workers N] [--optimize] [--snapshot] "
+                  "--repl <defs-file>")
             return 2
         defs_path = argv[2]
-        return repl(defs_path)
+        return repl(defs_path, layout, run, optimized, snapshot)
 
     path = argv[1] if len(argv) > 1 else None
-    text = read_input_text(path)
-
-    relations = parse_definitions(text)
+    if path:
+        # Stream the file: once for the definitions, once more for the queries.
+        relations = load_relations_file(path, layout, optimized or show_plan, snapshot)
+        lines = iter_lines(path)
+    else:
+        lines = sys.stdin.read().splitlines()
+        relations = load_relations(lines, layout, optimized or show_plan)
 
     # Gather queries: lines starting with "Query:"; take remainder as single-line expr
     queries: list[str] = []
-    for line in text.splitlines():
+    for line in lines:
         if line.strip().startswith("Query:"):
             queries.append(line.split(":", 1)[1].strip())
 
@@ -34,17 +185,113 @@ def main(argv: list[str]) -> int:
         print("No queries found. Add lines like: 'Query: σ Age > 30 (Employees)'")
         return 1
 
+    if batch:
+        return run_batch(queries, relations, optimized, show_plan)
+    if jobs is not None:
+        return run_jobs(queries, relations, run, int(jobs), show_plan)
+    if explain_plans:
+        return run_explain(queries, relations, optimized, show_plan, explain_json_lines)
+
+    for idx, q in enumerate(queries, 1):
+        print(f"\n=== Query {idx} ===\n{q}")
+        ast = parse_query(q)
+        if show_plan:
+            print_plans(ast, relations)
+        result = run(ast, relations)
+        print()
+        print_relation(result)
+
+    return 0
+
+
+def run_jobs(queries: list[str], relations, run, jobs: int, show_plan: bool) -> int:
+    """Run the queries on ``jobs`` forked processes, printing results in query order."""
+    outputs = run_queries(queries, relations, jobs, run, format_relation)
     for idx, q in enumerate(queries, 1):
         print(f"\n=== Query {idx} ===\n{q}")
+        if show_plan:
+            print_plans(parse_query(q), relations)
+        text = next(outputs)
+        print()
+        print(text)
+    return 0
+
+
+def run_explain(queries: list[str], relations, optimized: bool, show_plan: bool, as_json: bool) -> int:
+    """EXPLAIN ANALYZE every query: print its operator tree with actual figures, then its result.
+
+    With ``as_json`` only the trees are printed, as one JSON object per line.
+    """
+    for idx, q in enumerate(queries, 1):
         ast = parse_query(q)
-        result = evaluate(ast, relations)
+        plan = optimize(ast, relations) if optimized else ast
+        result, tree = explain_analyze(plan, relations)
+        if as_json:
+            print(json.dumps({"query": q, "explain": asdict(tree)}, ensure_ascii=False))
+            continue
+        print(f"\n=== Query {idx} ===\n{q}")
+        if show_plan:
+            print_plans(ast, relations)
+        print("Explain analyze:")
+        print(format_explain(tree))
+        if optimized:
+            result.name = output_schema(ast, relations)[0]
         print()
         print_relation(result)
+    return 0
+
+
+def explain_command(text: str, relations, optimized: bool) -> None:
+    """The REPL's ``explain [analyze] [json] <expr>``: print the query's operator tree."""
+    analyze = as_json = False
+    for option in ("analyze", "json"):
+        first, *rest = text.split(None, 1)
+        if first.lower() == option and rest:
+            text = rest[0]
+            analyze = analyze or option == "analyze"
+            as_json = as_json or option == "json"
+    ast = parse_query(text)
+    plan = optimize(ast, relations) if optimized else ast
+    tree = explain_analyze(plan, relations)[1] if analyze else explain(plan, relations)
+    print(explain_json(tree, indent=2) if as_json else format_explain(tree))
 
+
+def run_batch(queries: list[str], relations, optimized: bool, show_plan: bool) -> int:
+    """Parse every query first, then evaluate them with shared subplans computed once.
+
+    Results are printed in query order as they come; the batch time and the
+    time saved by sharing go to stderr.
+    """
+    asts = [parse_query(q) for q in queries]
+    plans = [optimize(ast, relations) for ast in asts] if optimized else asts
+    stats = BatchStats()
+    results = evaluate_batch(plans, relations, stats=stats)
+    for idx, (q, ast, result) in enumerate(zip(queries, asts, results), 1):
+        print(f"\n=== Query {idx} ===\n{q}")
+        if show_plan:
+            print_plans(ast, relations)
+        if optimized:
+            result.name = output_schema(ast, relations)[0]
+        print()
+        print_relation(result)
+    print(f"\nBatch: {stats.queries} queries in {stats.seconds:.3f} s; {stats.shared} shared subplans "
+          f"reused {stats.reused} times, saving about {stats.saved:.3f} s", file=sys.stderr)
     return 0
 
 
-def repl(defs_path: str) -> int:
+def print_indexes(relations, skip=()) -> None:
+    """Print build time and memory of every index not listed (by id) in ``skip``."""
+    for name in sorted(relations):
+        for index in relations[name].indexes.values():
+            if id(index) not in skip:
+                print(describe_index(name, index))
+
+
+def index_ids(relations) -> set:
+    return {id(i) for rel in relations.values() for i in rel.indexes.values()}
+
+
+def repl(defs_path: str, layout: str = "rows", run=evaluate, with_stats: bool = False, snapshot: bool = False) -> int:
     """Load relations once, then accept queries line-by-line.
 
     Commands:
@@ -52,11 +299,24 @@ def repl(defs_path: str) -> int:
       :rels            List loaded relation names
       :show <Rel>      Print a relation by name
       :reload          Reload definitions from the defs file
+      :plan <expr>     Print the plan before and after optimization
+      :cache stats     Show result cache hits, misses, evictions and memory held
+      :cache clear     Empty the result cache
+      explain [analyze] [json] <expr>
+                       Print the operator tree with each operator's algorithm
+                       and estimated rows; analyze runs the query and adds
+                       actual rows, duplicates removed, time and peak memory
+      :index [hash|sorted] <Rel>(<Attr>)
+                       Build an index (hash by default); :index lists them
       :quit / :exit    Exit the REPL
 
     Query input:
       - Enter an expression directly (σ/π/⋈/set ops or functional forms), or
       - Use the legacy prefix: `Query: <expr>`
+
+    Results are cached per query and reused until a relation the query reads
+    changes. :reload re-parses only the relation blocks whose text changed
+    and only invalidates cached results that read them.
     """
     try:
         text = read_input_text(defs_path)
@@ -64,8 +324,25 @@ def repl(defs_path: str) -> int:
         print(f"Failed to read definitions file '{defs_path}': {e}")
         return 2
 
-    relations = parse_definitions(text)
+    base_dir = os.path.dirname(defs_path)
+    # One dictionary per attribute name for the whole session (dictionary
+    # layout), so relations parsed block by block, now or on :reload, can
+    # compare codes with each other.
+    dictionaries = session_dictionaries({}) if layout == "dictionary" else None
+    relations, digest = read_snapshot(defs_path, layout, snapshot)
+    if relations is None:
+        relations, blocks = load_definitions(text, layout, base_dir, dictionaries)
+        write_snapshot(defs_path, relations, digest)
+    else:
+        blocks = scan_blocks(text, base_dir)
+        if dictionaries is not None:
+            dictionaries = session_dictionaries(relations)
+    if with_stats:
+        analyze_loaded(relations)
+    cache = ResultCache()
+    session_indexes = []
     print(f"Loaded {len(relations)} relations from {defs_path}. Type :help for help.")
+    print_indexes(relations)
     while True:
         try:
             line = input("raq> ").strip()
@@ -85,7 +362,8 @@ def repl(defs_path: str) -> int:
                 return 0
             if cmd == "help":
                 print(
-                    ":help, :rels, :show <Rel>, :reload, :quit"
+                    ":help, :rels, :show <Rel>, :reload, :plan <expr>, :cache stats|clear, "
+                    ":index [hash|sorted] <Rel>(<Attr>), explain [analyze] [json] <expr>, :quit"
                 )
                 continue
             if cmd == "rels":
@@ -105,20 +383,77 @@ def repl(defs_path: str) -> int:
             if cmd == "reload":
                 try:
                     text = read_input_text(defs_path)
-                    relations = parse_definitions(text)
+                    # Only blocks whose text changed are re-parsed; other
+                    # relations (and their statistics) are kept as they are.
+                    before = index_ids(relations)
+                    relations, blocks, changed = reload_definitions(
+                        text, blocks, relations, layout, base_dir, dictionaries
+                    )
+                    apply_indexes(relations, session_indexes)
+                    if with_stats:
+                        analyze_loaded(relations)
+                    dropped = cache.invalidate(changed)
                     print(f"Reloaded {len(relations)} relations from {defs_path}.")
+                    if changed:
+                        print(f"Changed: {', '.join(changed)} ({dropped} cached results dropped)")
+                    print_indexes(relations, before)
                 except Exception as e:
                     print(f"Reload failed: {e}")
                 continue
+            if cmd == "plan":
+                if not args:
+                    print("Usage: :plan <expr>")
+                    continue
+                try:
+                    print_plans(parse_query(line[1:].strip().split(None, 1)[1]), relations)
+                except Exception as e:
+                    print(f"Error: {e}")
+                continue
+            if cmd == "index":
+                if not args:
+                    print_indexes(relations)
+                    continue
+                try:
+                    decl = parse_index_spec(line[1:].strip().split(None, 1)[1])
+                    built = apply_indexes(relations, [decl])
+                except Exception as e:
+                    print(f"Error: {e}")
+                    continue
+                if decl not in session_indexes:
+                    session_indexes.append(decl)
+                for name, index in built:
+                    print(describe_index(name, index))
+                if not built:
+                    print(f"{decl.kind} index {decl.relation}({decl.attr}) already exists")
+                continue
+            if cmd == "cache":
+                sub = args[0].lower() if args else ""
+                if sub == "stats":
+                    print(cache.describe())
+                elif sub == "clear":
+                    cache.clear()
+                    print("Cache cleared.")
+                else:
+                    print("Usage: :cache stats | :cache clear")
+                continue
             print(f"Unknown command: :{cmd}. Type :help")
             continue
 
+        words = line.split(None, 1)
+        if len(words) == 2 and words[0].lower() == "explain":
+            try:
+                explain_command(words[1], relations, with_stats)
+            except Exception as e:
+                print(f"Error: {e}")
+            continue
+
         expr = line
         if line.lower().startswith("query:"):
             expr = line.split(":", 1)[1].strip()
         try:
             ast = parse_query(expr)
-            result = evaluate(ast, relations)
+            digests = {b.name: b.digest for b in blocks}
+            result = cache.get_or_compute(ast, digests, lambda: run(ast, relations))
             print_relation(result)
         except Exception as e:
             print(f"Error: {e}")
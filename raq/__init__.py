@@ -1,12 +1,22 @@
-from .defs_parser import parse_definitions
+from .defs_parser import parse_definitions, parse_definitions_file
 from .ra_parser import parse_query
-from .executor import evaluate
+from .executor import evaluate, evaluate_batch
+from .optimizer import optimize
+from .pipeline import compile_pipeline, evaluate_pipelined
+from .prepared import PreparedQuery, prepare
 from .printer import print_relation
 
 __all__ = [
     "parse_definitions",
+    "parse_definitions_file",
     "parse_query",
     "evaluate",
+    "evaluate_batch",
+    "optimize",
+    "compile_pipeline",
+    "evaluate_pipelined",
+    "prepare",
+    "PreparedQuery",
     "print_relation",
 ]
 
@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import sys
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+from .datatypes import Relation
+from .ra_ast import RAType, relation_names, structural_key
+
+_SAMPLE_ROWS = 64
+
+
+def estimate_bytes(rel: Relation) -> int:
+    """Rough memory held by a relation's rows, scaled up from a sample."""
+    rows = rel.rows
+    n = len(rows)
+    if not n:
+        return sys.getsizeof(rows)
+    step = max(n // _SAMPLE_ROWS, 1)
+    sample = [rows[i] for i in range(0, n, step)]
+    per_row = sum(sys.getsizeof(r) + sum(sys.getsizeof(v) for v in r.values()) for r in sample) / len(sample)
+    return sys.getsizeof(rows) + int(per_row * n)
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    invalidations: int = 0
+
+
+class ResultCache:
+    """LRU cache of query results, bounded by entry count and estimated bytes.
+
+    Entries are keyed on the query's structural key plus the fingerprints of
+    the relations it reads, so a result is only reused while those relations
+    are unchanged. Cached relations are returned as-is and must be treated as
+    read-only, like any other relation.
+    """
+
+    def __init__(self, max_entries: int = 128, max_bytes: int = 64 << 20):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries: "OrderedDict[Any, Tuple[Relation, int, Tuple[str, ...]]]" = OrderedDict()
+        self.bytes = 0
+        self.stats = CacheStats()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def key(self, node: RAType, prints: Dict[str, str]) -> Optional[Any]:
+        """Cache key for ``node``; None if it reads a relation without a fingerprint."""
+        names = relation_names(node)
+        if any(n not in prints for n in names):
+            return None
+        return structural_key(node), tuple((n, prints[n]) for n in names)
+
+    def get_or_compute(self, node: RAType, prints: Dict[str, str], compute: Callable[[], Relation]) -> Relation:
+        key = self.key(node, prints)
+        if key is not None and key in self.entries:
+            self.entries.move_to_end(key)
+            self.stats.hits += 1
+            return self.entries[key][0]
+        self.stats.misses += 1
+        result = compute()
+        if key is not None:
+            self.put(key, result)
+        return result
+
+    def put(self, key: Any, result: Relation) -> None:
+        size = estimate_bytes(result)
+        if size > self.max_bytes or self.max_entries <= 0:
+            return
+        if key in self.entries:
+            self._drop(key)
+        self.entries[key] = (result, size, tuple(n for n, _ in key[1]))
+        self.bytes += size
+        while len(self.entries) > self.max_entries or self.bytes > self.max_bytes:
+            self._drop(next(iter(self.entries)))
+            self.stats.evictions += 1
+
+    def invalidate(self, changed: Iterable[str]) -> int:
+        """Drop every entry that reads one of the ``changed`` relations."""
+        changed = set(changed)
+        stale = [k for k, (_, _, names) in self.entries.items() if changed.intersection(names)]
+        for k in stale:
+            self._drop(k)
+        self.stats.invalidations += len(stale)
+        return len(stale)
+
+    def clear(self) -> None:
+        self.entries.clear()
+        self.bytes = 0
+
+    def _drop(self, key: Any) -> None:
+        _, size, _ = self.entries.pop(key)
+        self.bytes -= size
+
+    def describe(self) -> str:
+        s = self.stats
+        return (
+            f"entries: {len(self.entries)}/{self.max_entries}, "
+            f"memory: {_format_bytes(self.bytes)}/{_format_bytes(self.max_bytes)}, "
+            f"hits: {s.hits}, misses: {s.misses}, evictions: {s.evictions}, invalidations: {s.invalidations}"
+        )
+
+
+def _format_bytes(n: int) -> str:
+    if n < 1024:
+        return f"{n} B"
+    if n < 1 << 20:
+        return f"{n / 1024:.1f} KiB"
+    return f"{n / (1 << 20):.1f} MiB"
@@ -0,0 +1,254 @@
+from __future__ import annotations
+
+from array import array
+from itertools import islice, repeat
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Union
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; typed columns fall back to array.array
+    np = None
+
+
+Column = Union[array, List[Any], "np.ndarray", "DictColumn"]
+
+_INT64_MIN = -(1 << 63)
+_INT64_MAX = (1 << 63) - 1
+_CHUNK = 65536
+
+
+def numpy_available() -> bool:
+    return np is not None
+
+
+def build_column(
+    values: Sequence[Any], use_numpy: Optional[bool] = None, dictionary: Optional["StringDictionary"] = None
+) -> Column:
+    """Pack a column of Python values into the most compact exact representation.
+
+    All-int columns (bools excluded, int64 range) and all-float columns become
+    NumPy arrays when NumPy is available and ``use_numpy`` is not False, and
+    ``array('q')``/``array('d')`` otherwise. With a ``dictionary``, columns of
+    strings (and nulls) become a ``DictColumn`` of codes into it. Anything
+    else (mixed int/float, booleans, ...) stays an object list so values
+    round-trip unchanged.
+    """
+    if use_numpy is None:
+        use_numpy = np is not None
+    elif use_numpy and np is None:
+        raise RuntimeError("NumPy is not installed")
+    kind = _column_kind(values)
+    if kind == 'q':
+        return np.array(values, dtype=np.int64) if use_numpy else array('q', values)
+    if kind == 'd':
+        return np.array(values, dtype=np.float64) if use_numpy else array('d', values)
+    if dictionary is not None and values and all(type(v) is str or v is None for v in values):
+        return DictColumn(dictionary.encode(values), dictionary)
+    return list(values)
+
+
+def _column_kind(values: Sequence[Any]) -> Optional[str]:
+    if not values:
+        return None
+    t = type(values[0])
+    if t is int:
+        if all(type(v) is int and _INT64_MIN <= v <= _INT64_MAX for v in values):
+            return 'q'
+        return None
+    if t is float:
+        if all(type(v) is float for v in values):
+            return 'd'
+    return None
+
+
+def is_numpy_column(col: Column) -> bool:
+    return np is not None and isinstance(col, np.ndarray)
+
+
+class StringDictionary:
+    """Distinct strings (and None) numbered in order of first appearance.
+
+    Each value is kept once, so decoding hands out the same object for
+    every occurrence. Only strings and None are encoded: for them equal
+    codes mean equal values, so codes can be compared, hashed and
+    deduplicated in place of the values.
+    """
+
+    __slots__ = ("codes", "values")
+
+    def __init__(self) -> None:
+        self.codes: Dict[Optional[str], int] = {}
+        self.values: List[Optional[str]] = []
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def encode(self, values: Iterable[Optional[str]]) -> array:
+        codes = self.codes
+        known = len(codes)
+        # A new value gets the dictionary's size as its code: map() pulls
+        # len(codes) before each setdefault call.
+        out = array('i', map(codes.setdefault, values, map(len, repeat(codes))))
+        if len(codes) > known:
+            self.values.extend(islice(codes, known, None))
+        return out
+
+    def code(self, value: Any) -> Optional[int]:
+        """The code of ``value``, or None when no row holds it."""
+        if type(value) is not str and value is not None:
+            return None
+        return self.codes.get(value)
+
+
+class DictColumn(Sequence[Any]):
+    """A dictionary-encoded column: an ``array('i')`` of codes into a ``StringDictionary``.
+
+    Reads as a sequence of the decoded values. Columns taken from one
+    another share their dictionary, as do the columns of one attribute
+    loaded together (see ``defs_parser``).
+    """
+
+    __slots__ = ("codes", "dictionary")
+
+    def __init__(self, codes: array, dictionary: StringDictionary):
+        self.codes = codes
+        self.dictionary = dictionary
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def __getitem__(self, i):  # type: ignore[override]
+        if isinstance(i, slice):
+            return [self.dictionary.values[c] for c in self.codes[i]]
+        return self.dictionary.values[self.codes[i]]
+
+    def __iter__(self) -> Iterator[Any]:
+        return map(self.dictionary.values.__getitem__, self.codes)
+
+    def take(self, indices: Union[Iterable[int], "np.ndarray"]) -> "DictColumn":
+        if is_numpy_column(indices):
+            codes = array('i')
+            codes.frombytes(np.frombuffer(self.codes, dtype=np.intc)[indices].tobytes())
+            return DictColumn(codes, self.dictionary)
+        return DictColumn(array('i', map(self.codes.__getitem__, indices)), self.dictionary)
+
+
+def shares_dictionary(a: Column, b: Column) -> bool:
+    """Whether codes of ``a`` and ``b`` can be compared in place of their values."""
+    return isinstance(a, DictColumn) and isinstance(b, DictColumn) and a.dictionary is b.dictionary
+
+
+def concat_columns(a: Column, b: Column) -> Column:
+    """``a`` followed by ``b``, keeping the encoding or array type they share."""
+    if shares_dictionary(a, b):
+        return DictColumn(a.codes + b.codes, a.dictionary)
+    if is_numpy_column(a) and is_numpy_column(b) and a.dtype == b.dtype:
+        return np.concatenate([a, b])
+    if isinstance(a, array) and isinstance(b, array) and a.typecode == b.typecode:
+        return a + b
+    return [*iter_column(a), *iter_column(b)]
+
+
+def key_column(col: Column) -> Iterator[Any]:
+    """Values to hash or compare rows by: codes for dictionary columns, else the values."""
+    if isinstance(col, DictColumn):
+        return iter(col.codes)
+    return iter_column(col)
+
+
+def column_getter(col: Column) -> Callable[[int], Any]:
+    """Return ``i -> value`` yielding plain Python scalars for any column type."""
+    if is_numpy_column(col):
+        return lambda i: col[i].item()
+    return col.__getitem__
+
+
+def iter_column(col: Column) -> Iterator[Any]:
+    """Iterate a column as Python scalars without materialising it as a list."""
+    if is_numpy_column(col):
+        for start in range(0, len(col), _CHUNK):
+            yield from col[start:start + _CHUNK].tolist()
+        return
+    yield from col
+
+
+def take_column(col: Column, indices: Union[List[int], "np.ndarray"]) -> Column:
+    if is_numpy_column(col):
+        return col[np.asarray(indices, dtype=np.intp)]
+    if isinstance(col, DictColumn):
+        return col.take(indices)
+    if is_numpy_column(indices):
+        indices = indices.tolist()
+    if isinstance(col, array):
+        return array(col.typecode, (col[i] for i in indices))
+    return [col[i] for i in indices]
+
+
+class ColumnarRows(Sequence[Dict[str, Any]]):
+    """Read-only row view over column storage.
+
+    Indexing and iteration produce fresh ``{attr: value}`` dicts, so code
+    written against ``Relation.rows`` keeps working while the relation itself
+    only holds one array or list per attribute.
+    """
+
+    __slots__ = ("header", "columns", "_length", "_getters")
+
+    def __init__(self, header: List[str], columns: Dict[str, Column]):
+        self.header = list(header)
+        self.columns = columns
+        lengths = {len(columns[a]) for a in self.header}
+        if len(lengths) > 1:
+            raise ValueError(f"Column lengths differ: {sorted(lengths)}")
+        self._length = lengths.pop() if lengths else 0
+        self._getters = [(a, column_getter(columns[a])) for a in self.header]
+
+    def __reduce__(self):
+        # The getters are closures; pickle (e.g. to send results between
+        # processes) the columns and rebuild them.
+        return ColumnarRows, (self.header, self.columns)
+
+    @classmethod
+    def from_tuples(
+        cls,
+        header: List[str],
+        tuples: Iterable[Sequence[Any]],
+        use_numpy: Optional[bool] = None,
+        dictionaries: Optional[Dict[str, StringDictionary]] = None,
+    ) -> "ColumnarRows":
+        """Build columns from row tuples; string columns of attributes in
+        ``dictionaries`` are encoded with that attribute's dictionary."""
+        cols: List[Sequence[Any]] = list(zip(*tuples)) or [() for _ in header]
+        return cls(header, {
+            a: build_column(c, use_numpy, None if dictionaries is None else dictionaries[a])
+            for a, c in zip(header, cols)
+        })
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, i):  # type: ignore[override]
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(self._length))]
+        if i < 0:
+            i += self._length
+        if not 0 <= i < self._length:
+            raise IndexError("row index out of range")
+        return {a: get(i) for a, get in self._getters}
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        header = self.header
+        for vals in zip(*(iter_column(self.columns[a]) for a in header)):
+            yield dict(zip(header, vals))
+
+    def tuples(self, header: Optional[List[str]] = None) -> Iterator[tuple]:
+        return zip(*(iter_column(self.columns[a]) for a in (header or self.header)))
+
+    def key_tuples(self, header: Optional[List[str]] = None) -> Iterator[tuple]:
+        """Like ``tuples``, with codes for dictionary columns; equal exactly when the rows are."""
+        return zip(*(key_column(self.columns[a]) for a in (header or self.header)))
+
+    def take(self, indices: Union[List[int], "np.ndarray"]) -> "ColumnarRows":
+        if is_numpy_column(indices) and not all(is_numpy_column(self.columns[a]) for a in self.header):
+            indices = indices.tolist()
+        return ColumnarRows(self.header, {a: take_column(self.columns[a], indices) for a in self.header})
@@ -1,30 +1,96 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import Any, Dict, List, Tuple, Optional
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Dict, List, Tuple, Optional
+
+from .columnar import Column, ColumnarRows, StringDictionary
+
+if TYPE_CHECKING:
+    from .stats import TableStats
 
 
 @dataclass
 class Relation:
+    """A named relation.
+
+    Relations are values: operators share ``rows`` (and the row dicts in it)
+    with their inputs and with the base relations instead of copying them, so
+    neither the list nor its rows may be mutated in place. Build new rows and
+    rebind ``rows`` instead, as ``dedup`` does.
+    """
+
     name: str
     header: List[str]
     rows: List[Dict[str, Any]]
+    distinct: bool = False  # rows are known to be duplicate-free; dedup() is a no-op
+    stats: Optional["TableStats"] = field(default=None, repr=False, compare=False)  # filled in by stats.table_stats
+    # (kind, attribute) -> index over ``rows``; see raq.indexes.build_index
+    indexes: Dict[Tuple[str, str], Any] = field(default_factory=dict, repr=False, compare=False)
 
     def copy_with(self, name: Optional[str] = None, header: Optional[List[str]] = None, rows: Optional[List[Dict[str, Any]]] = None) -> "Relation":
-        return Relation(name or self.name, header or list(self.header), rows or [dict(r) for r in self.rows])
+        if rows is None:
+            return Relation(name or self.name, header or list(self.header), self.rows, self.distinct and not header)
+        return Relation(name or self.name, header or list(self.header), rows)
+
+    @property
+    def columns(self) -> Optional[Dict[str, Column]]:
+        """Column storage when the relation uses the columnar layout, else None."""
+        if isinstance(self.rows, ColumnarRows):
+            return self.rows.columns
+        return None
+
+    def to_columnar(
+        self, use_numpy: Optional[bool] = None, dictionaries: Optional[Dict[str, StringDictionary]] = None
+    ) -> "Relation":
+        """Return the same relation stored one array/list per attribute.
+
+        String columns of attributes in ``dictionaries`` are dictionary-encoded.
+        """
+        if isinstance(self.rows, ColumnarRows) and use_numpy is None and dictionaries is None:
+            return self
+        tuples = (tuple(r[c] for c in self.header) for r in self.rows)
+        rows = ColumnarRows.from_tuples(self.header, tuples, use_numpy, dictionaries)
+        return Relation(self.name, list(self.header), rows)
+
+    def to_rows(self) -> "Relation":
+        """Return the same relation stored as a list of row dicts."""
+        if not isinstance(self.rows, ColumnarRows):
+            return self
+        return Relation(self.name, list(self.header), list(self.rows))
 
-    def dedup(self) -> None:
+    def dedup(self) -> int:
+        """Drop duplicate rows, keeping first occurrences; returns how many were dropped."""
+        if self.distinct:
+            return 0
+        self.distinct = True
+        self.stats = None
+        self.indexes = {}
+        if isinstance(self.rows, ColumnarRows):
+            seen_t: set[Tuple[Any, ...]] = set()
+            keep: List[int] = []
+            for i, t in enumerate(self.rows.key_tuples(self.header)):
+                if t not in seen_t:
+                    seen_t.add(t)
+                    keep.append(i)
+            removed = len(self.rows) - len(keep)
+            if removed:
+                self.rows = self.rows.take(keep)
+            return removed
         seen: set[Tuple[Any, ...]] = set()
         new_rows: List[Dict[str, Any]] = []
+        removed = 0
         for r in self.rows:
             t = tuple(r.get(c) for c in self.header)
             if t not in seen:
                 seen.add(t)
                 new_rows.append(r)
+            else:
+                removed += 1
         self.rows = new_rows
+        return removed
 
     def reorder_like(self, header: List[str]) -> "Relation":
         assert set(self.header) == set(header), "Schemas must match to reorder"
-        new_rows = [{c: row[c] for c in header} for row in self.rows]
-        return Relation(self.name, list(header), new_rows)
+        # Rows are keyed by attribute, so only the header order changes.
+        return Relation(self.name, list(header), self.rows, self.distinct)
 
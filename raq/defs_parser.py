@@ -1,80 +1,359 @@
 from __future__ import annotations
 
-import io
-import csv
-from typing import Any, List, Dict
+import gc
+import hashlib
+import os
+import re
+from collections import defaultdict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from itertools import compress, count, islice, repeat
+from operator import contains
+from typing import Any, Iterable, Iterator, List, Dict, Optional, Tuple
 
+from .columnar import ColumnarRows, DictColumn, StringDictionary
 from .datatypes import Relation
+from .external import FileRows, file_delimiter
+from .indexes import apply_indexes, parse_index_decls
+from .values import _SAMPLE_ROWS, _column_kind, _convert_column, _split_rows
 
+LAYOUTS = ("rows", "columnar", "dictionary")
 
-def _convert_value(tok: str) -> Any:
-    s = tok.strip()
-    if (len(s) >= 2 and ((s[0] == '"' and s[-1] == '"') or (s[0] == "'" and s[-1] == "'"))):
-        return s[1:-1]
-    try:
-        if s.lower().startswith("0x"):
-            return int(s, 16)
-        return int(s)
-    except ValueError:
-        pass
-    try:
-        return float(s)
-    except ValueError:
-        pass
-    if s.lower() == "true":
-        return True
-    if s.lower() == "false":
-        return False
-    if s.lower() in ("null", "none"):
-        return None
-    return s
+# Characters read from a definitions file at a time, and lines per batch
+# when parsing other line iterables.
+_READ_CHARS = 1 << 20
+_BATCH_LINES = 16384
+# Everything str.splitlines splits on (files are read with \r\n -> \n).
+_LINE_BREAKS = ("\n", "\r", "\x0b", "\x0c", "\x1c", "\x1d", "\x1e", "\x85", "\u2028", "\u2029")
+# ``Name (attrs) = file "path"``, on one line.
+_FILE_DEF = r'([^\s(]+)\s*\(([^)\n]*)\)\s*=\s*file\s+"([^"\n]*)"'
+_FILE_DEF_RE = re.compile(_FILE_DEF)
+_FILE_DEF_LINE_RE = re.compile(r'^[ \t]*' + _FILE_DEF + r'[ \t]*\r?$', re.MULTILINE)
+
+
+def parse_definitions(
+    text: str, layout: str = "rows", base_dir: Optional[str] = None,
+    dictionaries: Optional[Dict[str, StringDictionary]] = None,
+) -> Dict[str, Relation]:
+    """Parse relation blocks from ``text``.
+
+    ``layout="columnar"`` stores each relation one column per attribute (see
+    ``raq.columnar``) instead of one dict per row; ``layout="dictionary"``
+    also encodes string columns as codes, with one dictionary per attribute
+    name shared by every relation in ``text``. ``Index: [hash|sorted]
+    Rel(Attr)`` lines build secondary indexes (see ``raq.indexes``).
+    ``Name (attrs) = file "path"`` lines define relations read lazily from
+    a CSV/TSV file (see ``raq.external``); relative paths are taken from
+    ``base_dir`` (default: the working directory). ``dictionaries``
+    (attribute name -> dictionary, usually a ``defaultdict``) replaces the
+    dictionaries of the dictionary layout, so relations parsed separately
+    can share them.
+    """
+    return parse_definition_lines(text.splitlines(), layout, base_dir, dictionaries)
+
+
+def parse_definitions_file(path: str, layout: str = "rows") -> Dict[str, Relation]:
+    """``parse_definitions`` reading ``path`` incrementally instead of as one string.
+
+    Relative ``file`` paths are taken from the directory of ``path``.
+    """
+    return _parse_batches(_file_batches(path), layout, os.path.dirname(path))
+
+
+def parse_definition_lines(
+    lines: Iterable[str], layout: str = "rows", base_dir: Optional[str] = None,
+    dictionaries: Optional[Dict[str, StringDictionary]] = None,
+) -> Dict[str, Relation]:
+    """``parse_definitions`` over an iterable of lines, consumed once."""
+    it = iter(lines)
+    return _parse_batches(iter(lambda: list(islice(it, _BATCH_LINES)), []), layout, base_dir, dictionaries)
+
+
+def iter_lines(path: str) -> Iterator[str]:
+    """Yield the lines of a UTF-8 file as ``str.splitlines`` would split its text."""
+    for batch in _file_batches(path):
+        yield from batch
 
 
-def _parse_csv_row(line: str) -> List[str]:
-    reader = csv.reader(io.StringIO(line), skipinitialspace=True)
-    return next(reader)
+def _file_batches(path: str) -> Iterator[List[str]]:
+    # Whole lines of each ~1M-character read; a line cut by the read is
+    # carried over to the next batch.
+    with open(path, encoding="utf-8") as f:
+        tail = ""
+        while True:
+            chunk = f.read(_READ_CHARS)
+            if not chunk:
+                break
+            text = tail + chunk
+            lines = text.splitlines()
+            tail = "" if text.endswith(_LINE_BREAKS) else lines.pop()
+            yield lines
+        if tail:
+            yield [tail]
 
 
-def parse_definitions(text: str) -> Dict[str, Relation]:
-    lines = text.splitlines()
-    i = 0
+def _parse_batches(
+    batches: Iterable[List[str]], layout: str, base_dir: Optional[str] = None,
+    dictionaries: Optional[Dict[str, StringDictionary]] = None,
+) -> Dict[str, Relation]:
+    if layout not in LAYOUTS:
+        raise ValueError(f"Unknown layout: {layout}")
+    if layout != "dictionary":
+        dictionaries = None
+    elif dictionaries is None:
+        dictionaries = defaultdict(StringDictionary)
+    with _gc_paused():
+        return _parse_relations(_Lines(batches), layout, base_dir, dictionaries)
+
+
+@contextmanager
+def _gc_paused() -> Iterator[None]:
+    # Loading allocates millions of tuples and dicts but no reference cycles;
+    # left on, the cyclic collector rescans them over and over.
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def _parse_relations(
+    lines: "_Lines", layout: str, base_dir: Optional[str], dictionaries: Optional[Dict[str, StringDictionary]]
+) -> Dict[str, Relation]:
     rels: Dict[str, Relation] = {}
 
-    while i < len(lines):
-        line = lines[i].strip()
-        i += 1
+    for line in lines:
+        line = line.strip()
         if not line:
             continue
-        if '(' in line and '=' in line and '{' in line:
+        m = _FILE_DEF_RE.fullmatch(line) if 'file' in line else None
+        if m is not None:
+            rel = _file_relation(m.group(1), m.group(2), m.group(3), base_dir)
+            rels[rel.name] = rel
+        elif '(' in line and '=' in line and '{' in line:
             before_paren, after_paren_open = line.split('(', 1)
             name = before_paren.strip().split()[0]
             attrs_part, after_attrs = after_paren_open.split(')', 1)
             attrs = [a.strip() for a in attrs_part.split(',') if a.strip()]
+            tuples = _parse_rows(name, attrs, lines.block())
 
-            row_lines: List[str] = []
-            while i < len(lines):
-                ln = lines[i]
-                i += 1
-                if '}' in ln:
-                    break
-                stripped = ln.strip()
-                if stripped:
-                    if stripped.endswith(','):
-                        stripped = stripped[:-1]
-                    row_lines.append(stripped)
-
-            rows: List[Dict[str, Any]] = []
-            for rl in row_lines:
-                if not rl:
-                    continue
-                cols = _parse_csv_row(rl)
-                if len(cols) != len(attrs):
-                    raise ValueError(f"Row arity mismatch for relation {name}: expected {len(attrs)} values, got {len(cols)} in line: {rl}")
-                vals = [_convert_value(tok) for tok in cols]
-                rows.append({attr: val for attr, val in zip(attrs, vals)})
-
-            rel = Relation(name=name, header=list(attrs), rows=rows)
-            rel.dedup()
+            if len(set(attrs)) == len(attrs):
+                # Rows are built from the tuples, so equal tuples are exactly
+                # the rows dedup() would drop.
+                unique = list(dict.fromkeys(tuples))
+                if layout != "rows":
+                    rows = ColumnarRows.from_tuples(attrs, unique, dictionaries=dictionaries)
+                else:
+                    rows = list(map(dict, map(zip, repeat(attrs), unique)))
+                rel = Relation(name=name, header=list(attrs), rows=rows, distinct=True)
+            else:
+                rel = Relation(name=name, header=list(attrs), rows=[dict(zip(attrs, vals)) for vals in tuples])
+                rel.dedup()
+                if layout != "rows":
+                    rel = rel.to_columnar(dictionaries=dictionaries)
             rels[name] = rel
+    apply_indexes(rels, parse_index_decls("\n".join(lines.decls)))
     return rels
 
+
+def _file_relation(name: str, attrs_part: str, path: str, base_dir: Optional[str]) -> Relation:
+    """A relation over ``path``; only checks that the file exists, reading nothing."""
+    attrs = [a.strip() for a in attrs_part.split(',') if a.strip()]
+    if not attrs:
+        raise ValueError(f"Relation {name} has no attributes")
+    full = _resolve_path(path, base_dir)
+    if not os.path.isfile(full):
+        raise ValueError(f"Relation {name}: no such file: {full}")
+    return Relation(name=name, header=attrs, rows=FileRows(name, full, attrs, file_delimiter(full)))
+
+
+def _resolve_path(path: str, base_dir: Optional[str]) -> str:
+    return os.path.join(base_dir, path) if base_dir else path
+
+
+class _Lines:
+    """A cursor over batches of lines; collects ``Index:`` lines as batches load."""
+
+    def __init__(self, batches: Iterable[List[str]]):
+        self.batches = iter(batches)
+        self.batch: List[str] = []
+        self.pos = 0
+        self.decls: List[str] = []
+
+    def _load(self) -> bool:
+        for batch in self.batches:
+            if batch:
+                self.batch, self.pos = batch, 0
+                if any(map(contains, batch, repeat('Index:'))):
+                    self.decls.extend(ln for ln in batch if 'Index:' in ln)
+                return True
+        return False
+
+    def __iter__(self) -> Iterator[str]:
+        while self.pos < len(self.batch) or self._load():
+            self.pos += 1
+            yield self.batch[self.pos - 1]
+
+    def block(self) -> Iterator[List[str]]:
+        """A block's non-empty row lines (stripped, one trailing comma dropped), a
+        batch at a time, up to and consuming the line holding ``}``."""
+        while self.pos < len(self.batch) or self._load():
+            seg = self.batch[self.pos:]
+            end = next(compress(count(), map(contains, seg, repeat('}'))), None)
+            if end is None:
+                self.pos = len(self.batch)
+            else:
+                self.pos += end + 1
+                seg = seg[:end]
+            rows = list(filter(None, map(str.removesuffix, map(str.strip, seg), repeat(','))))
+            if rows:
+                yield rows
+            if end is not None:
+                return
+
+
+def _parse_rows(name: str, attrs: List[str], segments: Iterator[List[str]]) -> List[tuple]:
+    """Split and convert a block's row lines into value tuples, a batch at a time.
+
+    Batches are converted a column at a time, with a fast path per column
+    chosen from a sample of the first rows (see ``raq.values``). Cells a
+    fast path does not cover fall back to ``_convert_value``, so values are
+    exactly the ones the per-cell conversion gives.
+    """
+    kinds: Optional[List[Optional[str]]] = None
+    tuples: List[tuple] = []
+    for seg in segments:
+        # Every row has at least one value, so there is at least one column.
+        columns = list(zip(*_split_rows(name, len(attrs), seg)))
+        if kinds is None:
+            kinds = [_column_kind(c[:_SAMPLE_ROWS]) for c in columns]
+        tuples.extend(zip(*(_convert_column(c, k) for c, k in zip(columns, kinds))))
+    return tuples
+
+
+@dataclass
+class DefBlock:
+    """One ``Name (attrs) = { ... }`` block or ``= file`` line: its character span and content digest."""
+
+    name: str
+    start: int
+    end: int
+    digest: str
+
+
+def scan_blocks(text: str, base_dir: Optional[str] = None) -> List[DefBlock]:
+    """Find the relation blocks in ``text`` without parsing their rows.
+
+    Uses the same boundaries as ``parse_definitions`` (a header line holding
+    ``(``, ``=`` and ``{`` up to the next line holding ``}``), for files whose
+    lines end in ``\n`` or ``\r\n``. Scanning and hashing run at C speed, so
+    this is far cheaper than parsing. A ``= file`` definition is a block of
+    its own line, whose digest also covers the file's size and modification
+    time, so editing the file counts as a change.
+    """
+    blocks: List[DefBlock] = []
+    pos = 0
+    n = len(text)
+    while pos < n:
+        brace = text.find('{', pos)
+        if brace < 0:
+            break
+        nl = text.rfind('\n', pos, brace)
+        line_start = nl + 1 if nl >= 0 else pos
+        line_end = text.find('\n', brace)
+        if line_end < 0:
+            line_end = n
+        header = text[line_start:line_end]
+        if '(' not in header or '=' not in header:
+            pos = line_end + 1
+            continue
+        close = text.find('}', line_end)
+        end = n if close < 0 else text.find('\n', close)
+        end = n if end < 0 else end + 1
+        name = header.split('(', 1)[0].strip().split()
+        digest = hashlib.blake2b(text[line_start:end].encode("utf-8"), digest_size=16).hexdigest()
+        blocks.append(DefBlock(name[0] if name else "", line_start, end, digest))
+        pos = end
+    if 'file' not in text:
+        return blocks
+    spans = [(b.start, b.end) for b in blocks]
+    for m in _FILE_DEF_LINE_RE.finditer(text):
+        if any(start <= m.start() < end for start, end in spans):
+            continue
+        try:
+            st = os.stat(_resolve_path(m.group(3), base_dir))
+            stamp = f"{st.st_size}:{st.st_mtime_ns}"
+        except OSError:
+            stamp = "missing"
+        end = min(m.end() + 1, n)
+        digest = hashlib.blake2b(f"{m.group(0)}\0{stamp}".encode("utf-8"), digest_size=16).hexdigest()
+        blocks.append(DefBlock(m.group(1), m.start(), end, digest))
+    blocks.sort(key=lambda b: b.start)
+    return blocks
+
+
+def load_definitions(
+    text: str, layout: str = "rows", base_dir: Optional[str] = None,
+    dictionaries: Optional[Dict[str, StringDictionary]] = None,
+) -> Tuple[Dict[str, Relation], List[DefBlock]]:
+    """``parse_definitions`` that also returns the block index for ``reload_definitions``."""
+    rels, blocks, _ = reload_definitions(text, [], {}, layout, base_dir, dictionaries)
+    return rels, blocks
+
+
+def session_dictionaries(rels: Dict[str, Relation]) -> Dict[str, StringDictionary]:
+    """The dictionaries the dictionary-encoded columns of ``rels`` use, by attribute name.
+
+    A ``defaultdict``: attributes not encoded yet get a new dictionary.
+    """
+    dictionaries: Dict[str, StringDictionary] = defaultdict(StringDictionary)
+    for rel in rels.values():
+        for a, col in (rel.columns or {}).items():
+            if isinstance(col, DictColumn):
+                dictionaries.setdefault(a, col.dictionary)
+    return dictionaries
+
+
+def reload_definitions(
+    text: str,
+    blocks: List[DefBlock],
+    rels: Dict[str, Relation],
+    layout: str = "rows",
+    base_dir: Optional[str] = None,
+    dictionaries: Optional[Dict[str, StringDictionary]] = None,
+) -> Tuple[Dict[str, Relation], List[DefBlock], List[str]]:
+    """Re-load ``text`` given the blocks and relations of a previous load.
+
+    Only blocks whose digest changed are parsed; every other relation is
+    the same object as before, so statistics, indexes and cached results
+    built on it stay valid. Returns (relations, new blocks, names of the
+    relations that changed, appeared or disappeared).
+
+    Under the dictionary layout every block is parsed with ``dictionaries``
+    (by default ``session_dictionaries(rels)``), so relations loaded or
+    reloaded in one session share one dictionary per attribute name.
+    """
+    if layout not in LAYOUTS:
+        raise ValueError(f"Unknown layout: {layout}")
+    if layout == "dictionary" and dictionaries is None:
+        dictionaries = session_dictionaries(rels)
+    old = {b.name: b for b in blocks}
+    new_blocks = scan_blocks(text, base_dir)
+    # A later block with the same name replaces an earlier one.
+    latest = {b.name: b for b in new_blocks}
+    new_rels: Dict[str, Relation] = {}
+    changed: List[str] = []
+    for name in dict.fromkeys(b.name for b in new_blocks):
+        b = latest[name]
+        prev = old.get(b.name)
+        if prev is not None and prev.digest == b.digest and b.name in rels:
+            new_rels[b.name] = rels[b.name]
+            continue
+        new_rels.update(parse_definitions(text[b.start:b.end], layout, base_dir, dictionaries))
+        changed.append(b.name)
+    changed.extend(n for n in rels if n not in new_rels)
+    # Unchanged relations keep their indexes; changed ones get them rebuilt.
+    apply_indexes(new_rels, parse_index_decls(text))
+    return new_rels, new_blocks, sorted(changed)
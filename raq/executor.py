@@ -1,128 +1,792 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List, Optional
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from dataclasses import dataclass
+from itertools import repeat
+from time import perf_counter
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
 
+from .columnar import ColumnarRows, DictColumn, concat_columns, shares_dictionary, take_column
 from .datatypes import Relation
-from .ra_ast import RAType, RARef, RASelect, RAProject, RAJoin, RASetOp
-from .predicate import eval_predicate
+from .external import FileRows
+from .schema import natural_join_header, theta_join_header
+from .ra_ast import RAType, RARef, RASelect, RAProject, RAJoin, RASetOp, structural_key
+from .predicate import (
+    PredNode, PAttr, PBinary, Getter, Resolver,
+    compile_predicate, join_conjuncts, row_resolver, split_conjuncts, _lookup_attr,
+)
+from .indexes import hash_index, index_candidates, rows_at
+from .vectorized import code_join_positions, conjunct_masks
 
 
-def evaluate(node: RAType, rels: Dict[str, Relation]) -> Relation:
+JOIN_STRATEGIES = ("auto", "nested_loop")
+
+
+def evaluate(node: RAType, rels: Dict[str, Relation], join_strategy: str = "auto") -> Relation:
+    """Evaluate an RA tree against ``rels``.
+
+    ``join_strategy`` selects the join algorithms: ``"auto"`` picks a hash join
+    whenever there are join keys, ``"nested_loop"`` forces the original
+    row-by-row comparison (useful for checking results and timings).
+    """
+    if join_strategy not in JOIN_STRATEGIES:
+        raise ValueError(f"Unknown join strategy: {join_strategy}")
+    res = _evaluate(node, rels, join_strategy, _Memo(), {})
+    # A bare reference to a file-backed relation is the only result that may
+    # still hold duplicates.
+    res.dedup()
+    return res
+
+
+@dataclass
+class BatchStats:
+    queries: int = 0
+    shared: int = 0  # subplans (other than relation references) in more than one query
+    reused: int = 0  # times a later query read a subplan's result instead of computing it
+    seconds: float = 0.0  # evaluating the whole batch
+    saved: float = 0.0  # what computing the reused subplans took the first time
+
+
+def evaluate_batch(
+    nodes: Sequence[RAType], rels: Dict[str, Relation], join_strategy: str = "auto",
+    stats: Optional[BatchStats] = None,
+) -> Iterator[Relation]:
+    """Evaluate several RA trees, computing subtrees they share only once.
+
+    Yields each tree's result, in order, as soon as it is computed; the
+    results are the ones ``evaluate`` gives. The result of a subtree that
+    occurs in more than one tree is kept until the last tree containing it
+    has been evaluated. ``stats`` is filled in as the batch runs.
+    """
+    if join_strategy not in JOIN_STRATEGIES:
+        raise ValueError(f"Unknown join strategy: {join_strategy}")
+    if stats is None:
+        stats = BatchStats()
+    keys: Dict[int, Any] = {}
+    per_node = [_subtree_keys(node, keys) for node in nodes]
+    remaining = Counter(k for ks in per_node for k in ks)
+    shared = {k for k, n in remaining.items() if n > 1}
+    stats.shared += len(shared)
+    memo = _TimedMemo()
+    for node, ks in zip(nodes, per_node):
+        t0 = perf_counter()
+        res = _evaluate(node, rels, join_strategy, memo, keys)
+        res.dedup()
+        for k in ks:
+            remaining[k] -= 1
+        # Only results a later tree still reads stay; they were computed by
+        # an earlier tree from now on.
+        for k in [k for k in memo if k not in shared or not remaining[k]]:
+            del memo[k]
+        memo.carried = set(memo)
+        stats.queries += 1
+        stats.seconds += perf_counter() - t0
+        stats.reused, stats.saved = memo.reused, memo.saved
+        # The result may be memoized for later trees; callers get their own
+        # Relation to rename.
+        yield res.copy_with()
+
+
+class _Memo(dict):
+    """``_evaluate``'s per-query memo: structural key -> operator result.
+
+    ``_evaluate`` also reports each operator to it as it runs; the hooks do
+    nothing here and let subclasses observe the evaluation (see
+    raq.explain).
+    """
+
+    def enter(self, node: RAType) -> None:
+        """``node`` is about to be evaluated (its inputs included)."""
+
+    def leave(self, node: RAType, res: Relation, removed: int) -> None:
+        """``node`` evaluated to ``res``; ``removed`` duplicates were dropped from it."""
+
+    def reuse(self, node: RAType, res: Relation) -> None:
+        """``node``'s result was taken from the memo."""
+
+    def note(self, algorithm: str) -> None:
+        """The operator being evaluated uses ``algorithm``."""
+
+
+class _TimedMemo(_Memo):
+    """``_evaluate``'s memo, timing each subtree stored and counting reuses of ``carried`` keys.
+
+    ``_evaluate`` tests ``key in memo`` before computing a subtree and stores
+    the result when done, so the time between the two includes its inputs.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.carried: Set[Any] = set()
+        self.reused = 0
+        self.saved = 0.0
+        self._started: Dict[Any, float] = {}
+        self._cost: Dict[Any, float] = {}
+
+    def __contains__(self, key: Any) -> bool:
+        if dict.__contains__(self, key):
+            if key in self.carried:
+                self.reused += 1
+                self.saved += self._cost.get(key, 0.0)
+            return True
+        self._started[key] = perf_counter()
+        return False
+
+    def __setitem__(self, key: Any, value: Relation) -> None:
+        started = self._started.pop(key, None)
+        if started is not None:
+            self._cost[key] = perf_counter() - started
+        dict.__setitem__(self, key, value)
+
+    def __delitem__(self, key: Any) -> None:
+        self._cost.pop(key, None)
+        dict.__delitem__(self, key)
+
+
+def _subtree_keys(node: RAType, keys: Dict[int, Any]) -> Set[Any]:
+    """Structural keys of every operator in ``node`` (relation references are cheap to redo)."""
+    out: Set[Any] = set()
+    stack = [node]
+    while stack:
+        n = stack.pop()
+        if isinstance(n, RARef):
+            continue
+        out.add(structural_key(n, keys))
+        if isinstance(n, (RASelect, RAProject)):
+            stack.append(n.child)
+        elif isinstance(n, (RAJoin, RASetOp)):
+            stack.extend((n.left, n.right))
+    return out
+
+
+def _evaluate(
+    node: RAType, rels: Dict[str, Relation], join_strategy: str, memo: _Memo, keys: Dict[int, Any]
+) -> Relation:
+    # Structurally equal subtrees are evaluated once per query and the result is
+    # handed to every parent. Parents only read their inputs, and operator
+    # results are deduplicated before they are memoized, so a later dedup() on
+    # a shared result is a no-op rather than a rebinding of its rows.
+    key = structural_key(node, keys)
+    if key in memo:
+        res = memo[key]
+        memo.reuse(node, res)
+        return res
+    memo.enter(node)
+    res = _evaluate_node(node, rels, join_strategy, memo, keys)
+    # Relation references keep their rows as they are (a file-backed one may
+    # hold duplicates until evaluate() returns it).
+    removed = 0 if isinstance(node, RARef) else res.dedup()
+    memo.leave(node, res, removed)
+    memo[key] = res
+    return res
+
+
+def _evaluate_node(
+    node: RAType, rels: Dict[str, Relation], join_strategy: str, memo: _Memo, keys: Dict[int, Any]
+) -> Relation:
     if isinstance(node, RARef):
         if node.name not in rels:
             raise KeyError(f"Unknown relation: {node.name}")
         rel = rels[node.name]
-        return Relation(name=node.name, header=list(rel.header), rows=[dict(r) for r in rel.rows])
+        # Relations are treated as immutable values, so the result shares the
+        # base relation's row storage instead of copying it.
+        return Relation(name=node.name, header=list(rel.header), rows=rel.rows, distinct=rel.distinct,
+                        indexes=rel.indexes)
 
     if isinstance(node, RASelect):
-        child = evaluate(node.child, rels)
-        out_rows: List[Dict[str, Any]] = []
-        for r in child.rows:
-            ctx = {k: v for k, v in r.items()}
-            res_bool = eval_predicate(node.predicate, ctx)
-            if res_bool:
-                out_rows.append(dict(r))
-        res = Relation(name=f"Select({child.name})", header=list(child.header), rows=out_rows)
-        res.dedup()
+        child = _evaluate(node.child, rels, join_strategy, memo, keys)
+        resolve = row_resolver(child.header)
+        pred = compile_predicate(node.predicate, resolve)
+        selected = None
+        if child.indexes:
+            selected = _select_indexed(node.predicate, child, resolve)
+            algorithm = "index lookup"
+        if selected is None and isinstance(child.rows, ColumnarRows):
+            selected = _select_columnar(node.predicate, child.rows, resolve)
+            algorithm = "vectorized mask"
+        if selected is None and isinstance(child.rows, FileRows):
+            selected = list(child.rows.select(node.predicate))
+            algorithm = "file scan"
+        if selected is None:
+            selected = [r for r in child.rows if pred(r)]
+            algorithm = "scan"
+        memo.note(algorithm)
+        # A subset of duplicate-free rows is itself duplicate-free.
+        res = Relation(name=f"Select({child.name})", header=list(child.header), rows=selected, distinct=child.distinct)
         return res
 
     if isinstance(node, RAProject):
-        child = evaluate(node.child, rels)
+        child = _evaluate(node.child, rels, join_strategy, memo, keys)
         for a in node.attrs:
             if a not in child.header:
                 raise KeyError(f"Projection attribute '{a}' not in schema {child.header}")
-        out_rows = [{a: r[a] for a in node.attrs} for r in child.rows]
-        res = Relation(name=f"Project({child.name})", header=list(node.attrs), rows=out_rows)
-        res.dedup()
+        if list(node.attrs) == child.header:
+            memo.note("shared rows")
+            res = Relation(name=f"Project({child.name})", header=list(node.attrs), rows=child.rows, distinct=child.distinct)
+        elif isinstance(child.rows, ColumnarRows):
+            memo.note("shared columns")
+            # The projected columns are shared as they are; dedup() then
+            # compares dictionary codes rather than strings.
+            columns = {a: child.rows.columns[a] for a in node.attrs}
+            res = Relation(name=f"Project({child.name})", header=list(node.attrs),
+                           rows=ColumnarRows(node.attrs, columns))
+        elif isinstance(child.rows, FileRows) and len(set(node.attrs)) == len(node.attrs):
+            # Only the projected columns are converted, and duplicates are
+            # dropped as tuples before any row dict is built.
+            memo.note("file scan")
+            unique = dict.fromkeys(child.rows.scan(node.attrs))
+            out_rows = list(map(dict, map(zip, repeat(node.attrs), unique)))
+            res = Relation(name=f"Project({child.name})", header=list(node.attrs), rows=out_rows, distinct=True)
+        else:
+            memo.note("scan")
+            out_rows = [{a: r[a] for a in node.attrs} for r in child.rows]
+            res = Relation(name=f"Project({child.name})", header=list(node.attrs), rows=out_rows)
         return res
 
     if isinstance(node, RAJoin):
-        left = evaluate(node.left, rels)
-        right = evaluate(node.right, rels)
+        left = _evaluate(node.left, rels, join_strategy, memo, keys)
+        right = _evaluate(node.right, rels, join_strategy, memo, keys)
 
         if node.predicate is None:
             common = [a for a in left.header if a in right.header]
-            out_header = list(left.header) + [a for a in right.header if a not in common]
+            out_header = natural_join_header(left.header, right.header)
             out_rows: List[Dict[str, Any]] = []
-            if common:
+            right_only = [a for a in right.header if a not in common]
+            positions = _coded_join(left, right, common, common) if common and join_strategy != "nested_loop" else None
+            if positions is not None:
+                memo.note("hash join on dictionary codes")
+                out_rows = _joined_columns(left, right, positions, out_header, right_only, right_only)
+            elif common and join_strategy == "nested_loop":
+                memo.note("nested loop")
+                right_rows = _rescannable(right.rows)
                 for rl in left.rows:
-                    for rr in right.rows:
+                    for rr in right_rows:
                         if all(rl[a] == rr[a] for a in common):
                             merged = dict(rl)
                             for a in right.header:
                                 if a not in common:
                                     merged[a] = rr[a]
                             out_rows.append(merged)
+            elif common:
+                key = _key_func(common)
+                indexes = _join_indexes(left, right, common, common)
+                memo.note(_hash_join_name(indexes))
+                for rl, rr in _hash_join_pairs(left.rows, right.rows, key, key, *indexes):
+                    merged = dict(rl)
+                    for a in right_only:
+                        merged[a] = rr[a]
+                    out_rows.append(merged)
             else:
+                memo.note("nested loop (cross product)")
+                right_rows = _rescannable(right.rows)
                 for rl in left.rows:
-                    for rr in right.rows:
+                    for rr in right_rows:
                         merged = dict(rl)
                         for a in right.header:
                             merged[a] = rr[a]
                         out_rows.append(merged)
-            res = Relation(name=f"Join({left.name},{right.name})", header=out_header, rows=out_rows)
-            res.dedup()
+            # Each output row extends one left row with one right row's values,
+            # so duplicate-free inputs give a duplicate-free output.
+            res = Relation(name=f"Join({left.name},{right.name})", header=out_header, rows=out_rows,
+                           distinct=left.distinct and right.distinct)
             return res
         else:
-            out_header = list(left.header)
-            right_header_out: List[str] = []
-            for a in right.header:
-                if a in left.header:
-                    right_header_out.append(f"{a}_right")
-                else:
-                    right_header_out.append(a)
-            out_header += right_header_out
+            out_header, right_header_out = theta_join_header(left.header, right.header)
 
             out_rows: List[Dict[str, Any]] = []
-            for rl in left.rows:
-                for rr in right.rows:
-                    ctx: Dict[str, Any] = {}
+            positions = None
+            if join_strategy != "nested_loop":
+                left_keys, right_keys, residual = _equi_keys(_join_scope(left, right), split_conjuncts(node.predicate))
+                if left_keys and not residual:
+                    positions = _coded_join(left, right, left_keys, right_keys)
+            if positions is not None:
+                memo.note("hash join on dictionary codes")
+                out_rows = _joined_columns(left, right, positions, out_header, right.header, right_header_out)
+            else:
+                for rl, rr in _theta_join_pairs(left, right, node.predicate, join_strategy, memo.note):
+                    merged: Dict[str, Any] = {}
                     for a in left.header:
-                        ctx[a] = rl[a]
-                        ctx[f"left.{a}"] = rl[a]
-                        ctx[f"{left.name}.{a}"] = rl[a]
-                    for a in right.header:
-                        if a not in ctx:
-                            ctx[a] = rr[a]
-                        ctx[f"right.{a}"] = rr[a]
-                        ctx[f"{right.name}.{a}"] = rr[a]
-                    if eval_predicate(node.predicate, ctx):
-                        merged: Dict[str, Any] = {}
-                        for a in left.header:
-                            merged[a] = rl[a]
-                        for a in right.header:
-                            key = a if a not in left.header else f"{a}_right"
-                            merged[key] = rr[a]
-                        out_rows.append(merged)
-            res = Relation(name=f"Join({left.name},{right.name})", header=out_header, rows=out_rows)
-            res.dedup()
+                        merged[a] = rl[a]
+                    for a, key in zip(right.header, right_header_out):
+                        merged[key] = rr[a]
+                    out_rows.append(merged)
+            res = Relation(name=f"Join({left.name},{right.name})", header=out_header, rows=out_rows,
+                           distinct=left.distinct and right.distinct and len(set(out_header)) == len(out_header))
             return res
 
     if isinstance(node, RASetOp):
-        left = evaluate(node.left, rels)
-        right = evaluate(node.right, rels)
+        left = _evaluate(node.left, rels, join_strategy, memo, keys)
+        right = _evaluate(node.right, rels, join_strategy, memo, keys)
         if set(left.header) != set(right.header):
             raise ValueError(f"Set operation requires union-compatible schemas, got {left.header} vs {right.header}")
         if left.header != right.header:
             right = right.reorder_like(left.header)
 
         if node.op == 'union':
-            rows = [dict(r) for r in left.rows] + [dict(r) for r in right.rows]
+            memo.note("concatenate")
+            if isinstance(left.rows, ColumnarRows) and isinstance(right.rows, ColumnarRows):
+                rows = ColumnarRows(left.header, {
+                    a: concat_columns(left.rows.columns[a], right.rows.columns[a]) for a in dict.fromkeys(left.header)
+                })
+            else:
+                rows = [*left.rows, *right.rows]
             res = Relation(name=f"Union({left.name},{right.name})", header=list(left.header), rows=rows)
-            res.dedup()
             return res
         if node.op == 'intersect':
-            set_right = {tuple(r[c] for c in right.header) for r in right.rows}
-            out_rows = [dict(r) for r in left.rows if tuple(r[c] for c in left.header) in set_right]
-            res = Relation(name=f"Intersect({left.name},{right.name})", header=list(left.header), rows=out_rows)
-            res.dedup()
+            out_rows = _coded_filter(left, right, True)
+            memo.note("hash set" if out_rows is None else "hash set on dictionary codes")
+            if out_rows is None:
+                set_right = {tuple(r[c] for c in right.header) for r in right.rows}
+                out_rows = [r for r in left.rows if tuple(r[c] for c in left.header) in set_right]
+            res = Relation(name=f"Intersect({left.name},{right.name})", header=list(left.header), rows=out_rows, distinct=left.distinct)
             return res
         if node.op == 'minus':
-            set_right = {tuple(r[c] for c in right.header) for r in right.rows}
-            out_rows = [dict(r) for r in left.rows if tuple(r[c] for c in left.header) not in set_right]
-            res = Relation(name=f"Minus({left.name},{right.name})", header=list(left.header), rows=out_rows)
-            res.dedup()
+            out_rows = _coded_filter(left, right, False)
+            memo.note("hash set" if out_rows is None else "hash set on dictionary codes")
+            if out_rows is None:
+                set_right = {tuple(r[c] for c in right.header) for r in right.rows}
+                out_rows = [r for r in left.rows if tuple(r[c] for c in left.header) not in set_right]
+            res = Relation(name=f"Minus({left.name},{right.name})", header=list(left.header), rows=out_rows, distinct=left.distinct)
             return res
         raise ValueError(f"Unknown set operation: {node.op}")
 
     raise ValueError(f"Unsupported RA node: {node}")
+
+
+def _coded_join(
+    left: Relation, right: Relation, left_keys: List[str], right_keys: List[str]
+) -> Optional[Tuple[Any, Any]]:
+    """Row positions (left, right) of an equi-join compared on dictionary codes.
+
+    Applies when both inputs are columnar and each key pair shares one
+    dictionary; None otherwise. Pairs come in ``_hash_join_pairs`` order.
+    """
+    if not (isinstance(left.rows, ColumnarRows) and isinstance(right.rows, ColumnarRows)):
+        return None
+    lcols = [left.rows.columns[a] for a in left_keys]
+    rcols = [right.rows.columns[a] for a in right_keys]
+    if not all(shares_dictionary(lc, rc) for lc, rc in zip(lcols, rcols)):
+        return None
+    lcodes = [c.codes for c in lcols]
+    rcodes = [c.codes for c in rcols]
+    positions = code_join_positions(lcodes, rcodes, [len(c.dictionary) for c in lcols])
+    if positions is not None:
+        return positions
+    lk = lcodes[0] if len(lcodes) == 1 else list(zip(*lcodes))
+    rk = rcodes[0] if len(rcodes) == 1 else list(zip(*rcodes))
+    pairs = list(_hash_join_pairs(range(len(lk)), range(len(rk)), lk.__getitem__, rk.__getitem__))
+    return [i for i, _ in pairs], [j for _, j in pairs]
+
+
+def _joined_columns(
+    left: Relation, right: Relation, positions: Tuple[Any, Any], header: List[str],
+    right_attrs: List[str], right_out: List[str],
+) -> ColumnarRows:
+    # Same values, in the same order, as merging each left row with the
+    # listed right attributes (later names overwrite earlier ones).
+    left_pos, right_pos = positions
+    columns = {a: take_column(left.rows.columns[a], left_pos) for a in left.header}
+    for a, key in zip(right_attrs, right_out):
+        columns[key] = take_column(right.rows.columns[a], right_pos)
+    return ColumnarRows(header, columns)
+
+
+def _coded_filter(left: Relation, right: Relation, keep: bool) -> Optional[ColumnarRows]:
+    """Left rows that are (``keep``) or are not in ``right``, comparing codes.
+
+    Applies when both inputs are columnar and every attribute is either
+    encoded with one dictionary on both sides or encoded on neither.
+    """
+    if not (isinstance(left.rows, ColumnarRows) and isinstance(right.rows, ColumnarRows)):
+        return None
+    for a in left.header:
+        lc, rc = left.rows.columns[a], right.rows.columns[a]
+        if not shares_dictionary(lc, rc) and (isinstance(lc, DictColumn) or isinstance(rc, DictColumn)):
+            return None
+    right_keys = set(right.rows.key_tuples(left.header))
+    return left.rows.take([i for i, t in enumerate(left.rows.key_tuples(left.header)) if (t in right_keys) == keep])
+
+
+def _rescannable(rows: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    # Inner inputs of nested loops are scanned once per outer row; columnar
+    # and file rows would rebuild (or re-read) every row each time.
+    return rows if isinstance(rows, list) else list(rows)
+
+
+def _select_columnar(predicate: PredNode, rows: ColumnarRows, resolve: Resolver) -> Optional[ColumnarRows]:
+    """Evaluate a selection as NumPy masks over whole columns.
+
+    Conjuncts that cannot be vectorized (object columns, strings, ...) are
+    checked row-wise on the rows the mask keeps. Returns None when nothing
+    could be vectorized.
+    """
+    mask, rest = conjunct_masks(split_conjuncts(predicate), rows.columns, len(rows))
+    if mask is None:
+        return None
+    indices = mask.nonzero()[0]
+    if rest:
+        check = compile_predicate(join_conjuncts(rest), resolve)
+        indices = [i for i in indices.tolist() if check(rows[i])]
+    return rows.take(indices)
+
+
+def _select_indexed(predicate: PredNode, rel: Relation, resolve: Resolver) -> Optional[Any]:
+    """Answer the leading ``attr op constant`` conjuncts from ``rel``'s indexes.
+
+    The remaining conjuncts are checked on the candidate rows only. Rows
+    come out in scan order. Returns None when no index applies.
+    """
+    positions, rest = index_candidates(split_conjuncts(predicate), rel.indexes)
+    if positions is None:
+        return None
+    if rest:
+        check = compile_predicate(join_conjuncts(rest), resolve)
+        rows = rel.rows
+        positions = [i for i in positions if check(rows[i])]
+    return rows_at(rel.rows, positions)
+
+
+def _join_indexes(
+    left: Relation, right: Relation, left_keys: List[str], right_keys: List[str]
+) -> Tuple[Optional[Dict[Any, List[int]]], Optional[Dict[Any, List[int]]]]:
+    """Existing hash indexes usable as the build side of a single-key join: (left, right)."""
+    if len(left_keys) != 1:
+        return None, None
+    right_index = hash_index(right, right_keys[0]) if right.indexes else None
+    if right_index is not None:
+        return None, right_index
+    return (hash_index(left, left_keys[0]) if left.indexes else None), None
+
+
+def _hash_join_name(indexes: Tuple[Optional[Any], Optional[Any]]) -> str:
+    """How ``_hash_join_pairs`` joins given ``_join_indexes``' result."""
+    if indexes[1] is not None:
+        return "index join (right index)"
+    if indexes[0] is not None:
+        return "index join (left index)"
+    return "hash join"
+
+
+def _key_func(attrs: List[str]) -> Callable[[Dict[str, Any]], Any]:
+    if len(attrs) == 1:
+        a = attrs[0]
+        return lambda r: r[a]
+    return lambda r: tuple(r[a] for a in attrs)
+
+
+def _matchable(key: Any) -> bool:
+    """False for a join key holding NaN, which ``==`` matches with nothing, not even itself.
+
+    Hash tables leave such keys out: a dict lookup finds a key that is the
+    very same object even when ``==`` says it differs. Probing with one is
+    then harmless, as it can only find itself.
+    """
+    if type(key) is tuple:
+        return all(v == v for v in key)
+    return key == key
+
+
+def _hash_join_pairs(
+    left_rows: List[Dict[str, Any]],
+    right_rows: List[Dict[str, Any]],
+    left_key: Callable[[Dict[str, Any]], Any],
+    right_key: Callable[[Dict[str, Any]], Any],
+    left_index: Optional[Dict[Any, List[int]]] = None,
+    right_index: Optional[Dict[Any, List[int]]] = None,
+) -> Iterator[Tuple[Dict[str, Any], Dict[str, Any]]]:
+    """Yield matching (left, right) row pairs using a hash table on the smaller input.
+
+    An existing index (key -> row positions) on either input replaces that
+    table; indexes leave NaN out too (see ``_matchable``). Pairs come out in the same order as the nested loop would produce
+    them (left-major, right rows in input order), so results stay identical.
+    """
+    if right_index is not None:
+        for rl in left_rows:
+            for i in right_index.get(left_key(rl), ()):
+                yield rl, right_rows[i]
+        return
+
+    if left_index is None and len(right_rows) <= len(left_rows):
+        table: Dict[Any, List[Dict[str, Any]]] = {}
+        for rr in right_rows:
+            k = right_key(rr)
+            if _matchable(k):
+                table.setdefault(k, []).append(rr)
+        for rl in left_rows:
+            for rr in table.get(left_key(rl), ()):
+                yield rl, rr
+        return
+
+    # Build on the left, probe with the right, then replay matches in left order.
+    buckets = left_index
+    if buckets is None:
+        buckets = {}
+        for i, rl in enumerate(left_rows):
+            k = left_key(rl)
+            if _matchable(k):
+                buckets.setdefault(k, []).append(i)
+    matches: List[Optional[List[Dict[str, Any]]]] = [None] * len(left_rows)
+    for rr in right_rows:
+        for i in buckets.get(right_key(rr), ()):
+            m = matches[i]
+            if m is None:
+                matches[i] = [rr]
+            else:
+                m.append(rr)
+    for rl, m in zip(left_rows, matches):
+        if m:
+            for rr in m:
+                yield rl, rr
+
+
+def _join_scope(left: Relation, right: Relation) -> Dict[str, Tuple[int, str]]:
+    """Map every name a theta predicate may use to (side, attribute).
+
+    Built with the same keys and precedence as the per-pair context of the
+    original nested loop, so ``_lookup_attr`` resolves names exactly as before.
+    """
+    scope: Dict[str, Tuple[int, str]] = {}
+    for a in left.header:
+        scope[a] = (0, a)
+        scope[f"left.{a}"] = (0, a)
+        scope[f"{left.name}.{a}"] = (0, a)
+    for a in right.header:
+        if a not in scope:
+            scope[a] = (1, a)
+        scope[f"right.{a}"] = (1, a)
+        scope[f"{right.name}.{a}"] = (1, a)
+    return scope
+
+
+def _pair_resolver(scope: Dict[str, Tuple[int, str]]) -> Callable[[str], Getter]:
+    """Resolve predicate names to getters over a (left row, right row) pair."""
+
+    def resolve(name: str) -> Getter:
+        side, a = _lookup_attr(scope, name)
+        if side == 0:
+            return lambda pair: pair[0][a]
+        return lambda pair: pair[1][a]
+
+    return resolve
+
+
+def _resolve_side(scope: Dict[str, Tuple[int, str]], node: PredNode) -> Optional[Tuple[int, str]]:
+    if not isinstance(node, PAttr):
+        return None
+    try:
+        return _lookup_attr(scope, node.name)
+    except KeyError:
+        return None
+
+
+def _equi_keys(
+    scope: Dict[str, Tuple[int, str]], conjuncts: List[PredNode]
+) -> Tuple[List[str], List[str], List[PredNode]]:
+    """Split conjuncts into left/right equality keys and the residual predicate terms."""
+    left_keys: List[str] = []
+    right_keys: List[str] = []
+    residual: List[PredNode] = []
+    for c in conjuncts:
+        if isinstance(c, PBinary) and c.op in ('=', '=='):
+            lhs = _resolve_side(scope, c.left)
+            rhs = _resolve_side(scope, c.right)
+            if lhs is not None and rhs is not None and lhs[0] != rhs[0]:
+                if lhs[0] == 1:
+                    lhs, rhs = rhs, lhs
+                left_keys.append(lhs[1])
+                right_keys.append(rhs[1])
+                continue
+        residual.append(c)
+    return left_keys, right_keys, residual
+
+
+def _no_note(algorithm: str) -> None:
+    pass
+
+
+def _theta_join_pairs(
+    left: Relation, right: Relation, predicate: PredNode, join_strategy: str,
+    note: Callable[[str], None] = _no_note,
+) -> Iterator[Tuple[Dict[str, Any], Dict[str, Any]]]:
+    """Yield (left, right) row pairs satisfying a theta-join predicate.
+
+    Equality conjuncts between a left and a right attribute become hash-join
+    keys; the remaining conjuncts are only evaluated on matching pairs.
+    ``note`` is told the algorithm used.
+    """
+    scope = _join_scope(left, right)
+    resolve = _pair_resolver(scope)
+    if join_strategy != "nested_loop":
+        left_keys, right_keys, residual_terms = _equi_keys(scope, split_conjuncts(predicate))
+        if left_keys:
+            residual = _compile_residual(residual_terms, resolve)
+            indexes = _join_indexes(left, right, left_keys, right_keys)
+            note(_hash_join_name(indexes))
+            pairs = _hash_join_pairs(left.rows, right.rows, _key_func(left_keys), _key_func(right_keys), *indexes)
+            if residual is None:
+                yield from pairs
+                return
+            for pair in pairs:
+                if residual(pair):
+                    yield pair
+            return
+
+    match = _theta_matcher(scope, right.rows, predicate, join_strategy, note)
+    for rl in left.rows:
+        for rr in match(rl):
+            yield rl, rr
+
+
+RowMatcher = Callable[[Dict[str, Any]], Iterable[Dict[str, Any]]]
+
+
+def _theta_matcher(
+    scope: Dict[str, Tuple[int, str]],
+    right_rows: Iterable[Dict[str, Any]],
+    predicate: PredNode,
+    join_strategy: str,
+    note: Callable[[str], None] = _no_note,
+) -> RowMatcher:
+    """Prepare the right input once and return ``left row -> matching right rows``.
+
+    Uses a hash table on the equality keys, else a band join on range
+    conjuncts, else a nested scan. Matches come back in right-input order.
+    """
+    rows = right_rows if isinstance(right_rows, list) else list(right_rows)
+    resolve = _pair_resolver(scope)
+    pred = compile_predicate(predicate, resolve)
+
+    def scan(rl: Dict[str, Any]) -> List[Dict[str, Any]]:
+        return [rr for rr in rows if pred((rl, rr))]
+
+    if join_strategy == "nested_loop":
+        note("nested loop")
+        return scan
+
+    conjuncts = split_conjuncts(predicate)
+    left_keys, right_keys, residual_terms = _equi_keys(scope, conjuncts)
+    if left_keys:
+        residual = _compile_residual(residual_terms, resolve)
+        table: Dict[Any, List[Dict[str, Any]]] = {}
+        right_key = _key_func(right_keys)
+        for rr in rows:
+            k = right_key(rr)
+            if _matchable(k):
+                table.setdefault(k, []).append(rr)
+        left_key = _key_func(left_keys)
+
+        def probe(rl: Dict[str, Any]) -> Iterable[Dict[str, Any]]:
+            matches = table.get(left_key(rl), ())
+            if residual is None:
+                return matches
+            return [rr for rr in matches if residual((rl, rr))]
+
+        note("hash join")
+        return probe
+
+    band = _band_bounds(scope, conjuncts)
+    if band is not None:
+        attr, lower, upper, residual_terms = band
+        matcher = _band_matcher(rows, attr, lower, upper, _compile_residual(residual_terms, resolve), scan)
+        if matcher is not None:
+            note("band join (sort + bisect)")
+            return matcher
+    note("nested loop")
+    return scan
+
+
+def _compile_residual(terms: List[PredNode], resolve: Callable[[str], Getter]) -> Optional[Callable[[Any], bool]]:
+    node = join_conjuncts(terms)
+    if node is None:
+        return None
+    return compile_predicate(node, resolve)
+
+
+_FLIPPED_OPS = {'<': '>', '<=': '>=', '>': '<', '>=': '<='}
+
+
+def _band_bounds(
+    scope: Dict[str, Tuple[int, str]], conjuncts: List[PredNode]
+) -> Optional[Tuple[str, List[Tuple[str, str]], List[Tuple[str, str]], List[PredNode]]]:
+    """Find range conjuncts usable for a band join.
+
+    Each ``left.L op right.R`` term is normalised to ``right.R op' left.L``.
+    The right attribute with the most bounds (both sides preferred) is
+    chosen; returns (right attr, lower bounds, upper bounds, residual terms)
+    where bounds are (op, left attr) pairs.
+    """
+    by_attr: Dict[str, List[Tuple[int, str, str]]] = {}
+    for i, c in enumerate(conjuncts):
+        if not (isinstance(c, PBinary) and c.op in _FLIPPED_OPS):
+            continue
+        lhs = _resolve_side(scope, c.left)
+        rhs = _resolve_side(scope, c.right)
+        if lhs is None or rhs is None or lhs[0] == rhs[0]:
+            continue
+        op = c.op
+        if lhs[0] == 0:
+            lhs, rhs, op = rhs, lhs, _FLIPPED_OPS[op]
+        by_attr.setdefault(lhs[1], []).append((i, op, rhs[1]))
+    if not by_attr:
+        return None
+
+    def rank(terms: List[Tuple[int, str, str]]) -> Tuple[bool, int]:
+        ops = {op[0] for _, op, _ in terms}
+        return (len(ops) == 2, len(terms))
+
+    attr = max(by_attr, key=lambda a: rank(by_attr[a]))
+    terms = by_attr[attr]
+    used = {i for i, _, _ in terms}
+    lower = [(op, l) for _, op, l in terms if op[0] == '>']
+    upper = [(op, l) for _, op, l in terms if op[0] == '<']
+    residual = [c for i, c in enumerate(conjuncts) if i not in used]
+    return attr, lower, upper, residual
+
+
+def _band_matcher(
+    right_rows: List[Dict[str, Any]],
+    attr: str,
+    lower: List[Tuple[str, str]],
+    upper: List[Tuple[str, str]],
+    residual: Optional[Callable[[Any], bool]],
+    scan: RowMatcher,
+) -> Optional[RowMatcher]:
+    """Sort the right input on ``attr`` and bisect each left row's range.
+
+    Costs O((n + m) log m + output). Returns None when the right values do
+    not sort (None, mixed types, NaN); a left value that does not compare
+    with them falls back to ``scan`` for that row, so errors surface exactly
+    as in the nested loop.
+    """
+    try:
+        order = sorted(range(len(right_rows)), key=lambda i: right_rows[i][attr])
+    except TypeError:
+        return None
+    keys = [right_rows[i][attr] for i in order]
+    if any(k != k for k in keys):
+        return None
+
+    def match(rl: Dict[str, Any]) -> Iterable[Dict[str, Any]]:
+        lo, hi = 0, len(keys)
+        try:
+            for op, a in lower:
+                v = rl[a]
+                if v != v:
+                    return ()
+                lo = max(lo, bisect_right(keys, v) if op == '>' else bisect_left(keys, v))
+            for op, a in upper:
+                v = rl[a]
+                if v != v:
+                    return ()
+                hi = min(hi, bisect_left(keys, v) if op == '<' else bisect_right(keys, v))
+        except TypeError:
+            return scan(rl)
+        if lo >= hi:
+            return ()
+        matches = [right_rows[i] for i in sorted(order[lo:hi])]
+        if residual is None:
+            return matches
+        return [rr for rr in matches if residual((rl, rr))]
+
+    return match
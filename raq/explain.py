@@ -0,0 +1,352 @@
+"""EXPLAIN and EXPLAIN ANALYZE.
+
+``explain`` describes a plan without running it: each operator with the
+algorithm the executor is expected to choose for it (from the plan, the
+storage layout of the relations and their indexes) and the estimated row
+count. ``explain_analyze`` evaluates the plan and reports, per operator,
+the algorithm actually used, the rows it produced and the duplicates
+``dedup()`` dropped from them, and the wall time and peak memory of the
+operator with its inputs. Tracing memory with tracemalloc slows evaluation
+down many times over, so the peaks come from a second, traced evaluation
+and the times from the first, untraced one.
+"""
+
+from __future__ import annotations
+
+import json
+import tracemalloc
+from dataclasses import asdict, dataclass, field
+from time import perf_counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from .cache import _format_bytes
+from .columnar import Column, DictColumn, is_numpy_column, shares_dictionary
+from .datatypes import Relation
+from .executor import (
+    JOIN_STRATEGIES, _Memo, _band_bounds, _equi_keys, _evaluate, _hash_join_name, _join_indexes, _join_scope,
+)
+from .external import FileRows
+from .predicate import PAttr, PBinary, PConst, predicate_attrs, split_conjuncts
+from .printer import format_operator, plan_children
+from .ra_ast import RAType, RARef, RASelect, RAProject, RAJoin, RASetOp
+from .schema import SET_OP_NAMES, natural_join_header, output_schema, theta_join_header
+from .stats import Estimator
+
+
+@dataclass
+class ExplainNode:
+    """One operator of an explained plan; the analyze-only fields stay None for ``explain``."""
+
+    operator: str
+    algorithm: Optional[str] = None
+    estimated_rows: Optional[float] = None
+    rows: Optional[int] = None  # None for a file-backed relation, whose rows are not counted
+    removed: Optional[int] = None  # duplicates dedup() dropped from the result
+    seconds: Optional[float] = None  # wall time, inputs included
+    peak_bytes: Optional[int] = None  # peak memory allocated above the level at the start, inputs included
+    reused: bool = False  # result of an identical subtree evaluated earlier in the query; no children
+    children: List["ExplainNode"] = field(default_factory=list)
+
+
+def explain(node: RAType, rels: Dict[str, Relation], join_strategy: str = "auto") -> ExplainNode:
+    """The operator tree of ``node`` with expected algorithms and estimated rows, without evaluating it.
+
+    Choices that depend on the values (a vectorized selection or a sorted
+    index falling back to a scan, a band join on values that do not sort)
+    are only seen by ``explain_analyze``.
+    """
+    if join_strategy not in JOIN_STRATEGIES:
+        raise ValueError(f"Unknown join strategy: {join_strategy}")
+    output_schema(node, rels)
+    return _expected(node, rels, join_strategy, _estimates(node, rels))[0]
+
+
+def explain_analyze(
+    node: RAType, rels: Dict[str, Relation], join_strategy: str = "auto", trace_memory: bool = True,
+) -> Tuple[Relation, ExplainNode]:
+    """Evaluate ``node`` as ``evaluate`` does; returns (result, operator tree with actual figures).
+
+    With ``trace_memory`` the plan is evaluated again under tracemalloc for
+    ``peak_bytes``; without it, ``peak_bytes`` stays None.
+    """
+    if join_strategy not in JOIN_STRATEGIES:
+        raise ValueError(f"Unknown join strategy: {join_strategy}")
+    estimates = _estimates(node, rels)
+    memo = _ExplainMemo(estimates, False)
+    res = _evaluate(node, rels, join_strategy, memo, {})
+    tree = memo.root.children[0]
+    # As in evaluate: a bare file-backed relation may hold duplicates.
+    tree.removed += res.dedup()
+    if trace_memory:
+        traced = _ExplainMemo(estimates, True)
+        started = not tracemalloc.is_tracing()
+        if started:
+            tracemalloc.start()
+        try:
+            _evaluate(node, rels, join_strategy, traced, {})
+        finally:
+            if started:
+                tracemalloc.stop()
+        _copy_peaks(traced.root.children[0], tree)
+    return res, tree
+
+
+def format_explain(tree: ExplainNode) -> str:
+    """Render an explained plan as an indented operator tree, one node per line."""
+    lines: List[str] = []
+    _format_explain(tree, 0, lines)
+    return "\n".join(lines)
+
+
+def explain_json(tree: ExplainNode, indent: Optional[int] = None) -> str:
+    """The explained plan as a JSON object; ``children`` nests the inputs."""
+    return json.dumps(asdict(tree), ensure_ascii=False, indent=indent)
+
+
+def _format_explain(node: ExplainNode, depth: int, lines: List[str]) -> None:
+    parts = [node.operator]
+    if node.algorithm is not None:
+        parts.append(f"[{node.algorithm}]")
+    if node.estimated_rows is not None:
+        parts.append(f"est. {node.estimated_rows:,.0f} rows")
+    if node.reused:
+        parts.append("reused" if node.rows is None else f"reused {node.rows:,} rows")
+    elif node.seconds is not None:
+        if node.rows is not None:
+            parts.append(f"actual {node.rows:,} rows")
+        if node.removed:
+            parts.append(f"{node.removed:,} duplicates removed")
+        parts.append(f"{node.seconds * 1000:.3f} ms")
+        if node.peak_bytes is not None:
+            parts.append(f"peak {_format_bytes(node.peak_bytes)}")
+    lines.append("  " * depth + "  ".join(parts))
+    for c in node.children:
+        _format_explain(c, depth + 1, lines)
+
+
+def _estimates(node: RAType, rels: Dict[str, Relation]) -> Dict[int, float]:
+    """Estimated rows per operator (by id), or none when the plan cannot be estimated."""
+    estimator = Estimator(rels)
+    out: Dict[int, float] = {}
+    stack = [node]
+    try:
+        while stack:
+            n = stack.pop()
+            out[id(n)] = estimator.rows(n)
+            stack.extend(plan_children(n))
+    except (KeyError, ValueError):
+        # Let evaluation report the error.
+        return {}
+    return out
+
+
+class _ExplainMemo(_Memo):
+    """Builds the ExplainNode tree while ``_evaluate`` runs.
+
+    Each operator's peak memory is the highest traced level while it ran
+    (inputs included) minus the level when it started; the tracemalloc
+    peak is reset on entering and leaving an operator, after handing the
+    peak so far to the enclosing one.
+    """
+
+    def __init__(self, estimates: Dict[int, float], trace_memory: bool):
+        super().__init__()
+        self.estimates = estimates
+        self.trace_memory = trace_memory
+        self.root = ExplainNode("")
+        # [node, started, memory at start, highest memory seen] per running operator
+        self._stack: List[list] = []
+
+    def enter(self, node: RAType) -> None:
+        out = ExplainNode(format_operator(node), estimated_rows=self.estimates.get(id(node)))
+        self._parent().children.append(out)
+        current = 0
+        if self.trace_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            self._raise_peak(peak)
+            tracemalloc.reset_peak()
+        self._stack.append([out, perf_counter(), current, current])
+
+    def leave(self, node: RAType, res: Relation, removed: int) -> None:
+        elapsed = perf_counter()
+        out, started, base, highest = self._stack.pop()
+        out.seconds = elapsed - started
+        if self.trace_memory:
+            highest = max(highest, tracemalloc.get_traced_memory()[1])
+            out.peak_bytes = highest - base
+            self._raise_peak(highest)
+            tracemalloc.reset_peak()
+        out.rows = _count(res)
+        out.removed = removed
+
+    def reuse(self, node: RAType, res: Relation) -> None:
+        self._parent().children.append(ExplainNode(
+            format_operator(node), estimated_rows=self.estimates.get(id(node)), rows=_count(res), reused=True,
+        ))
+
+    def note(self, algorithm: str) -> None:
+        self._stack[-1][0].algorithm = algorithm
+
+    def _parent(self) -> ExplainNode:
+        return self._stack[-1][0] if self._stack else self.root
+
+    def _raise_peak(self, peak: int) -> None:
+        if self._stack and peak > self._stack[-1][3]:
+            self._stack[-1][3] = peak
+
+
+def _copy_peaks(source: ExplainNode, target: ExplainNode) -> None:
+    # Both trees come from evaluating the same plan, so they have the same shape.
+    target.peak_bytes = source.peak_bytes
+    for s, t in zip(source.children, target.children):
+        _copy_peaks(s, t)
+
+
+def _count(res: Relation) -> Optional[int]:
+    # Counting a file's rows would read the whole file.
+    return None if isinstance(res.rows, FileRows) else len(res.rows)
+
+
+# -- expected algorithms ------------------------------------------------------
+
+
+@dataclass
+class _Shape:
+    """What the executor's choices depend on about an operator's result."""
+
+    name: str
+    header: List[str]
+    columns: Optional[Dict[str, Column]]  # columnar storage (for dictionary sharing)
+    file: bool
+    indexes: Dict[Tuple[str, str], Any]
+
+    def relation(self) -> Relation:
+        # A stand-in for the helpers that only look at the header and indexes.
+        return Relation(self.name, self.header, [], indexes=self.indexes)
+
+
+def _expected(
+    node: RAType, rels: Dict[str, Relation], join_strategy: str, estimates: Dict[int, float]
+) -> Tuple[ExplainNode, _Shape]:
+    """Mirror ``_evaluate_node``'s choices on result shapes instead of rows."""
+    out = ExplainNode(format_operator(node), estimated_rows=estimates.get(id(node)))
+    inputs = [_expected(c, rels, join_strategy, estimates) for c in plan_children(node)]
+    out.children = [c for c, _ in inputs]
+    shapes = [s for _, s in inputs]
+
+    if isinstance(node, RARef):
+        rel = rels[node.name]
+        return out, _Shape(node.name, list(rel.header), rel.columns, isinstance(rel.rows, FileRows), rel.indexes)
+
+    if isinstance(node, RASelect):
+        child = shapes[0]
+        conjuncts = split_conjuncts(node.predicate)
+        if child.indexes and _indexed(conjuncts[0], child.indexes):
+            out.algorithm = "index lookup"
+        elif child.columns is not None and _vectorizable(conjuncts[0], child.columns):
+            out.algorithm = "vectorized mask"
+        elif child.file:
+            out.algorithm = "file scan"
+        else:
+            out.algorithm = "scan"
+        return out, _Shape(f"Select({child.name})", child.header, child.columns, False, {})
+
+    if isinstance(node, RAProject):
+        child = shapes[0]
+        name, attrs = f"Project({child.name})", list(node.attrs)
+        if attrs == child.header:
+            out.algorithm = "shared rows"
+            return out, _Shape(name, attrs, child.columns, child.file, {})
+        if child.columns is not None:
+            out.algorithm = "shared columns"
+            return out, _Shape(name, attrs, {a: child.columns[a] for a in attrs}, False, {})
+        out.algorithm = "file scan" if child.file and len(set(attrs)) == len(attrs) else "scan"
+        return out, _Shape(name, attrs, None, False, {})
+
+    if isinstance(node, RAJoin):
+        left, right = shapes
+        name = f"Join({left.name},{right.name})"
+        if node.predicate is None:
+            common = [a for a in left.header if a in right.header]
+            header = natural_join_header(left.header, right.header)
+            right_only = [a for a in right.header if a not in common]
+            if not common:
+                out.algorithm = "nested loop (cross product)"
+            elif join_strategy == "nested_loop":
+                out.algorithm = "nested loop"
+            elif _coded(left, right, common, common):
+                out.algorithm = "hash join on dictionary codes"
+                return out, _Shape(name, header, _joined(left, right, right_only, right_only), False, {})
+            else:
+                out.algorithm = _hash_join_name(_join_indexes(left.relation(), right.relation(), common, common))
+            return out, _Shape(name, header, None, False, {})
+        header, right_out = theta_join_header(left.header, right.header)
+        if join_strategy == "nested_loop":
+            out.algorithm = "nested loop"
+            return out, _Shape(name, header, None, False, {})
+        scope = _join_scope(left.relation(), right.relation())
+        conjuncts = split_conjuncts(node.predicate)
+        left_keys, right_keys, residual = _equi_keys(scope, conjuncts)
+        if left_keys and not residual and _coded(left, right, left_keys, right_keys):
+            out.algorithm = "hash join on dictionary codes"
+            return out, _Shape(name, header, _joined(left, right, right.header, right_out), False, {})
+        if left_keys:
+            out.algorithm = _hash_join_name(_join_indexes(left.relation(), right.relation(), left_keys, right_keys))
+        elif _band_bounds(scope, conjuncts) is not None:
+            out.algorithm = "band join (sort + bisect)"
+        else:
+            out.algorithm = "nested loop"
+        return out, _Shape(name, header, None, False, {})
+
+    if isinstance(node, RASetOp):
+        left, right = shapes
+        name = f"{SET_OP_NAMES[node.op]}({left.name},{right.name})"
+        if node.op == 'union':
+            out.algorithm = "concatenate"
+            columnar = left.columns is not None and right.columns is not None
+            return out, _Shape(name, left.header, left.columns if columnar else None, False, {})
+        coded = left.columns is not None and right.columns is not None and all(
+            shares_dictionary(left.columns[a], right.columns[a])
+            or not (isinstance(left.columns[a], DictColumn) or isinstance(right.columns[a], DictColumn))
+            for a in left.header
+        )
+        out.algorithm = "hash set on dictionary codes" if coded else "hash set"
+        return out, _Shape(name, left.header, left.columns if coded else None, False, {})
+
+    raise ValueError(f"Unsupported RA node: {node}")
+
+
+def _indexed(conjunct: Any, indexes: Dict[Tuple[str, str], Any]) -> bool:
+    """Whether ``attr op constant`` can be answered from one of ``indexes`` (see raq.indexes)."""
+    if not isinstance(conjunct, PBinary):
+        return False
+    if isinstance(conjunct.left, PAttr) and isinstance(conjunct.right, PConst):
+        attr = conjunct.left.name
+    elif isinstance(conjunct.right, PAttr) and isinstance(conjunct.left, PConst):
+        attr = conjunct.right.name
+    else:
+        return False
+    if conjunct.op in ('=', '=='):
+        return any((kind, attr) in indexes for kind in ("hash", "sorted"))
+    return conjunct.op in ('<', '<=', '>', '>=') and ("sorted", attr) in indexes
+
+
+def _vectorizable(conjunct: Any, columns: Dict[str, Column]) -> bool:
+    """Whether ``conjunct`` only reads NumPy or dictionary-encoded columns (see raq.vectorized)."""
+    attrs = predicate_attrs(conjunct)
+    return bool(attrs) and all(
+        a in columns and (is_numpy_column(columns[a]) or isinstance(columns[a], DictColumn)) for a in attrs
+    )
+
+
+def _coded(left: _Shape, right: _Shape, left_keys: List[str], right_keys: List[str]) -> bool:
+    if left.columns is None or right.columns is None:
+        return False
+    return all(shares_dictionary(left.columns[l], right.columns[r]) for l, r in zip(left_keys, right_keys))
+
+
+def _joined(left: _Shape, right: _Shape, right_attrs: List[str], right_out: List[str]) -> Dict[str, Column]:
+    columns = dict(left.columns)
+    for a, key in zip(right_attrs, right_out):
+        columns[key] = right.columns[a]
+    return columns
@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import mmap
+import operator
+import os
+from itertools import repeat
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+from .predicate import PredNode, _lookup_attr, compile_predicate
+from .values import _SAMPLE_ROWS, _column_kind, _convert_column, _parse_csv_row, _split_rows
+
+# Bytes of the mapped file split into lines at a time.
+_MAP_CHUNK = 1 << 20
+_TAB_SUFFIXES = (".tsv", ".tab")
+
+
+class FileRows(Sequence[Dict[str, Any]]):
+    """Rows of a CSV/TSV file, parsed on demand from a memory map.
+
+    Nothing is read when the relation is defined. Each scan maps the file
+    and parses it a batch of lines at a time, so no more than one batch is
+    held: ``scan`` converts only the columns asked for, and ``select`` only
+    the predicate's columns until a row matches. Random access
+    (``rows[i]``, used by indexes and parallel workers) reads every row into
+    memory once and keeps them.
+
+    One record per line, fields separated by ``delimiter`` (quoted fields
+    may not span lines), values converted as in definition blocks. A first
+    line naming exactly the relation's attributes is a header and skipped.
+    Duplicate records are not removed here; the relation is marked as not
+    duplicate-free, so the operators reading it remove them.
+    """
+
+    def __init__(self, name: str, path: str, header: List[str], delimiter: str = ","):
+        self.name = name
+        self.path = path
+        self.header = list(header)
+        self.delimiter = delimiter
+        # Last position of each attribute, as dict(zip(header, values)) keeps.
+        self._pos = {a: i for i, a in enumerate(self.header)}
+        self._kinds: Optional[List[Optional[str]]] = None
+        self._length: Optional[int] = None
+        self._rows: Optional[List[Dict[str, Any]]] = None
+
+    def __len__(self) -> int:
+        if self._length is None:
+            self._length = sum(map(len, self._batches()))
+        return self._length
+
+    def __getitem__(self, i):  # type: ignore[override]
+        if self._rows is None:
+            self._rows = list(self)
+            self._length = len(self._rows)
+        return self._rows[i]
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        if self._rows is not None:
+            return iter(self._rows)
+        return map(dict, map(zip, repeat(self.header), self.scan(self.header)))
+
+    def scan(self, attrs: List[str]) -> Iterator[tuple]:
+        """Tuples of the ``attrs`` values of every row; other columns are split but not converted."""
+        pos = [self._pos[a] for a in attrs]
+        for cols in self._columns():
+            if not pos:
+                yield from repeat((), len(cols[0]))
+                continue
+            yield from zip(*(self._convert(cols, i) for i in pos))
+
+    def columns(self, attrs: List[str]) -> Dict[str, List[Any]]:
+        """The values of each of ``attrs``, one list per attribute, in one pass."""
+        out: Dict[str, List[Any]] = {a: [] for a in attrs}
+        n = 0
+        for cols in self._columns():
+            n += len(cols[0])
+            for a in out:
+                out[a].extend(self._convert(cols, self._pos[a]))
+        self._length = n
+        return out
+
+    def select(self, predicate: PredNode) -> Iterator[Dict[str, Any]]:
+        """Rows satisfying ``predicate``, in file order.
+
+        The predicate sees rows holding only the attributes it reads; the
+        other attributes are converted for matching rows only.
+        """
+        ctx = {a: a for a in self.header}
+        used: List[str] = []
+
+        def resolve(name: str):
+            attr = _lookup_attr(ctx, name)
+            used.append(attr)
+            return operator.itemgetter(attr)
+
+        pred = compile_predicate(predicate, resolve)
+        needed = list(dict.fromkeys(used))
+        attrs = list(self._pos)
+        for cols in self._columns():
+            values = {a: self._convert(cols, self._pos[a]) for a in needed}
+            if needed:
+                partial = map(dict, map(zip, repeat(needed), zip(*(values[a] for a in needed))))
+            else:
+                partial = repeat({}, len(cols[0]))
+            hits = [i for i, r in enumerate(partial) if pred(r)]
+            if not hits:
+                continue
+            out = []
+            for a in attrs:
+                if a in values:
+                    out.append(_pick(values[a], hits))
+                else:
+                    i = self._pos[a]
+                    out.append(_convert_column(_pick(cols[i], hits), self._kinds[i]))
+            yield from map(dict, map(zip, repeat(attrs), zip(*out)))
+
+    def _convert(self, cols: List[tuple], i: int) -> List[Any]:
+        return _convert_column(cols[i], self._kinds[i])
+
+    def _columns(self) -> Iterator[List[tuple]]:
+        """Each batch of records split into columns of raw cells."""
+        width = len(self.header)
+        for lines in self._batches():
+            cols = list(zip(*_split_rows(self.name, width, lines, self.delimiter)))
+            if self._kinds is None:
+                self._kinds = [_column_kind(c[:_SAMPLE_ROWS]) for c in cols]
+            yield cols
+
+    def _batches(self) -> Iterator[List[str]]:
+        """Non-empty record lines (stripped), about ``_MAP_CHUNK`` bytes at a time."""
+        with open(self.path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if not size:
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                pos = 0
+                first = True
+                while pos < size:
+                    end = mm.find(b"\n", pos + _MAP_CHUNK)
+                    end = size if end < 0 else end + 1
+                    text = mm[pos:end].decode("utf-8")
+                    pos = end
+                    lines = list(filter(None, map(str.strip, text.split("\n"))))
+                    if first and lines:
+                        first = False
+                        lines[0] = lines[0].lstrip("\ufeff")
+                        if [c.strip() for c in _parse_csv_row(lines[0], self.delimiter)] == self.header:
+                            del lines[0]
+                    if lines:
+                        yield lines
+
+
+def _pick(col: Sequence[Any], hits: List[int]) -> Sequence[Any]:
+    if len(hits) == 1:
+        return (col[hits[0]],)
+    return operator.itemgetter(*hits)(col)
+
+
+def file_delimiter(path: str) -> str:
+    """Tab for ``.tsv``/``.tab`` files, else comma."""
+    return "\t" if path.lower().endswith(_TAB_SUFFIXES) else ","
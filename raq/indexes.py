@@ -0,0 +1,229 @@
+from __future__ import annotations
+
+import re
+import sys
+import time
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from .cache import _format_bytes
+from .columnar import ColumnarRows, iter_column
+from .datatypes import Relation
+from .external import FileRows
+from .predicate import PredNode, PConst, PAttr, PBinary
+
+INDEX_KINDS = ("hash", "sorted")
+
+_INT_BYTES = sys.getsizeof(1 << 20)
+_FLIPPED = {'=': '=', '==': '==', '<': '>', '<=': '>=', '>': '<', '>=': '<='}
+_DECL_RE = re.compile(r'^[ \t]*Index:[ \t]*(.*?)[ \t]*$', re.MULTILINE)
+_SPEC_RE = re.compile(r'^(?:(\w+)\s+)?([^\s(]+)\s*\(\s*([^\s)]+)\s*\)$')
+
+
+class HashIndex:
+    """Value -> row positions, for equality lookups and join builds."""
+
+    kind = "hash"
+
+    def __init__(self, rel: Relation, attr: str):
+        t0 = time.perf_counter()
+        self.attr = attr
+        self.table: Dict[Any, List[int]] = {}
+        for i, v in enumerate(_values(rel, attr)):
+            # NaN equals nothing, but a dict would still find the same NaN object.
+            if v == v:
+                self.table.setdefault(v, []).append(i)
+        self.build_seconds = time.perf_counter() - t0
+        self.nbytes = sys.getsizeof(self.table) + sum(
+            sys.getsizeof(p) + _INT_BYTES * len(p) for p in self.table.values()
+        )
+
+    def equal(self, value: Any) -> Optional[List[int]]:
+        # Dict lookup matches exactly the values ``==`` matches (1 == 1.0 == True).
+        return self.table.get(value, [])
+
+    def range(self, op: str, value: Any) -> Optional[List[int]]:
+        return None
+
+
+class SortedIndex:
+    """Row positions ordered by value, for range and equality lookups.
+
+    Range lookups are only answered when every value is a number or every
+    value is a string; otherwise comparing some row with the constant would
+    raise, and the selection falls back to a scan so it raises as before.
+    NaNs are left out (they satisfy no comparison).
+    """
+
+    kind = "sorted"
+
+    def __init__(self, rel: Relation, attr: str):
+        t0 = time.perf_counter()
+        self.attr = attr
+        values = list(_values(rel, attr))
+        if all(isinstance(v, (int, float)) for v in values):
+            self.domain: Optional[str] = "number"
+        elif all(isinstance(v, str) for v in values):
+            self.domain = "string"
+        else:
+            self.domain = None
+        if self.domain is not None:
+            self.order = sorted((i for i, v in enumerate(values) if v == v), key=values.__getitem__)
+        else:
+            self.order = []
+        self.keys = [values[i] for i in self.order]
+        self.build_seconds = time.perf_counter() - t0
+        self.nbytes = sys.getsizeof(self.order) + sys.getsizeof(self.keys) + _INT_BYTES * len(self.order)
+
+    def equal(self, value: Any) -> Optional[List[int]]:
+        if not self._comparable(value):
+            return None
+        return sorted(self.order[bisect_left(self.keys, value):bisect_right(self.keys, value)])
+
+    def range(self, op: str, value: Any) -> Optional[List[int]]:
+        if not self._comparable(value):
+            return None
+        if value != value:  # NaN: every comparison is false
+            return []
+        if op == '<':
+            hit = self.order[:bisect_left(self.keys, value)]
+        elif op == '<=':
+            hit = self.order[:bisect_right(self.keys, value)]
+        elif op == '>':
+            hit = self.order[bisect_right(self.keys, value):]
+        else:
+            hit = self.order[bisect_left(self.keys, value):]
+        return sorted(hit)
+
+    def _comparable(self, value: Any) -> bool:
+        if self.domain == "number":
+            return isinstance(value, (int, float))
+        return self.domain == "string" and isinstance(value, str)
+
+
+Index = Any  # HashIndex | SortedIndex
+
+
+def _values(rel: Relation, attr: str):
+    if attr not in rel.header:
+        raise KeyError(f"Attribute '{attr}' not in schema {rel.header} of {rel.name}")
+    if isinstance(rel.rows, ColumnarRows):
+        return iter_column(rel.rows.columns[attr])
+    if isinstance(rel.rows, FileRows):
+        return iter(rel.rows.columns([attr])[attr])
+    return (r[attr] for r in rel.rows)
+
+
+def build_index(rel: Relation, attr: str, kind: str = "hash") -> Index:
+    """Build (or return the existing) ``kind`` index on ``rel.attr``.
+
+    Indexes live on the relation they were built from, so they are shared
+    by every query reading it and dropped with it.
+    """
+    if kind not in INDEX_KINDS:
+        raise ValueError(f"Unknown index kind: {kind}")
+    key = (kind, attr)
+    if key not in rel.indexes:
+        rel.indexes[key] = (HashIndex if kind == "hash" else SortedIndex)(rel, attr)
+    return rel.indexes[key]
+
+
+def describe_index(rel_name: str, index: Index) -> str:
+    return (f"{index.kind} index {rel_name}({index.attr}): "
+            f"built in {index.build_seconds * 1000:.2f} ms, {_format_bytes(index.nbytes)}")
+
+
+# -- declarations -----------------------------------------------------------
+
+
+@dataclass(frozen=True)
+class IndexDecl:
+    kind: str
+    relation: str
+    attr: str
+
+
+def parse_index_spec(spec: str) -> IndexDecl:
+    """Parse ``[hash|sorted] Rel(Attr)``; the kind defaults to hash."""
+    m = _SPEC_RE.match(spec.strip())
+    if not m:
+        raise ValueError(f"Invalid index declaration: {spec!r} (expected '[hash|sorted] Rel(Attr)')")
+    kind = (m.group(1) or "hash").lower()
+    if kind not in INDEX_KINDS:
+        raise ValueError(f"Unknown index kind: {kind}")
+    return IndexDecl(kind, m.group(2), m.group(3))
+
+
+def parse_index_decls(text: str) -> List[IndexDecl]:
+    """Collect ``Index: [hash|sorted] Rel(Attr)`` lines from a definitions file."""
+    return [parse_index_spec(m.group(1)) for m in _DECL_RE.finditer(text)]
+
+
+def apply_indexes(rels: Dict[str, Relation], decls: List[IndexDecl]) -> List[Tuple[str, Index]]:
+    """Build the declared indexes that do not exist yet; return the new ones."""
+    built: List[Tuple[str, Index]] = []
+    for d in decls:
+        if d.relation not in rels:
+            raise KeyError(f"Unknown relation: {d.relation}")
+        rel = rels[d.relation]
+        if (d.kind, d.attr) not in rel.indexes:
+            built.append((d.relation, build_index(rel, d.attr, d.kind)))
+    return built
+
+
+# -- lookups ----------------------------------------------------------------
+
+
+def hash_index(rel: Relation, attr: str) -> Optional[Dict[Any, List[int]]]:
+    """The value -> positions table of a hash index on ``attr``, if there is one."""
+    index = rel.indexes.get(("hash", attr))
+    return index.table if index is not None else None
+
+
+def index_candidates(
+    conjuncts: List[PredNode], indexes: Dict[Tuple[str, str], Index]
+) -> Tuple[Optional[List[int]], List[PredNode]]:
+    """Answer the leading run of ``attr op constant`` conjuncts from indexes.
+
+    Returns (ascending row positions or None, conjuncts still to check on
+    those rows). As with vectorized selections, only a leading run is
+    answered, so the remaining conjuncts see exactly the rows
+    short-circuiting ``and`` would hand them.
+    """
+    positions: Optional[List[int]] = None
+    for i, c in enumerate(conjuncts):
+        hit = _lookup(c, indexes)
+        if hit is None:
+            return positions, list(conjuncts[i:])
+        if positions is None:
+            positions = hit
+        else:
+            keep = set(hit)
+            positions = [p for p in positions if p in keep]
+    return positions, []
+
+
+def _lookup(c: PredNode, indexes: Dict[Tuple[str, str], Index]) -> Optional[List[int]]:
+    if not isinstance(c, PBinary) or c.op not in _FLIPPED:
+        return None
+    if isinstance(c.left, PAttr) and isinstance(c.right, PConst):
+        attr, op, value = c.left.name, c.op, c.right.value
+    elif isinstance(c.right, PAttr) and isinstance(c.left, PConst):
+        attr, op, value = c.right.name, _FLIPPED[c.op], c.left.value
+    else:
+        return None
+    for kind in INDEX_KINDS:
+        index = indexes.get((kind, attr))
+        if index is None:
+            continue
+        hit = index.equal(value) if op in ('=', '==') else index.range(op, value)
+        if hit is not None:
+            return hit
+    return None
+
+
+def rows_at(rows: Any, positions: List[int]) -> Any:
+    if isinstance(rows, ColumnarRows):
+        return rows.take(positions)
+    return [rows[i] for i in positions]
@@ -0,0 +1,445 @@
+"""Rule-based logical rewrites of RA trees.
+
+Every rule below preserves the result under the set semantics enforced by
+``Relation.dedup`` (the result is a set of tuples; order and the names of
+intermediate relations are not part of it):
+
+* σp(σq(X)) = σ(q ∧ p)(X), and σ(p1 ∧ p2)(X) = σp1(σp2(X)), so a selection is
+  handled as a list of conjuncts, each pushed as far down as it can go.
+* σp(πa(X)) = πa(σp(X)) when p only reads attributes in a.
+* σp(L ⋈ R) = σp(L) ⋈ R when p only reads attributes of L (and symmetrically
+  for attributes only R has). For theta joins, ``X_right`` names are mapped
+  back to the right input's ``X``.
+* σp(A ∪ B) = σp(A) ∪ σp(B); σp(A − B) = σp(A) − B; σp(A ∩ B) = σp(A) ∩ B.
+* πa(πb(X)) = πa(X) for a ⊆ b.
+* πa(σp(X)) = πa(σp(π(a ∪ attrs(p))(X))).
+* πa(L ⋈ R) = πa(π(L ∩ N)(L) ⋈ π(R ∩ N)(R)) where N is a plus the join
+  attributes: the shared attributes for natural joins; the attributes the
+  predicate reads plus every attribute name both sides have (so ``_right``
+  suffixing is unchanged) for theta joins.
+* πa(A ∪ B) = πa(A) ∪ πa(B).
+* Chains of natural joins (A ⋈ B ⋈ C ...) are associative and commutative,
+  so they are reordered to minimise the estimated size of the intermediate
+  results (``stats.Estimator``): exhaustively by dynamic programming over
+  subsets for up to ``DP_LIMIT`` inputs, greedily beyond that. A projection
+  restores the original column order. Row order of the result may change.
+
+Theta-join predicates may qualify attributes with the name of an input
+relation (``Employees.Age``). Rewriting below such a join would rename its
+inputs, so those subtrees are left as written.
+
+Below a join, and below the left input of ``∩`` and ``−``, a conjunct sees
+rows the original plan dropped before evaluating it. Such a conjunct is
+only pushed when it provably cannot raise on them: every ``<``/``<=``/
+``>``/``>=`` it contains compares values that are all numbers or all
+strings, and every unary minus negates numbers, judging attributes by the
+statistics of the base columns their values come from (``_value_kinds``).
+Anything else stays where it was written, so ``σ B > 3 (R ⋈ S)`` with some
+string ``B`` in ``R`` is not pushed into ``R``.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from .datatypes import Relation
+from .predicate import (
+    PredNode, PAttr, PConst, PParam, PUnary, PBinary, join_conjuncts, predicate_attrs, split_conjuncts, _lookup_attr,
+)
+from .ra_ast import RAType, RARef, RASelect, RAProject, RAJoin, RASetOp
+from .schema import natural_join_header, output_schema, theta_join_header
+from .stats import ColumnStats, Estimate, Estimator, table_stats
+
+_MAX_PASSES = 10
+DP_LIMIT = 8  # longer join chains are ordered greedily
+
+
+def optimize(node: RAType, rels: Dict[str, Relation]) -> RAType:
+    """Rewrite ``node`` into an equivalent, cheaper tree (see module docstring).
+
+    Returns the tree unchanged when it does not type-check against ``rels``,
+    so that ``evaluate`` reports the error exactly as before.
+    """
+    try:
+        output_schema(node, rels)
+    except (KeyError, ValueError):
+        return node
+    # Push selections first so join ordering sees the filtered inputs, and
+    # projections last so they do not split join chains.
+    node = _fixpoint(_Optimizer(rels, projections=False), node)
+    node = _JoinOrderer(rels).reorder(node)
+    return _fixpoint(_Optimizer(rels), node)
+
+
+def _fixpoint(opt: "_Optimizer", node: RAType) -> RAType:
+    for _ in range(_MAX_PASSES):
+        new = opt.rewrite(node)
+        if new == node:
+            break
+        node = new
+    return node
+
+
+def uses_relation_names(pred: Optional[PredNode]) -> bool:
+    """True if a join predicate qualifies attributes with an input's name."""
+    if pred is None:
+        return False
+    return any('.' in a and a.split('.', 1)[0] not in ('left', 'right') for a in predicate_attrs(pred))
+
+
+def _rename_attrs(pred: PredNode, mapping: Dict[str, str]) -> PredNode:
+    if isinstance(pred, PAttr):
+        return PAttr(mapping.get(pred.name, pred.name))
+    if isinstance(pred, PUnary):
+        return PUnary(pred.op, _rename_attrs(pred.expr, mapping))
+    if isinstance(pred, PBinary):
+        return PBinary(pred.op, _rename_attrs(pred.left, mapping), _rename_attrs(pred.right, mapping))
+    return pred
+
+
+def _select(conjuncts: List[PredNode], child: RAType) -> RAType:
+    pred = join_conjuncts(conjuncts)
+    return child if pred is None else RASelect(predicate=pred, child=child)
+
+
+class _Optimizer:
+    def __init__(self, rels: Dict[str, Relation], projections: bool = True):
+        self.rels = rels
+        self.projections = projections
+        self._kinds: Dict[int, tuple] = {}
+
+    def header(self, node: RAType) -> List[str]:
+        return output_schema(node, self.rels)[1]
+
+    def kinds(self, node: RAType) -> Dict[str, Optional[str]]:
+        # Keyed by identity, as in Estimator; the node is kept so the id stays unique.
+        hit = self._kinds.get(id(node))
+        if hit is not None and hit[0] is node:
+            return hit[1]
+        kinds = _value_kinds(node, self.rels, self.kinds)
+        self._kinds[id(node)] = (node, kinds)
+        return kinds
+
+    def safe(self, conjunct: PredNode, node: RAType) -> bool:
+        """Whether ``conjunct`` cannot raise on any row ``node`` may produce."""
+        return _cannot_raise(conjunct, self.kinds(node))
+
+    def rewrite(self, node: RAType) -> RAType:
+        if isinstance(node, RASelect):
+            return self.push_selection(split_conjuncts(node.predicate), self.rewrite(node.child))
+        if isinstance(node, RAProject):
+            if not self.projections:
+                return RAProject(attrs=node.attrs, child=self.rewrite(node.child))
+            return self.push_projection(list(node.attrs), self.rewrite(node.child))
+        if isinstance(node, RAJoin):
+            if uses_relation_names(node.predicate):
+                return node
+            return RAJoin(left=self.rewrite(node.left), right=self.rewrite(node.right), predicate=node.predicate)
+        if isinstance(node, RASetOp):
+            return RASetOp(op=node.op, left=self.rewrite(node.left), right=self.rewrite(node.right))
+        return node
+
+    # -- selections -------------------------------------------------------
+
+    def push_selection(self, conjuncts: List[PredNode], child: RAType) -> RAType:
+        if isinstance(child, RASelect):
+            return self.push_selection(split_conjuncts(child.predicate) + conjuncts, child.child)
+
+        if isinstance(child, RAProject):
+            below = [c for c in conjuncts if predicate_attrs(c) <= set(child.attrs)]
+            if below:
+                above = [c for c in conjuncts if not predicate_attrs(c) <= set(child.attrs)]
+                inner = RAProject(attrs=child.attrs, child=self.push_selection(below, child.child))
+                return _select(above, inner)
+
+        if isinstance(child, RAJoin) and not uses_relation_names(child.predicate):
+            to_left, to_right, above = self._split_for_join(conjuncts, child)
+            if to_left or to_right:
+                left = self.push_selection(to_left, child.left) if to_left else child.left
+                right = self.push_selection(to_right, child.right) if to_right else child.right
+                return _select(above, RAJoin(left=left, right=right, predicate=child.predicate))
+
+        if isinstance(child, RASetOp) and child.op == 'union':
+            # Both inputs' rows are all in the union: the conjuncts see the same values.
+            left = self.push_selection(conjuncts, child.left)
+            right = self.push_selection(conjuncts, child.right)
+            return RASetOp(op=child.op, left=left, right=right)
+
+        if isinstance(child, RASetOp) and child.op in ('intersect', 'minus'):
+            below = [c for c in conjuncts if self.safe(c, child.left)]
+            if below:
+                above = [c for c in conjuncts if not self.safe(c, child.left)]
+                left = self.push_selection(below, child.left)
+                return _select(above, RASetOp(op=child.op, left=left, right=child.right))
+
+        return _select(conjuncts, child)
+
+    def _split_for_join(
+        self, conjuncts: List[PredNode], join: RAJoin
+    ) -> Tuple[List[PredNode], List[PredNode], List[PredNode]]:
+        lh = self.header(join.left)
+        rh = self.header(join.right)
+        if join.predicate is None:
+            right_map = {a: a for a in rh if a not in lh}
+        else:
+            out, right_out = theta_join_header(lh, rh)
+            if len(set(out)) != len(out):
+                return [], [], list(conjuncts)
+            right_map = {o: a for a, o in zip(rh, right_out)}
+        to_left: List[PredNode] = []
+        to_right: List[PredNode] = []
+        above: List[PredNode] = []
+        for c in conjuncts:
+            attrs = predicate_attrs(c)
+            if attrs <= set(lh) and self.safe(c, join.left):
+                to_left.append(c)
+            elif attrs <= set(right_map) and self.safe(renamed := _rename_attrs(c, right_map), join.right):
+                to_right.append(renamed)
+            else:
+                above.append(c)
+        return to_left, to_right, above
+
+    # -- projections ------------------------------------------------------
+
+    def push_projection(self, attrs: List[str], child: RAType) -> RAType:
+        keep = RAProject(attrs=attrs, child=child)
+        child_header = self.header(child)
+        if not set(attrs) <= set(child_header):
+            return keep
+
+        if isinstance(child, RAProject):
+            return self.push_projection(attrs, child.child)
+
+        if isinstance(child, RASelect):
+            needed = set(attrs) | predicate_attrs(child.predicate)
+            inner = self._narrow(child.child, needed)
+            if inner is not child.child:
+                return RAProject(attrs=attrs, child=RASelect(predicate=child.predicate, child=inner))
+            return keep
+
+        if isinstance(child, RAJoin) and not uses_relation_names(child.predicate):
+            needs = self._join_needs(attrs, child)
+            if needs is not None:
+                left = self._narrow(child.left, needs[0])
+                right = self._narrow(child.right, needs[1])
+                if left is not child.left or right is not child.right:
+                    return RAProject(attrs=attrs, child=RAJoin(left=left, right=right, predicate=child.predicate))
+            return keep
+
+        if isinstance(child, RASetOp) and child.op == 'union':
+            return RASetOp(op='union', left=self.push_projection(attrs, child.left),
+                           right=self.push_projection(attrs, child.right))
+
+        return keep
+
+    def _narrow(self, node: RAType, needed: Set[str]) -> RAType:
+        """Project ``node`` onto ``needed`` (in its own column order) if that drops anything."""
+        header = self.header(node)
+        attrs = [a for a in header if a in needed]
+        if len(attrs) == len(header) or not attrs:
+            return node
+        return self.push_projection(attrs, node)
+
+    def _join_needs(self, attrs: List[str], join: RAJoin) -> Optional[Tuple[Set[str], Set[str]]]:
+        lh = self.header(join.left)
+        rh = self.header(join.right)
+        shared = set(lh) & set(rh)
+        if join.predicate is None:
+            return (set(attrs) & set(lh)) | shared, (set(attrs) & set(rh)) | shared
+        out, right_out = theta_join_header(lh, rh)
+        if len(set(out)) != len(out):
+            return None
+        right_map = {o: a for a, o in zip(rh, right_out)}
+        need_left = (set(attrs) & set(lh)) | shared
+        need_right = {right_map[a] for a in attrs if a not in lh} | shared
+        scope: Dict[str, Tuple[int, str]] = {}
+        for a in lh:
+            scope[a] = (0, a)
+            scope[f"left.{a}"] = (0, a)
+        for a in rh:
+            scope.setdefault(a, (1, a))
+            scope[f"right.{a}"] = (1, a)
+        for name in predicate_attrs(join.predicate):
+            try:
+                side, a = _lookup_attr(scope, name)
+            except KeyError:
+                return None
+            (need_left if side == 0 else need_right).add(a)
+        return need_left, need_right
+
+
+def _value_kinds(
+    node: RAType, rels: Dict[str, Relation], kinds: Callable[[RAType], Dict[str, Optional[str]]]
+) -> Dict[str, Optional[str]]:
+    """What the values of each attribute of ``node``'s result may be, from base column statistics.
+
+    Operators only ever copy base values, so an attribute holds a subset of
+    the values of the base columns it comes from: ``"num"`` (numbers, no
+    NaN), ``"str"``, ``"empty"`` (no values at all) or None (anything else:
+    nulls, booleans, mixed types, NaN).
+    """
+    if isinstance(node, RARef):
+        columns = table_stats(rels[node.name]).columns
+        return {a: _stats_kind(columns[a]) for a in rels[node.name].header}
+    if isinstance(node, RASelect):
+        return kinds(node.child)
+    if isinstance(node, RAProject):
+        child = kinds(node.child)
+        return {a: child[a] for a in node.attrs}
+    if isinstance(node, RAJoin):
+        left, right = kinds(node.left), kinds(node.right)
+        out = dict(left)
+        if node.predicate is None:
+            # Shared attributes keep the left row's value.
+            for a, k in right.items():
+                out.setdefault(a, k)
+            return out
+        lh, rh = list(left), list(right)
+        _, right_out = theta_join_header(lh, rh)
+        for a, o in zip(rh, right_out):
+            out[o] = right[a]
+        return out
+    if isinstance(node, RASetOp):
+        left, right = kinds(node.left), kinds(node.right)
+        if node.op != 'union':
+            return left
+        return {a: _merge_kinds(k, right.get(a)) for a, k in left.items()}
+    raise ValueError(f"Unsupported RA node: {node}")
+
+
+def _stats_kind(s: ColumnStats) -> Optional[str]:
+    if s.distinct == 0:
+        return "empty"
+    if s.nulls or s.min is None:
+        return None
+    return "str" if isinstance(s.min, str) else "num"
+
+
+def _merge_kinds(a: Optional[str], b: Optional[str]) -> Optional[str]:
+    if a == "empty":
+        return b
+    if b == "empty":
+        return a
+    return a if a == b else None
+
+
+def _cannot_raise(pred: PredNode, kinds: Dict[str, Optional[str]]) -> bool:
+    return _checked_kind(pred, kinds) is not _RAISES
+
+
+# _checked_kind's result for an expression that may raise.
+_RAISES = object()
+
+
+def _checked_kind(node: PredNode, kinds: Dict[str, Optional[str]]) -> Any:
+    """The value kind of ``node`` (see ``_value_kinds``), or ``_RAISES`` if evaluating it may raise."""
+    if isinstance(node, PConst):
+        v = node.value
+        if isinstance(v, str):
+            return "str"
+        if isinstance(v, (int, float)) and not isinstance(v, bool) and v == v:
+            return "num"
+        return None
+    if isinstance(node, PAttr):
+        return kinds.get(node.name)
+    if isinstance(node, PParam):
+        # Bound after optimizing: could be any value.
+        return None
+    if isinstance(node, PUnary):
+        inner = _checked_kind(node.expr, kinds)
+        if inner is _RAISES or (node.op == 'neg' and inner not in ("num", "empty")):
+            return _RAISES
+        # not gives a bool; negating a number gives a number.
+        return None if node.op == 'not' else "num"
+    if isinstance(node, PBinary):
+        left, right = _checked_kind(node.left, kinds), _checked_kind(node.right, kinds)
+        if left is _RAISES or right is _RAISES:
+            return _RAISES
+        if node.op in ('<', '<=', '>', '>=') and not ("empty" in (left, right) or left == right is not None):
+            return _RAISES
+        return None
+    return _RAISES
+
+
+class _Plan:
+    def __init__(self, node: RAType, est: Estimate, header: List[str], cost: float):
+        self.node = node
+        self.est = est
+        self.header = header
+        self.cost = cost  # summed estimated rows of the joins inside
+
+
+class _JoinOrderer:
+    def __init__(self, rels: Dict[str, Relation]):
+        self.rels = rels
+        self.estimator = Estimator(rels)
+
+    def reorder(self, node: RAType) -> RAType:
+        if isinstance(node, RAJoin) and node.predicate is None:
+            return self.reorder_chain(node)
+        if isinstance(node, RASelect):
+            return RASelect(predicate=node.predicate, child=self.reorder(node.child))
+        if isinstance(node, RAProject):
+            return RAProject(attrs=node.attrs, child=self.reorder(node.child))
+        if isinstance(node, RAJoin) and not uses_relation_names(node.predicate):
+            return RAJoin(left=self.reorder(node.left), right=self.reorder(node.right), predicate=node.predicate)
+        if isinstance(node, RASetOp):
+            return RASetOp(op=node.op, left=self.reorder(node.left), right=self.reorder(node.right))
+        return node
+
+    def reorder_chain(self, node: RAJoin) -> RAType:
+        leaves = [self.leaf(n) for n in _chain_inputs(node)]
+        original = leaves[0]
+        for p in leaves[1:]:
+            original = self.join(original, p)
+        if len(leaves) < 3:
+            return original.node
+        best = self.dp(leaves) if len(leaves) <= DP_LIMIT else self.greedy(leaves)
+        if best.cost >= original.cost:
+            return original.node
+        if best.header != original.header:
+            return RAProject(attrs=original.header, child=best.node)
+        return best.node
+
+    def leaf(self, node: RAType) -> _Plan:
+        node = self.reorder(node)
+        return _Plan(node, self.estimator.estimate(node), output_schema(node, self.rels)[1], 0.0)
+
+    def join(self, left: _Plan, right: _Plan) -> _Plan:
+        est = self.estimator.join(left.est, left.header, right.est, right.header, None)
+        return _Plan(RAJoin(left=left.node, right=right.node, predicate=None), est,
+                     natural_join_header(left.header, right.header), left.cost + right.cost + est.rows)
+
+    def dp(self, leaves: List[_Plan]) -> _Plan:
+        """Cheapest bushy join tree over all subsets of ``leaves``."""
+        best: Dict[int, _Plan] = {1 << i: p for i, p in enumerate(leaves)}
+        full = (1 << len(leaves)) - 1
+        for mask in range(1, full + 1):
+            if mask in best:
+                continue
+            sub = (mask - 1) & mask
+            while sub:
+                other = mask ^ sub
+                if sub in best and other in best:
+                    cand = self.join(best[sub], best[other])
+                    if mask not in best or cand.cost < best[mask].cost:
+                        best[mask] = cand
+                sub = (sub - 1) & mask
+        return best[full]
+
+    def greedy(self, leaves: List[_Plan]) -> _Plan:
+        """Repeatedly join the pair with the smallest estimated result."""
+        plans = list(leaves)
+        while len(plans) > 1:
+            cand, i, j = min(
+                ((self.join(plans[i], plans[j]), i, j) for i in range(len(plans)) for j in range(len(plans)) if i != j),
+                key=lambda t: t[0].est.rows,
+            )
+            plans = [p for k, p in enumerate(plans) if k not in (i, j)] + [cand]
+        return plans[0]
+
+
+def _chain_inputs(node: RAType) -> List[RAType]:
+    if isinstance(node, RAJoin) and node.predicate is None:
+        return _chain_inputs(node.left) + _chain_inputs(node.right)
+    return [node]
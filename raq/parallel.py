@@ -0,0 +1,420 @@
+"""Process-parallel evaluation.
+
+Workers are forked from the evaluating process after the data they need
+(the relations, or an operator's inputs) is published in ``_SHARED``, so
+they inherit it copy-on-write; only results travel back (pickled). Where
+fork is unavailable everything runs serially.
+
+Three kinds of parallelism are used:
+
+* inter-query: ``run_queries`` runs independent queries in different
+  workers and hands their results back in query order;
+* inter-operator: independent subtrees (the inputs of a join or set
+  operation) are evaluated in different workers;
+* intra-operator: a large selection is split into row ranges, and a large
+  equi-join hash-partitions both inputs on the join key so each worker
+  joins one partition pair.
+"""
+
+from __future__ import annotations
+
+import gc
+import multiprocessing
+import os
+from array import array
+from concurrent.futures import Future, ProcessPoolExecutor
+from contextlib import contextmanager
+from operator import itemgetter
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from .columnar import ColumnarRows
+from .datatypes import Relation
+from .external import FileRows
+from .executor import (
+    JOIN_STRATEGIES,
+    _compile_residual,
+    _equi_keys,
+    _evaluate,
+    _join_indexes,
+    _join_scope,
+    _key_func,
+    _matchable,
+    _Memo,
+    _pair_resolver,
+    _select_columnar,
+    evaluate,
+)
+from .indexes import rows_at
+from .predicate import PredNode, compile_predicate, row_resolver, split_conjuncts
+from .ra_ast import RAType, RARef, RASelect, RAProject, RAJoin, RASetOp, structural_key
+from .ra_parser import parse_query
+from .schema import natural_join_header, theta_join_header
+from .stats import Estimator
+
+# Subtrees estimated to touch fewer rows than this, and operators over
+# fewer input rows than this, run in the caller.
+PARALLEL_MIN_ROWS = 50_000
+
+# Data visible to forked workers; set only while a pool is open.
+_SHARED: Dict[str, Any] = {}
+
+
+def fork_available() -> bool:
+    return "fork" in multiprocessing.get_all_start_methods()
+
+
+def default_workers() -> int:
+    return os.cpu_count() or 1
+
+
+@contextmanager
+def fork_pool(workers: int, **shared: Any) -> Iterator[ProcessPoolExecutor]:
+    """A process pool whose workers see ``shared`` (as ``_SHARED``) through fork inheritance."""
+    global _SHARED
+    _SHARED = shared
+    try:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("fork")) as pool:
+            yield pool
+    finally:
+        _SHARED = {}
+
+
+def _pack(rel: Relation) -> Tuple[str, List[str], Any, bool]:
+    # Statistics and indexes stay behind; only the result itself is pickled.
+    return rel.name, rel.header, rel.rows, rel.distinct
+
+
+def _unpack(packed: Tuple[str, List[str], Any, bool]) -> Relation:
+    name, header, rows, distinct = packed
+    return Relation(name, header, rows, distinct)
+
+
+def _evaluate_task(node: RAType, join_strategy: str) -> Tuple[str, List[str], Any, bool]:
+    return _pack(evaluate(node, _SHARED["rels"], join_strategy))
+
+
+def evaluate_parallel(
+    node: RAType,
+    rels: Dict[str, Relation],
+    join_strategy: str = "auto",
+    workers: Optional[int] = None,
+    min_rows: int = PARALLEL_MIN_ROWS,
+) -> Relation:
+    """Evaluate ``node`` with independent subtrees running in worker processes.
+
+    The two inputs of a join or set operation are evaluated concurrently
+    when both are estimated to touch at least ``min_rows`` rows; up to
+    ``workers`` subtrees run at once and the operators above them run in
+    the caller. Results, order and names match ``evaluate``.
+    """
+    if join_strategy not in JOIN_STRATEGIES:
+        raise ValueError(f"Unknown join strategy: {join_strategy}")
+    workers = workers or default_workers()
+    if workers < 2 or not fork_available():
+        return evaluate(node, rels, join_strategy)
+    try:
+        estimator = Estimator(rels)
+        estimator.estimate(node)
+    except (KeyError, ValueError):
+        # Let the serial evaluator report the error.
+        return evaluate(node, rels, join_strategy)
+
+    memo = _Memo()
+    tasks = _split(node, workers, estimator, min_rows)
+    if len(tasks) > 1:
+        with fork_pool(min(workers, len(tasks)), rels=rels) as pool:
+            futures: List[Future] = [pool.submit(_evaluate_task, t, join_strategy) for t in tasks]
+            # Collect in submission (left-to-right) order so the first failing
+            # subtree is reported, as in serial evaluation.
+            for t, f in zip(tasks, futures):
+                memo[structural_key(t)] = _unpack(f.result())
+    res = _Caller(rels, join_strategy, workers, min_rows, memo).run(node)
+    # As in evaluate: a bare file-backed relation may hold duplicates.
+    res.dedup()
+    return res
+
+
+def run_queries(
+    queries: Sequence[str],
+    rels: Dict[str, Relation],
+    jobs: Optional[int] = None,
+    run: Callable[[RAType, Dict[str, Relation]], Relation] = evaluate,
+    render: Optional[Callable[[Relation], Any]] = None,
+) -> Iterator[Any]:
+    """Parse and ``run`` each of ``queries`` in up to ``jobs`` worker processes.
+
+    Yields ``render(result)`` (or the result itself, without indexes and
+    statistics) for each query in query order, as soon as it and every
+    query before it are done; workers send back only what ``render``
+    returns. A query that fails raises its error when its turn comes.
+    Workers inherit ``rels``, ``run`` and ``render`` through fork; without
+    fork, or with fewer than two jobs, the queries run here one by one.
+    """
+    jobs = jobs or default_workers()
+    if jobs < 2 or len(queries) < 2 or not fork_available():
+        for q in queries:
+            res = run(parse_query(q), rels)
+            yield res if render is None else render(res)
+        return
+    # Keep the workers' collections off the inherited objects, so their
+    # pages stay shared with this process.
+    gc.freeze()
+    try:
+        with fork_pool(min(jobs, len(queries)), queries=queries, rels=rels, run=run, render=render) as pool:
+            for out in pool.map(_query_task, range(len(queries))):
+                yield _unpack(out) if render is None else out
+    finally:
+        gc.unfreeze()
+
+
+def _query_task(i: int) -> Any:
+    res = _SHARED["run"](parse_query(_SHARED["queries"][i]), _SHARED["rels"])
+    render = _SHARED["render"]
+    return _pack(res) if render is None else render(res)
+
+
+class _Caller:
+    """Evaluates the operators above the task cut, partitioning large ones.
+
+    Every result goes into the shared per-query memo, so operators that are
+    not partitioned are handed to the serial evaluator with their inputs
+    already computed.
+    """
+
+    def __init__(self, rels: Dict[str, Relation], join_strategy: str, workers: int, min_rows: int,
+                 memo: _Memo):
+        self.rels = rels
+        self.join_strategy = join_strategy
+        self.workers = workers
+        self.min_rows = min_rows
+        self.memo = memo
+        self.keys: Dict[int, Any] = {}
+
+    def run(self, node: RAType) -> Relation:
+        key = structural_key(node, self.keys)
+        if key in self.memo:
+            return self.memo[key]
+        res = None
+        if isinstance(node, RASelect):
+            child = self.run(node.child)
+            if _in_memory(child) and len(child.rows) >= self.min_rows:
+                res = partitioned_select(child, node.predicate, self.workers)
+        elif isinstance(node, RAProject):
+            self.run(node.child)
+        elif isinstance(node, (RAJoin, RASetOp)):
+            left = self.run(node.left)
+            right = self.run(node.right)
+            if (isinstance(node, RAJoin) and self.join_strategy != "nested_loop"
+                    and _in_memory(left) and _in_memory(right)
+                    and len(left.rows) + len(right.rows) >= self.min_rows):
+                res = partitioned_join(left, right, node.predicate, self.workers)
+        if res is None:
+            res = _evaluate(node, self.rels, self.join_strategy, self.memo, self.keys)
+        self.memo[key] = res
+        return res
+
+
+def _in_memory(rel: Relation) -> bool:
+    # File-backed rows are streamed by the serial operators; partitioning
+    # them would read the whole file into the caller first.
+    return not isinstance(rel.rows, FileRows)
+
+
+def _split(node: RAType, budget: int, estimator: Estimator, min_rows: int) -> List[RAType]:
+    """Cut the tree into at most ``budget`` independent subtrees to run as tasks.
+
+    Operators above the cut run in the caller. A subtree that would yield
+    a single task runs whole in one worker, so selections and projections
+    shrink its result before it is sent back; relation references cost
+    nothing in the caller and never become tasks.
+    """
+    if isinstance(node, RARef):
+        return []
+    if isinstance(node, (RASelect, RAProject)):
+        tasks = _split(node.child, budget, estimator, min_rows)
+    elif isinstance(node, (RAJoin, RASetOp)):
+        if isinstance(node.left, RARef) or isinstance(node.right, RARef):
+            tasks = _split(node.left, budget, estimator, min_rows) + _split(node.right, budget, estimator, min_rows)
+        elif budget >= 2 and min(_work(node.left, estimator), _work(node.right, estimator)) >= min_rows:
+            half = budget // 2
+            tasks = _split(node.left, half, estimator, min_rows) + _split(node.right, budget - half, estimator, min_rows)
+        else:
+            tasks = []
+    else:
+        tasks = []
+    return tasks if len(tasks) > 1 else [node]
+
+
+def _work(node: RAType, estimator: Estimator) -> float:
+    """Estimated rows read and produced by every operator in ``node``."""
+    if isinstance(node, (RASelect, RAProject)):
+        return estimator.rows(node) + _work(node.child, estimator)
+    if isinstance(node, (RAJoin, RASetOp)):
+        return estimator.rows(node) + _work(node.left, estimator) + _work(node.right, estimator)
+    return estimator.rows(node)
+
+
+# -- partitioned selection ----------------------------------------------------
+
+
+def partitioned_select(child: Relation, predicate: PredNode, workers: int) -> Optional[Relation]:
+    """Range-partition ``child`` and evaluate ``predicate`` on each range in a worker.
+
+    Workers send back the positions of matching rows, so the result shares
+    ``child``'s rows in scan order. Selections the serial evaluator answers
+    without a row loop (vectorized columnar masks) run in the caller;
+    indexed inputs are left to the serial evaluator (returns None).
+    """
+    resolve = row_resolver(child.header)
+    compile_predicate(predicate, resolve)  # report unknown attributes here, as evaluate does
+    rows = child.rows
+    if child.indexes or not len(rows):
+        return None
+    selected = _select_columnar(predicate, rows, resolve) if isinstance(rows, ColumnarRows) else None
+    if selected is None:
+        bounds = _ranges(len(rows), workers)
+        with fork_pool(len(bounds), rows=rows, header=child.header, predicate=predicate) as pool:
+            futures = [pool.submit(_select_range, lo, hi) for lo, hi in bounds]
+            positions = array('q')
+            for f in futures:
+                positions.extend(f.result())
+        selected = rows_at(rows, positions)
+    res = Relation(name=f"Select({child.name})", header=list(child.header), rows=selected, distinct=child.distinct)
+    res.dedup()
+    return res
+
+
+def _ranges(n: int, parts: int) -> List[Tuple[int, int]]:
+    step = max(-(-n // parts), 1)
+    return [(lo, min(lo + step, n)) for lo in range(0, n, step)]
+
+
+def _select_range(lo: int, hi: int) -> array:
+    rows = _SHARED["rows"]
+    pred = compile_predicate(_SHARED["predicate"], row_resolver(_SHARED["header"]))
+    return array('q', (i for i in range(lo, hi) if pred(rows[i])))
+
+
+# -- partitioned hash join ----------------------------------------------------
+
+
+def partitioned_join(left: Relation, right: Relation, predicate: Optional[PredNode], workers: int) -> Optional[Relation]:
+    """Hash-partition both inputs on the join key and join the partitions in workers.
+
+    Natural joins partition on the shared attributes and theta joins on
+    their equality conjuncts (the other conjuncts are checked in the
+    workers). Workers return matching (left, right) positions; the caller
+    merges them back into left-major order and builds the rows, so the
+    result is the one ``evaluate`` produces. Equal output rows always have
+    equal keys, so duplicates are removed per partition. Returns None for
+    joins without keys, or when an index already serves as the build side.
+    """
+    if predicate is None:
+        left_keys = right_keys = [a for a in left.header if a in right.header]
+        residual: List[PredNode] = []
+        out_header = natural_join_header(left.header, right.header)
+        right_out = [a for a in right.header if a not in left.header]
+        right_attrs = right_out
+    else:
+        scope = _join_scope(left, right)
+        compile_predicate(predicate, _pair_resolver(scope))  # report unknown attributes here
+        left_keys, right_keys, residual = _equi_keys(scope, split_conjuncts(predicate))
+        out_header, right_out = theta_join_header(left.header, right.header)
+        right_attrs = list(right.header)
+    if not left_keys or any(_join_indexes(left, right, left_keys, right_keys)):
+        return None
+
+    distinct = left.distinct and right.distinct and len(set(out_header)) == len(out_header)
+    # With unique output names the output tuple is the left tuple plus the
+    # right attributes copied over, so it can be computed in the workers.
+    dedup_in_workers = not distinct and len(set(out_header)) == len(out_header)
+    shared = dict(
+        left=left.rows, right=right.rows, left_keys=left_keys, right_keys=right_keys,
+        residual=residual, scope=_join_scope(left, right) if residual else None,
+        dedup=dedup_in_workers, left_header=list(left.header), right_attrs=right_attrs,
+    )
+    parts = workers
+    with fork_pool(workers, **shared) as pool:
+        left_chunks = [pool.submit(_partition_range, "left", lo, hi, parts) for lo, hi in _ranges(len(left.rows), parts)]
+        right_chunks = [pool.submit(_partition_range, "right", lo, hi, parts) for lo, hi in _ranges(len(right.rows), parts)]
+        left_parts = _gather_partitions(left_chunks, parts)
+        right_parts = _gather_partitions(right_chunks, parts)
+        futures = [pool.submit(_join_partition, left_parts[p], right_parts[p]) for p in range(parts)]
+        pairs: List[Tuple[int, int]] = []
+        for f in futures:
+            lpos, rpos = f.result()
+            pairs.extend(zip(lpos, rpos))
+    # Each partition is in left-major order and a left row's matches all sit
+    # in one partition, so a stable sort on the left position restores the
+    # serial order (Timsort merges the sorted runs).
+    pairs.sort(key=itemgetter(0))
+
+    lrows, rrows = left.rows, right.rows
+    out_rows: List[Dict[str, Any]] = []
+    if predicate is None:
+        for li, ri in pairs:
+            merged = dict(lrows[li])
+            rr = rrows[ri]
+            for a in right_out:
+                merged[a] = rr[a]
+            out_rows.append(merged)
+    else:
+        left_header = left.header
+        renamed = list(zip(right.header, right_out))
+        for li, ri in pairs:
+            rl, rr = lrows[li], rrows[ri]
+            merged = {a: rl[a] for a in left_header}
+            for a, key in renamed:
+                merged[key] = rr[a]
+            out_rows.append(merged)
+    res = Relation(name=f"Join({left.name},{right.name})", header=out_header, rows=out_rows,
+                   distinct=distinct or dedup_in_workers)
+    res.dedup()
+    return res
+
+
+def _partition_range(side: str, lo: int, hi: int, parts: int) -> List[array]:
+    rows = _SHARED[side]
+    key = _key_func(_SHARED["left_keys" if side == "left" else "right_keys"])
+    out = [array('q') for _ in range(parts)]
+    for i in range(lo, hi):
+        out[hash(key(rows[i])) % parts].append(i)
+    return out
+
+
+def _gather_partitions(chunks: List[Future], parts: int) -> List[array]:
+    merged = [array('q') for _ in range(parts)]
+    for f in chunks:
+        for p, positions in enumerate(f.result()):
+            merged[p].extend(positions)
+    return merged
+
+
+def _join_partition(left_positions: array, right_positions: array) -> Tuple[array, array]:
+    lrows, rrows = _SHARED["left"], _SHARED["right"]
+    lkey, rkey = _key_func(_SHARED["left_keys"]), _key_func(_SHARED["right_keys"])
+    residual = None
+    if _SHARED["residual"]:
+        residual = _compile_residual(_SHARED["residual"], _pair_resolver(_SHARED["scope"]))
+    table: Dict[Any, List[int]] = {}
+    for i in right_positions:
+        k = rkey(rrows[i])
+        if _matchable(k):
+            table.setdefault(k, []).append(i)
+    out_l, out_r = array('q'), array('q')
+    seen = set() if _SHARED["dedup"] else None
+    left_header, right_attrs = _SHARED["left_header"], _SHARED["right_attrs"]
+    for li in left_positions:
+        rl = lrows[li]
+        for ri in table.get(lkey(rl), ()):
+            rr = rrows[ri]
+            if residual is not None and not residual((rl, rr)):
+                continue
+            if seen is not None:
+                t = tuple(rl[a] for a in left_header) + tuple(rr[a] for a in right_attrs)
+                if t in seen:
+                    continue
+                seen.add(t)
+            out_l.append(li)
+            out_r.append(ri)
+    return out_l, out_r
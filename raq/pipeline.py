@@ -0,0 +1,256 @@
+from __future__ import annotations
+
+from itertools import repeat
+from typing import Any, Dict, Iterator, List
+
+from .columnar import ColumnarRows
+from .datatypes import Relation
+from .external import FileRows
+from .indexes import hash_index
+from .executor import (
+    JOIN_STRATEGIES,
+    _join_scope,
+    _key_func,
+    _matchable,
+    _pair_resolver,
+    _select_columnar,
+    _select_indexed,
+    _theta_matcher,
+)
+from .predicate import PredNode, compile_predicate, row_resolver
+from .ra_ast import RAType, RARef, RASelect, RAProject, RAJoin, RASetOp
+from .schema import SET_OP_NAMES, natural_join_header, theta_join_header
+
+Row = Dict[str, Any]
+
+
+class Operator:
+    """A streaming (Volcano-style) operator.
+
+    ``name``, ``header`` and ``distinct`` describe the output and are known
+    before any row is produced; iterating the operator pulls rows from its
+    children one at a time. Each iteration restarts the operator.
+    """
+
+    def __init__(self, name: str, header: List[str], distinct: bool = False):
+        self.name = name
+        self.header = header
+        self.distinct = distinct
+
+    def __iter__(self) -> Iterator[Row]:
+        raise NotImplementedError
+
+
+class Scan(Operator):
+    def __init__(self, rel: Relation, name: str):
+        super().__init__(name, list(rel.header), rel.distinct)
+        self.rel = rel
+
+    def __iter__(self) -> Iterator[Row]:
+        return iter(self.rel.rows)
+
+
+class Distinct(Operator):
+    """Drop repeated rows, keeping first occurrences. Holds the seen-set."""
+
+    def __init__(self, child: Operator):
+        super().__init__(child.name, child.header, True)
+        self.child = child
+
+    def __iter__(self) -> Iterator[Row]:
+        header = self.header
+        seen: set = set()
+        for r in self.child:
+            t = tuple(r.get(c) for c in header)
+            if t not in seen:
+                seen.add(t)
+                yield r
+
+
+class Filter(Operator):
+    def __init__(self, child: Operator, predicate: PredNode):
+        super().__init__(f"Select({child.name})", child.header, child.distinct)
+        self.child = child
+        self.predicate = predicate
+        self.resolve = row_resolver(child.header)
+        self.pred = compile_predicate(predicate, self.resolve)
+
+    def __iter__(self) -> Iterator[Row]:
+        child = self.child
+        if isinstance(child, Scan) and child.rel.indexes:
+            selected = _select_indexed(self.predicate, child.rel, self.resolve)
+            if selected is not None:
+                return iter(selected)
+        if isinstance(child, Scan) and isinstance(child.rel.rows, ColumnarRows):
+            # Base column storage is already in memory: filter it with one mask.
+            selected = _select_columnar(self.predicate, child.rel.rows, self.resolve)
+            if selected is not None:
+                return iter(selected)
+        if isinstance(child, Scan) and isinstance(child.rel.rows, FileRows):
+            return child.rel.rows.select(self.predicate)
+        pred = self.pred
+        return (r for r in child if pred(r))
+
+
+class Project(Operator):
+    def __init__(self, child: Operator, attrs: List[str]):
+        self.passthrough = list(attrs) == child.header
+        super().__init__(f"Project({child.name})", list(attrs), child.distinct and self.passthrough)
+        self.child = child
+
+    def __iter__(self) -> Iterator[Row]:
+        attrs = self.header
+        if self.passthrough:
+            return iter(self.child)
+        if isinstance(self.child, Scan) and isinstance(self.child.rel.rows, FileRows):
+            return map(dict, map(zip, repeat(attrs), self.child.rel.rows.scan(attrs)))
+        return ({a: r[a] for a in attrs} for r in self.child)
+
+
+class NaturalJoin(Operator):
+    """Hash join building on the right input and streaming the left one.
+
+    A hash index on the join attribute of a scanned right input is used
+    instead of building a table.
+    """
+
+    def __init__(self, left: Operator, right: Operator, join_strategy: str):
+        super().__init__(f"Join({left.name},{right.name})", natural_join_header(left.header, right.header),
+                         left.distinct and right.distinct)
+        self.left = left
+        self.right = right
+        self.join_strategy = join_strategy
+
+    def __iter__(self) -> Iterator[Row]:
+        common = [a for a in self.left.header if a in self.right.header]
+        right_only = [a for a in self.right.header if a not in common]
+        index = None
+        if len(common) == 1 and self.join_strategy != "nested_loop" and isinstance(self.right, Scan):
+            index = hash_index(self.right.rel, common[0])
+        right_rows = self.right.rel.rows if index is not None else list(self.right)
+        if index is not None:
+            attr = common[0]
+            matches = lambda rl: [right_rows[i] for i in index.get(rl[attr], ())]
+        elif not common:
+            matches = lambda rl: right_rows
+        elif self.join_strategy == "nested_loop":
+            matches = lambda rl: [rr for rr in right_rows if all(rl[a] == rr[a] for a in common)]
+        else:
+            key = _key_func(common)
+            table: Dict[Any, List[Row]] = {}
+            for rr in right_rows:
+                k = key(rr)
+                if _matchable(k):
+                    table.setdefault(k, []).append(rr)
+            matches = lambda rl: table.get(key(rl), ())
+        for rl in self.left:
+            for rr in matches(rl):
+                merged = dict(rl)
+                for a in right_only:
+                    merged[a] = rr[a]
+                yield merged
+
+
+class ThetaJoin(Operator):
+    """Theta join preparing the right input once (hash, band or scan) and streaming the left."""
+
+    def __init__(self, left: Operator, right: Operator, predicate: PredNode, join_strategy: str):
+        header, self.right_out = theta_join_header(left.header, right.header)
+        super().__init__(f"Join({left.name},{right.name})", header,
+                         left.distinct and right.distinct and len(set(header)) == len(header))
+        self.left = left
+        self.right = right
+        self.predicate = predicate
+        self.join_strategy = join_strategy
+        self.scope = _join_scope(left, right)
+        # Resolve names now so unknown attributes fail before any row is read.
+        compile_predicate(predicate, _pair_resolver(self.scope))
+
+    def __iter__(self) -> Iterator[Row]:
+        match = _theta_matcher(self.scope, list(self.right), self.predicate, self.join_strategy)
+        left_header = self.left.header
+        pairs = list(zip(self.right.header, self.right_out))
+        for rl in self.left:
+            for rr in match(rl):
+                merged = {a: rl[a] for a in left_header}
+                for a, key in pairs:
+                    merged[key] = rr[a]
+                yield merged
+
+
+class SetOp(Operator):
+    def __init__(self, op: str, left: Operator, right: Operator):
+        if set(left.header) != set(right.header):
+            raise ValueError(f"Set operation requires union-compatible schemas, got {left.header} vs {right.header}")
+        if op not in SET_OP_NAMES:
+            raise ValueError(f"Unknown set operation: {op}")
+        super().__init__(f"{SET_OP_NAMES[op]}({left.name},{right.name})", list(left.header),
+                         op != 'union' and left.distinct)
+        self.op = op
+        self.left = left
+        self.right = right
+
+    def __iter__(self) -> Iterator[Row]:
+        if self.op == 'union':
+            yield from self.left
+            yield from self.right
+            return
+        header = self.header
+        right_set = {tuple(r[c] for c in header) for r in self.right}
+        keep = self.op == 'intersect'
+        for r in self.left:
+            if (tuple(r[c] for c in header) in right_set) == keep:
+                yield r
+
+
+def compile_pipeline(node: RAType, rels: Dict[str, Relation], join_strategy: str = "auto") -> Operator:
+    """Compile an RA tree into a tree of streaming operators.
+
+    Rows flow to the parent as they are produced; only hash/sort builds,
+    set-operation right sides and duplicate elimination hold state. The
+    rows, their order and the result name match ``evaluate``.
+    """
+    if join_strategy not in JOIN_STRATEGIES:
+        raise ValueError(f"Unknown join strategy: {join_strategy}")
+    op = _compile(node, rels, join_strategy)
+    return op if op.distinct else Distinct(op)
+
+
+def _compile(node: RAType, rels: Dict[str, Relation], join_strategy: str) -> Operator:
+    def child(n: RAType) -> Operator:
+        return compile_pipeline(n, rels, join_strategy)
+
+    def source(n: RAType) -> Operator:
+        # A file-backed relation is read by the selection or projection above
+        # it (only the columns they need are parsed); their output is not
+        # duplicate-free, so the Distinct moves above them.
+        if isinstance(n, RARef) and n.name in rels and isinstance(rels[n.name].rows, FileRows):
+            return _compile(n, rels, join_strategy)
+        return child(n)
+
+    if isinstance(node, RARef):
+        if node.name not in rels:
+            raise KeyError(f"Unknown relation: {node.name}")
+        return Scan(rels[node.name], node.name)
+    if isinstance(node, RASelect):
+        return Filter(source(node.child), node.predicate)
+    if isinstance(node, RAProject):
+        c = source(node.child)
+        for a in node.attrs:
+            if a not in c.header:
+                raise KeyError(f"Projection attribute '{a}' not in schema {c.header}")
+        return Project(c, node.attrs)
+    if isinstance(node, RAJoin):
+        left, right = child(node.left), child(node.right)
+        if node.predicate is None:
+            return NaturalJoin(left, right, join_strategy)
+        return ThetaJoin(left, right, node.predicate, join_strategy)
+    if isinstance(node, RASetOp):
+        return SetOp(node.op, child(node.left), child(node.right))
+    raise ValueError(f"Unsupported RA node: {node}")
+
+
+def evaluate_pipelined(node: RAType, rels: Dict[str, Relation], join_strategy: str = "auto") -> Relation:
+    """Run ``node`` through the streaming engine and collect the result."""
+    op = compile_pipeline(node, rels, join_strategy)
+    return Relation(name=op.name, header=list(op.header), rows=list(op), distinct=True)
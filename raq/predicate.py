@@ -1,7 +1,8 @@
 from __future__ import annotations
 
+import operator
 from dataclasses import dataclass
-from typing import Any, Optional
+from typing import Any, Callable, Mapping, Optional
 
 from .tokens import TOKEN
 
@@ -20,6 +21,11 @@ class PAttr(PredNode):
     name: str
 
 
+@dataclass
+class PParam(PredNode):
+    name: str  # '$1' (bound by position, from 1) or ':name'
+
+
 @dataclass
 class PUnary(PredNode):
     op: str  # 'not' | 'neg'
@@ -115,6 +121,10 @@ class PredParser:
             return PConst(int(tval))
         if ttype == 'STRING':
             return PConst(tval)
+        if ttype == 'PARAM':
+            if tval[0] == '$' and int(tval[1:]) < 1:
+                raise ValueError(f"Parameter positions start at $1, got {tval}")
+            return PParam(tval)
         if ttype == 'KW' and tval in ('true', 'false', 'null'):
             return PConst(True if tval == 'true' else False if tval == 'false' else None)
         if ttype == 'IDENT':
@@ -131,6 +141,34 @@ class PredParser:
         raise ValueError(f"Invalid token in predicate: {tok}")
 
 
+def predicate_attrs(pred: PredNode) -> set[str]:
+    """Names of all attributes a predicate reads."""
+    if isinstance(pred, PAttr):
+        return {pred.name}
+    if isinstance(pred, PCompiled):
+        return predicate_attrs(pred.predicate)
+    if isinstance(pred, PUnary):
+        return predicate_attrs(pred.expr)
+    if isinstance(pred, PBinary):
+        return predicate_attrs(pred.left) | predicate_attrs(pred.right)
+    return set()
+
+
+def split_conjuncts(pred: PredNode) -> list[PredNode]:
+    if isinstance(pred, PBinary) and pred.op == 'and':
+        return split_conjuncts(pred.left) + split_conjuncts(pred.right)
+    return [pred]
+
+
+def join_conjuncts(conjuncts: list[PredNode]) -> Optional[PredNode]:
+    if not conjuncts:
+        return None
+    node = conjuncts[0]
+    for c in conjuncts[1:]:
+        node = PBinary(op='and', left=node, right=c)
+    return node
+
+
 def _lookup_attr(ctx: dict[str, Any], name: str) -> Any:
     if name in ctx:
         return ctx[name]
@@ -144,6 +182,10 @@ def _lookup_attr(ctx: dict[str, Any], name: str) -> Any:
 def eval_predicate(pred: PredNode, ctx: dict[str, Any]) -> bool:
     if isinstance(pred, PConst):
         return bool(pred.value)
+    if isinstance(pred, PCompiled):
+        return compile_predicate(pred.predicate, row_resolver(list(ctx)), pred.params)(ctx)
+    if isinstance(pred, PParam):
+        raise ValueError(f"Unbound parameter {pred.name}; run the query through prepare()")
     if isinstance(pred, PAttr):
         val = _lookup_attr(ctx, pred.name)
         return bool(val)
@@ -197,3 +239,141 @@ def eval_value(node: PredNode, ctx: dict[str, Any]) -> Any:
             except Exception as e:
                 raise ValueError("Unary minus requires a numeric value") from e
     return eval_predicate(node, ctx)
+
+
+Getter = Callable[[Any], Any]
+Resolver = Callable[[str], Getter]
+
+_COMPARE_OPS: dict[str, Callable[[Any, Any], Any]] = {
+    '==': operator.eq,
+    '=': operator.eq,
+    '!=': operator.ne,
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge,
+}
+
+
+class RowResolver:
+    """Resolve attribute names against a single row schema to dict getters."""
+
+    def __init__(self, header: list[str]):
+        self.header = tuple(header)
+        self._ctx = {a: a for a in header}
+
+    def __call__(self, name: str) -> Getter:
+        return operator.itemgetter(_lookup_attr(self._ctx, name))
+
+
+def row_resolver(header: list[str]) -> Resolver:
+    """Resolve attribute names against a single row schema to dict getters."""
+    return RowResolver(header)
+
+
+class PCompiled(PredNode):
+    """A predicate compiled once for rows of ``header``; placeholders read ``params[name]`` per row.
+
+    Made by ``prepare``, which fills ``params`` before each execution. Not a
+    dataclass, so plan walkers treat it as a leaf and ``structural_key``
+    keys it by identity.
+    """
+
+    def __init__(self, predicate: PredNode, header: list[str], params: Mapping[str, Any]):
+        self.predicate = predicate
+        self.header = tuple(header)
+        self.params = params
+        self.check = compile_predicate(predicate, row_resolver(header), params)
+
+    def __repr__(self) -> str:
+        return f"PCompiled({self.predicate!r})"
+
+
+def compile_predicate(
+    pred: PredNode, resolve: Resolver, params: Optional[Mapping[str, Any]] = None
+) -> Callable[[Any], bool]:
+    """Compile a predicate tree into a closure over a row.
+
+    ``resolve`` maps attribute names to getters once, so unknown attributes
+    raise here rather than on the first row. The closure has the same
+    semantics as ``eval_predicate``, including and/or short-circuiting.
+    Placeholders read their value from ``params`` on every call; without
+    ``params`` they raise.
+    """
+    if isinstance(pred, PConst):
+        b = bool(pred.value)
+        return lambda row: b
+    if isinstance(pred, PCompiled):
+        if isinstance(resolve, RowResolver) and resolve.header == pred.header:
+            return pred.check
+        return compile_predicate(pred.predicate, resolve, pred.params)
+    if isinstance(pred, PParam):
+        if params is None:
+            raise ValueError(f"Unbound parameter {pred.name}; run the query through prepare()")
+        name = pred.name
+        return lambda row: bool(params[name])
+    if isinstance(pred, PAttr):
+        get = resolve(pred.name)
+        return lambda row: bool(get(row))
+    if isinstance(pred, PUnary):
+        if pred.op == 'not':
+            inner = compile_predicate(pred.expr, resolve, params)
+            return lambda row: not inner(row)
+        if pred.op == 'neg':
+            neg = _compile_neg(pred.expr, resolve, params)
+            return lambda row: bool(neg(row))
+        raise ValueError(f"Unknown unary operator: {pred.op}")
+    if isinstance(pred, PBinary):
+        if pred.op in ('and', 'or'):
+            l = compile_predicate(pred.left, resolve, params)
+            r = compile_predicate(pred.right, resolve, params)
+            if pred.op == 'and':
+                return lambda row: l(row) and r(row)
+            return lambda row: l(row) or r(row)
+        op = _COMPARE_OPS.get(pred.op)
+        if op is None:
+            raise ValueError(f"Unknown binary operator: {pred.op}")
+        if isinstance(pred.left, PAttr) and isinstance(pred.right, PConst):
+            get = resolve(pred.left.name)
+            c = pred.right.value
+            return lambda row: op(get(row), c)
+        if isinstance(pred.left, PConst) and isinstance(pred.right, PAttr):
+            c = pred.left.value
+            get = resolve(pred.right.name)
+            return lambda row: op(c, get(row))
+        if isinstance(pred.left, PAttr) and isinstance(pred.right, PParam) and params is not None:
+            get = resolve(pred.left.name)
+            name = pred.right.name
+            return lambda row: op(get(row), params[name])
+        lv = compile_value(pred.left, resolve, params)
+        rv = compile_value(pred.right, resolve, params)
+        return lambda row: op(lv(row), rv(row))
+    raise ValueError(f"Unsupported predicate node: {pred}")
+
+
+def compile_value(node: PredNode, resolve: Resolver, params: Optional[Mapping[str, Any]] = None) -> Getter:
+    """Compile a value expression; the counterpart of ``eval_value``."""
+    if isinstance(node, PConst):
+        v = node.value
+        return lambda row: v
+    if isinstance(node, PAttr):
+        return resolve(node.name)
+    if isinstance(node, PParam) and params is not None:
+        name = node.name
+        return lambda row: params[name]
+    if isinstance(node, PUnary) and node.op == 'neg':
+        return _compile_neg(node.expr, resolve, params)
+    return compile_predicate(node, resolve, params)
+
+
+def _compile_neg(node: PredNode, resolve: Resolver, params: Optional[Mapping[str, Any]] = None) -> Getter:
+    inner = compile_value(node, resolve, params)
+
+    def neg(row: Any) -> Any:
+        v = inner(row)
+        try:
+            return -v
+        except Exception as e:
+            raise ValueError("Unary minus requires a numeric value") from e
+
+    return neg
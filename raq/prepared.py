@@ -0,0 +1,192 @@
+"""Prepared queries with placeholders.
+
+``prepare`` parses a query once (and plans it once, when given the
+relations); ``PreparedQuery.execute`` only fills in the parameter values
+and evaluates the plan. Placeholders stand for constants in predicates:
+``$1``, ``$2``, ... are bound by position, ``:name`` by name.
+
+With the relations, selection predicates are also compiled once
+(``PCompiled``) and read the values execute() stores in a shared dict.
+Where the executor needs constants in the plan itself (a selection's
+leading conjuncts answered from an index, selections over columnar
+relations, which become NumPy masks, and join predicates, whose equality
+keys and band bounds it reads) the placeholders are replaced by
+constants on every execution instead.
+"""
+
+from __future__ import annotations
+
+from dataclasses import fields, is_dataclass
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Union
+
+from .columnar import ColumnarRows
+from .datatypes import Relation
+from .executor import evaluate
+from .indexes import INDEX_KINDS, _FLIPPED
+from .optimizer import optimize
+from .predicate import PAttr, PBinary, PCompiled, PConst, PParam, PredNode, join_conjuncts, split_conjuncts
+from .ra_ast import RAType, RAJoin, RAProject, RARef, RASelect, RASetOp, relation_names
+from .ra_parser import parse_query
+from .schema import output_schema
+
+Params = Union[Sequence[Any], Mapping[Any, Any]]
+
+
+class PreparedQuery:
+    """A parsed, and possibly optimized, query whose placeholders are bound per execution.
+
+    ``params`` lists the placeholders in order of first appearance. The plan
+    is shared by every execution and never modified. Given ``relations``,
+    selections are compiled once against them (see the module docstring);
+    compiled selections read the values of the latest ``bind``, so one
+    prepared query cannot run two executions at the same time.
+    """
+
+    def __init__(
+        self, query: str, plan: RAType, name: Optional[str] = None,
+        relations: Optional[Dict[str, Relation]] = None,
+    ):
+        self.query = query
+        self.plan = plan
+        # The name evaluate() gives the unoptimized query's result.
+        self.name = name
+        self.params: List[str] = list(dict.fromkeys(_params(plan)))
+        # Placeholder values of the current execution, read by compiled selections.
+        self._slots: Dict[str, Any] = {}
+        self._compiled = plan if relations is None or not self.params else _compile(plan, relations, self._slots)
+        self._bind = _binder(self._compiled)
+
+    def bind(self, params: Params = ()) -> RAType:
+        """The plan to evaluate for ``params``.
+
+        ``params`` is a sequence (``$N`` is ``params[N - 1]``) or a mapping
+        (``$N`` is ``params[N]``, ``:name`` is ``params["name"]``).
+        Placeholders the executor needs as constants are replaced by their
+        values; subtrees without them are shared with the plan. The plan
+        stays valid until the next ``bind`` or ``execute``.
+        """
+        values = self._values(params)
+        self._slots.clear()
+        self._slots.update(values)
+        if self._bind is None:
+            return self._compiled
+        return self._bind({name: PConst(v) for name, v in values.items()})
+
+    def execute(
+        self, params: Params, relations: Dict[str, Relation],
+        run: Callable[[RAType, Dict[str, Relation]], Relation] = evaluate,
+    ) -> Relation:
+        """Bind ``params`` and evaluate the plan with ``run`` (``evaluate`` by default)."""
+        result = run(self.bind(params), relations)
+        if self.name is not None:
+            result.name = self.name
+        return result
+
+    def _values(self, params: Params) -> Dict[str, Any]:
+        if isinstance(params, Mapping):
+            values = {}
+            for name in self.params:
+                key = int(name[1:]) if name[0] == '$' else name[1:]
+                if key not in params:
+                    raise ValueError(f"No value for parameter {name}")
+                values[name] = params[key]
+            return values
+        if isinstance(params, (str, bytes)):
+            raise ValueError("Parameters must be a sequence or a mapping, not a string")
+        named = [name for name in self.params if name[0] == ':']
+        if named:
+            raise ValueError(f"Named parameter {named[0]} needs a mapping of values")
+        count = max((int(name[1:]) for name in self.params), default=0)
+        if len(params) != count:
+            raise ValueError(f"Expected {count} parameter values, got {len(params)}")
+        return {name: params[int(name[1:]) - 1] for name in self.params}
+
+
+def prepare(query: str, relations: Optional[Dict[str, Relation]] = None) -> PreparedQuery:
+    """Parse ``query`` once; with ``relations``, also optimize it once (see ``optimize``).
+
+    The optimized plan keeps its join order and pushed-down selections for
+    every execution, whatever values are bound later. Likewise, only the
+    indexes that exist now are looked up with placeholder values.
+    """
+    ast = parse_query(query)
+    if relations is None:
+        return PreparedQuery(query, ast)
+    try:
+        name = output_schema(ast, relations)[0]
+    except (KeyError, ValueError):
+        # evaluate() reports the error on execution.
+        return PreparedQuery(query, ast)
+    return PreparedQuery(query, optimize(ast, relations), name, relations)
+
+
+def _params(node: Any) -> List[str]:
+    if isinstance(node, PParam):
+        return [node.name]
+    if not isinstance(node, (RAType, PredNode)) or not is_dataclass(node):
+        return []
+    out: List[str] = []
+    for f in fields(node):
+        out.extend(_params(getattr(node, f.name)))
+    return out
+
+
+def _compile(node: RAType, relations: Dict[str, Relation], slots: Dict[str, Any]) -> RAType:
+    """``node`` with the placeholder conjuncts of its selections compiled once (``PCompiled``)."""
+    if isinstance(node, RASelect):
+        child = _compile(node.child, relations, slots)
+        if any(isinstance(relations[n].rows, ColumnarRows) for n in relation_names(child)):
+            return RASelect(predicate=node.predicate, child=child)
+        conjuncts = split_conjuncts(node.predicate)
+        i = 0
+        while i < len(conjuncts) and _indexed(conjuncts[i], child, relations):
+            i += 1
+        rest = join_conjuncts(conjuncts[i:])
+        if rest is None or not _params(rest):
+            return RASelect(predicate=node.predicate, child=child)
+        compiled = PCompiled(rest, output_schema(child, relations)[1], slots)
+        return RASelect(predicate=join_conjuncts(conjuncts[:i] + [compiled]), child=child)
+    if isinstance(node, RAProject):
+        return RAProject(attrs=node.attrs, child=_compile(node.child, relations, slots))
+    if isinstance(node, RAJoin):
+        return RAJoin(left=_compile(node.left, relations, slots), right=_compile(node.right, relations, slots),
+                      predicate=node.predicate)
+    if isinstance(node, RASetOp):
+        return RASetOp(op=node.op, left=_compile(node.left, relations, slots),
+                       right=_compile(node.right, relations, slots))
+    return node
+
+
+def _indexed(conjunct: PredNode, child: RAType, relations: Dict[str, Relation]) -> bool:
+    """Whether the executor may answer ``conjunct`` from an index of ``child`` (see raq.indexes)."""
+    if not isinstance(child, RARef) or not isinstance(conjunct, PBinary) or conjunct.op not in _FLIPPED:
+        return False
+    if isinstance(conjunct.left, PAttr) and isinstance(conjunct.right, (PConst, PParam)):
+        attr = conjunct.left.name
+    elif isinstance(conjunct.right, PAttr) and isinstance(conjunct.left, (PConst, PParam)):
+        attr = conjunct.right.name
+    else:
+        return False
+    return any((kind, attr) in relations[child.name].indexes for kind in INDEX_KINDS)
+
+
+def _binder(node: Any) -> Optional[Callable[[Dict[str, PConst]], Any]]:
+    """A function rebuilding ``node`` with bound values, or None if it has no placeholders."""
+    if isinstance(node, PParam):
+        name = node.name
+        return lambda values: values[name]
+    if not isinstance(node, (RAType, PredNode)) or not is_dataclass(node):
+        return None
+    fixed = {f.name: getattr(node, f.name) for f in fields(node)}
+    parts = [(attr, b) for attr, value in fixed.items() if (b := _binder(value)) is not None]
+    if not parts:
+        return None
+    cls = type(node)
+
+    def bind(values: Dict[str, PConst]) -> Any:
+        kwargs = dict(fixed)
+        for attr, b in parts:
+            kwargs[attr] = b(values)
+        return cls(**kwargs)
+
+    return bind
@@ -1,21 +1,29 @@
 from __future__ import annotations
 
-from typing import Any
+from typing import Any, Callable, List, Optional
 
 from .datatypes import Relation
+from .predicate import PredNode, PCompiled, PConst, PAttr, PParam, PUnary, PBinary
+from .ra_ast import RAType, RARef, RASelect, RAProject, RAJoin, RASetOp
 
 
 def print_relation(rel: Relation) -> None:
-    print(f"{rel.name} = {{{', '.join(rel.header)}")
+    print(format_relation(rel))
+
+
+def format_relation(rel: Relation) -> str:
+    """The text ``print_relation`` prints, without the final newline."""
+    lines = [f"{rel.name} = {{{', '.join(rel.header)}"]
     for r in rel.rows:
         vals = [repr_value(r[c]) for c in rel.header]
-        print("  " + ", ".join(vals))
-    print("}")
+        lines.append("  " + ", ".join(vals))
+    lines.append("}")
 
-    print()
-    print("\t".join(rel.header))
+    lines.append("")
+    lines.append("\t".join(rel.header))
     for r in rel.rows:
-        print("\t".join(stringify_cell(r[c]) for c in rel.header))
+        lines.append("\t".join(stringify_cell(r[c]) for c in rel.header))
+    return "\n".join(lines)
 
 
 def repr_value(v: Any) -> str:
@@ -29,3 +37,76 @@ def stringify_cell(v: Any) -> str:
         return "NULL"
     return str(v)
 
+
+
+def format_plan(node: RAType, annotate: Optional[Callable[[RAType], str]] = None) -> str:
+    """Render an RA tree as an indented operator tree, one node per line.
+
+    ``annotate(node)``, if given, is appended to each node's line (used for
+    cardinality estimates).
+    """
+    lines: List[str] = []
+    _format_plan(node, 0, lines, annotate)
+    return "\n".join(lines)
+
+
+def _format_plan(node: RAType, depth: int, lines: List[str], annotate: Optional[Callable[[RAType], str]]) -> None:
+    line = "  " * depth + format_operator(node)
+    if annotate is not None:
+        line += annotate(node)
+    lines.append(line)
+    for c in plan_children(node):
+        _format_plan(c, depth + 1, lines, annotate)
+
+
+def format_operator(node: RAType) -> str:
+    """One plan line for ``node`` alone (its inputs are not shown)."""
+    if isinstance(node, RARef):
+        return node.name
+    if isinstance(node, RASelect):
+        return f"σ {format_predicate(node.predicate)}"
+    if isinstance(node, RAProject):
+        return f"π {', '.join(node.attrs)}"
+    if isinstance(node, RAJoin):
+        return "⋈" if node.predicate is None else f"⋈ [{format_predicate(node.predicate)}]"
+    if isinstance(node, RASetOp):
+        return node.op
+    return repr(node)
+
+
+def plan_children(node: RAType) -> List[RAType]:
+    if isinstance(node, (RASelect, RAProject)):
+        return [node.child]
+    if isinstance(node, (RAJoin, RASetOp)):
+        return [node.left, node.right]
+    return []
+
+
+def format_predicate(pred: PredNode) -> str:
+    if isinstance(pred, PCompiled):
+        return format_predicate(pred.predicate)
+    if isinstance(pred, PConst):
+        v = pred.value
+        if v is None:
+            return "null"
+        if isinstance(v, bool):
+            return "true" if v else "false"
+        return repr_value(v)
+    if isinstance(pred, (PAttr, PParam)):
+        return pred.name
+    if isinstance(pred, PUnary):
+        inner = format_predicate(pred.expr)
+        if isinstance(pred.expr, PBinary):
+            inner = f"({inner})"
+        return f"not {inner}" if pred.op == 'not' else f"-{inner}"
+    if isinstance(pred, PBinary):
+        parts = []
+        for side in (pred.left, pred.right):
+            text = format_predicate(side)
+            if isinstance(side, PCompiled):
+                side = side.predicate
+            if isinstance(side, PBinary) and (side.op != pred.op or pred.op not in ('and', 'or')):
+                text = f"({text})"
+            parts.append(text)
+        return f"{parts[0]} {pred.op} {parts[1]}"
+    return repr(pred)
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import List, Optional
+from dataclasses import dataclass, fields, is_dataclass
+from typing import Any, Dict, List, Optional
 
 
 class RAType:
@@ -38,3 +38,38 @@ class RASetOp(RAType):
     left: RAType
     right: RAType
 
+
+
+def structural_key(node: Any, cache: Optional[Dict[int, Any]] = None) -> Any:
+    """Hashable key that is equal exactly for structurally equal trees.
+
+    Works on RA nodes and on the predicate nodes inside them. Constants are
+    keyed with their type, so ``1``, ``1.0`` and ``true`` stay distinct.
+    ``cache`` (id -> key) avoids rehashing shared subtrees; it is only valid
+    while the keyed nodes are alive.
+    """
+    if is_dataclass(node):
+        if cache is not None and id(node) in cache:
+            return cache[id(node)]
+        key = (type(node).__name__, *(structural_key(getattr(node, f.name), cache) for f in fields(node)))
+        if cache is not None:
+            cache[id(node)] = key
+        return key
+    if isinstance(node, (list, tuple)):
+        return tuple(structural_key(x, cache) for x in node)
+    return (type(node).__name__, node)
+
+
+def relation_names(node: RAType) -> List[str]:
+    """Names of the relations a tree reads, sorted and without repeats."""
+    names = set()
+    stack = [node]
+    while stack:
+        n = stack.pop()
+        if isinstance(n, RARef):
+            names.add(n.name)
+        elif isinstance(n, (RASelect, RAProject)):
+            stack.append(n.child)
+        elif isinstance(n, (RAJoin, RASetOp)):
+            stack.extend((n.left, n.right))
+    return sorted(names)
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+from functools import lru_cache
 from typing import List, Optional, Tuple
 
 from .tokens import tokenize, TOKEN
@@ -181,10 +182,10 @@ class Parser:
             if ttype == "LPAREN":
                 prev = collected[-1] if collected else None
                 # If we are not currently inside predicate parentheses and
-                # the previous token ends a predicate (IDENT/NUMBER/STRING/RPAREN),
+                # the previous token ends a predicate (IDENT/NUMBER/STRING/PARAM/RPAREN),
                 # then this LPAREN is the start of the child expression.
                 if depth == 0 and prev is not None and (
-                    prev[0] in ("IDENT", "NUMBER", "STRING", "RPAREN") or
+                    prev[0] in ("IDENT", "NUMBER", "STRING", "PARAM", "RPAREN") or
                     (prev[0] == "KW" and prev[1] in ("true", "false", "null"))
                 ):
                     break
@@ -245,7 +246,45 @@ def _parse_attr_list(tokens: List[TOKEN]) -> List[str]:
     return attrs
 
 
+# Distinct query texts whose parsed trees ``parse_query`` keeps.
+PARSE_CACHE_SIZE = 1024
+
+
 def parse_query(expr: str) -> RAType:
+    """Parse a query, reusing the tree of an earlier parse of the same text.
+
+    Texts are compared after ``normalize_query``. Cached trees are shared
+    between callers and must be treated as read-only.
+    """
+    return _parse_cached(normalize_query(expr))
+
+
+def normalize_query(expr: str) -> str:
+    """``expr`` with runs of whitespace collapsed to one space and the ends stripped.
+
+    Texts with quotes are only stripped at the start, since whitespace may
+    belong to a string (an unterminated one runs to the end).
+    """
+    if '"' in expr or "'" in expr:
+        return expr.lstrip()
+    return " ".join(expr.split())
+
+
+def clear_parse_cache() -> None:
+    _parse_cached.cache_clear()
+
+
+def parse_cache_info():
+    """Hits, misses and size of the parse cache (``functools.lru_cache`` info)."""
+    return _parse_cached.cache_info()
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def _parse_cached(expr: str) -> RAType:
+    return parse_query_uncached(expr)
+
+
+def parse_query_uncached(expr: str) -> RAType:
     tokens = tokenize(expr)
     parser = Parser(tokens)
     ast = parser.parse_rel_expr()
@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+from typing import Dict, List, Tuple
+
+from .datatypes import Relation
+from .ra_ast import RAType, RARef, RASelect, RAProject, RAJoin, RASetOp
+
+SET_OP_NAMES = {'union': 'Union', 'intersect': 'Intersect', 'minus': 'Minus'}
+
+
+def natural_join_header(left: List[str], right: List[str]) -> List[str]:
+    return list(left) + [a for a in right if a not in left]
+
+
+def theta_join_header(left: List[str], right: List[str]) -> Tuple[List[str], List[str]]:
+    """Return (output header, output names of the right attributes).
+
+    Right attributes that clash with a left attribute get a ``_right`` suffix.
+    """
+    right_out = [f"{a}_right" if a in left else a for a in right]
+    return list(left) + right_out, right_out
+
+
+def output_schema(node: RAType, rels: Dict[str, Relation]) -> Tuple[str, List[str]]:
+    """Return the (name, header) ``evaluate`` would give the result of ``node``.
+
+    Computed without touching any rows; raises the same errors ``evaluate``
+    raises for unknown relations, projection attributes and incompatible
+    set operations.
+    """
+    if isinstance(node, RARef):
+        if node.name not in rels:
+            raise KeyError(f"Unknown relation: {node.name}")
+        return node.name, list(rels[node.name].header)
+    if isinstance(node, RASelect):
+        name, header = output_schema(node.child, rels)
+        return f"Select({name})", header
+    if isinstance(node, RAProject):
+        name, header = output_schema(node.child, rels)
+        for a in node.attrs:
+            if a not in header:
+                raise KeyError(f"Projection attribute '{a}' not in schema {header}")
+        return f"Project({name})", list(node.attrs)
+    if isinstance(node, RAJoin):
+        lname, lheader = output_schema(node.left, rels)
+        rname, rheader = output_schema(node.right, rels)
+        if node.predicate is None:
+            header = natural_join_header(lheader, rheader)
+        else:
+            header, _ = theta_join_header(lheader, rheader)
+        return f"Join({lname},{rname})", header
+    if isinstance(node, RASetOp):
+        lname, lheader = output_schema(node.left, rels)
+        rname, rheader = output_schema(node.right, rels)
+        if set(lheader) != set(rheader):
+            raise ValueError(f"Set operation requires union-compatible schemas, got {lheader} vs {rheader}")
+        if node.op not in SET_OP_NAMES:
+            raise ValueError(f"Unknown set operation: {node.op}")
+        return f"{SET_OP_NAMES[node.op]}({lname},{rname})", lheader
+    raise ValueError(f"Unsupported RA node: {node}")
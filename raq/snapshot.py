@@ -0,0 +1,215 @@
+"""Binary snapshots of loaded relations.
+
+A snapshot stores every relation one column per attribute, so loading it
+copies (or, with NumPy, maps) whole columns instead of parsing values:
+
+* ``MAGIC``, then the length of the header as an 8-byte little-endian
+  integer, then the header: JSON with the source digest, the byte order
+  and, per relation, its name, attributes, row count, flags, indexes and
+  the offset and size of each column;
+* the column data, each column starting on an 8-byte boundary.
+
+Columns are stored as raw int64/float64 (``kind`` ``q``/``d``), as one
+UTF-8 string of NUL-separated values for string columns (``s``), and
+pickled for anything else (``o``). File-backed relations store only their
+file, which stays read lazily.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import io
+import json
+import mmap
+import os
+import pickle
+import sys
+from array import array
+from collections import defaultdict
+from itertools import repeat
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; numeric columns load into array.array
+    np = None
+
+from .columnar import ColumnarRows, StringDictionary, build_column, is_numpy_column
+from .datatypes import Relation
+from .defs_parser import LAYOUTS, _gc_paused
+from .external import FileRows
+from .indexes import build_index
+
+MAGIC = b"RAQSNAP1"
+SNAPSHOT_SUFFIX = ".snap"
+
+_ALIGN = 8
+
+
+def source_digest(path: str) -> str:
+    """Digest of a file's bytes, as stored in snapshots made from it."""
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "blake2b").hexdigest()
+
+
+def save_snapshot(rels: Dict[str, Relation], path: str, source: str = "") -> None:
+    """Write ``rels`` to ``path``; ``source`` is kept for ``snapshot_source``.
+
+    The file is written next to ``path`` and renamed over it, so readers
+    never see a partial snapshot.
+    """
+    entries: List[Dict[str, Any]] = []
+    blobs: List[bytes] = []
+    offset = 0
+    for rel in rels.values():
+        entry: Dict[str, Any] = {
+            "name": rel.name,
+            "header": list(rel.header),
+            "distinct": rel.distinct,
+            "indexes": [list(k) for k in rel.indexes],
+        }
+        if isinstance(rel.rows, FileRows):
+            entry["file"] = [os.path.abspath(rel.rows.path), rel.rows.delimiter]
+        else:
+            columns: Dict[str, Any] = {}
+            for attr, values in _columns(rel).items():
+                kind, blob = _encode(values)
+                columns[attr] = [kind, offset, len(blob)]
+                pad = -len(blob) % _ALIGN
+                blobs.append(blob + bytes(pad))
+                offset += len(blob) + pad
+            entry["rows"] = len(rel.rows)
+            entry["columns"] = columns
+        entries.append(entry)
+    header = json.dumps({"source": source, "byteorder": sys.byteorder, "relations": entries}).encode("utf-8")
+    header += b" " * (-(len(MAGIC) + 8 + len(header)) % _ALIGN)
+
+    tmp = f"{path}.tmp{os.getpid()}"
+    try:
+        with open(tmp, "wb") as f:
+            f.write(MAGIC)
+            f.write(len(header).to_bytes(8, "little"))
+            f.write(header)
+            for blob in blobs:
+                f.write(blob)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def snapshot_source(path: str) -> Optional[str]:
+    """The source digest stored in a snapshot, or None if ``path`` is not one."""
+    try:
+        with open(path, "rb") as f:
+            return _read_header(f)[0]["source"]
+    except (OSError, ValueError):
+        return None
+
+
+def load_snapshot(path: str, layout: str = "rows") -> Dict[str, Relation]:
+    """Read the relations saved in ``path``, in ``layout`` (see ``defs_parser.LAYOUTS``).
+
+    Numeric columns are copied as whole buffers, or used in place through
+    the memory map when NumPy is available and the layout is columnar.
+    Dictionary-encoded columns are saved decoded and encoded again on load.
+    Indexes are rebuilt. Raises ValueError if ``path`` is not a snapshot.
+    """
+    if layout not in LAYOUTS:
+        raise ValueError(f"Unknown layout: {layout}")
+    with open(path, "rb") as f:
+        meta, data_start = _read_header(f)
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    with _gc_paused():
+        return _load_relations(meta, mm, data_start, layout)
+
+
+def _load_relations(meta: Dict[str, Any], mm: Any, data_start: int, layout: str) -> Dict[str, Relation]:
+    swap = meta["byteorder"] != sys.byteorder
+    use_numpy = np is not None and layout != "rows"
+    dictionaries = defaultdict(StringDictionary)
+    rels: Dict[str, Relation] = {}
+    for entry in meta["relations"]:
+        name, header = entry["name"], entry["header"]
+        if "file" in entry:
+            file_path, delimiter = entry["file"]
+            rows: Any = FileRows(name, file_path, header, delimiter)
+        else:
+            n = entry["rows"]
+            columns = {
+                attr: _decode(mm, data_start + off, nbytes, kind, n, swap, use_numpy)
+                for attr, (kind, off, nbytes) in entry["columns"].items()
+            }
+            if layout == "dictionary":
+                rows = ColumnarRows(header, {
+                    a: build_column(c, use_numpy, dictionaries[a]) if isinstance(c, list) else c
+                    for a, c in columns.items()
+                })
+            elif layout == "columnar":
+                rows = ColumnarRows(header, columns)
+            else:
+                lists = [columns[a] if isinstance(columns[a], list) else columns[a].tolist() for a in header]
+                rows = list(map(dict, map(zip, repeat(header), zip(*lists))))
+        rel = Relation(name, list(header), rows, distinct=entry["distinct"])
+        for kind, attr in entry["indexes"]:
+            build_index(rel, attr, kind)
+        rels[name] = rel
+    return rels
+
+
+def _read_header(f) -> Tuple[Dict[str, Any], int]:
+    if f.read(len(MAGIC)) != MAGIC:
+        raise ValueError("Not a relation snapshot")
+    length = int.from_bytes(f.read(8), "little")
+    try:
+        meta = json.loads(f.read(length).decode("utf-8"))
+    except (UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise ValueError(f"Corrupt snapshot header: {e}") from None
+    return meta, len(MAGIC) + 8 + length
+
+
+def _columns(rel: Relation) -> Dict[str, Any]:
+    if isinstance(rel.rows, ColumnarRows):
+        return {a: rel.rows.columns[a] for a in dict.fromkeys(rel.header)}
+    return {a: [r[a] for r in rel.rows] for a in dict.fromkeys(rel.header)}
+
+
+def _encode(values: Any) -> Tuple[str, bytes]:
+    if is_numpy_column(values):
+        return ("q" if values.dtype.kind == "i" else "d"), values.tobytes()
+    if isinstance(values, array):
+        return values.typecode, values.tobytes()
+    col = build_column(values, use_numpy=False)
+    if isinstance(col, array):
+        return col.typecode, col.tobytes()
+    if all(type(v) is str for v in values):
+        text = "\0".join(values)
+        # A NUL inside a value would split it; such columns are pickled.
+        if text.count("\0") == max(len(values) - 1, 0):
+            return "s", text.encode("utf-8")
+    return "o", pickle.dumps(list(values), protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def _decode(mm: Any, start: int, nbytes: int, kind: str, n: int, swap: bool, use_numpy: bool) -> Any:
+    if kind in ("q", "d"):
+        if use_numpy:
+            col = np.frombuffer(mm, dtype=np.int64 if kind == "q" else np.float64, count=n, offset=start)
+            return col.byteswap() if swap else col
+        col = array(kind)
+        col.frombytes(mm[start:start + nbytes])
+        if swap:
+            col.byteswap()
+        return col
+    if kind == "s":
+        return str(mm[start:start + nbytes], "utf-8").split("\0") if n else []
+    if kind == "o":
+        return _ValuesUnpickler(io.BytesIO(mm[start:start + nbytes])).load()
+    raise ValueError(f"Unknown snapshot column kind: {kind}")
+
+
+class _ValuesUnpickler(pickle.Unpickler):
+    # Columns hold plain values (str, int, float, bool, None), which unpickle
+    # without looking up any class; refusing lookups keeps a tampered
+    # snapshot from running code.
+    def find_class(self, module: str, name: str):
+        raise ValueError(f"Unexpected object in snapshot: {module}.{name}")
@@ -0,0 +1,299 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional
+
+from .columnar import ColumnarRows, is_numpy_column, iter_column
+from .datatypes import Relation
+from .external import FileRows
+from .predicate import PredNode, PConst, PAttr, PUnary, PBinary, _lookup_attr
+from .ra_ast import RAType, RARef, RASelect, RAProject, RAJoin, RASetOp
+from .schema import natural_join_header, theta_join_header
+
+# Selectivities used when the statistics say nothing about a predicate.
+DEFAULT_EQ_SELECTIVITY = 0.1
+DEFAULT_RANGE_SELECTIVITY = 1 / 3
+DEFAULT_SELECTIVITY = 0.5
+
+
+@dataclass
+class ColumnStats:
+    distinct: int
+    nulls: int = 0
+    # Smallest/largest non-null value; None unless every non-null value is a
+    # number (or every one is a string), so the two are comparable.
+    min: Any = None
+    max: Any = None
+
+
+@dataclass
+class TableStats:
+    rows: int
+    columns: Dict[str, ColumnStats] = field(default_factory=dict)
+
+
+def analyze(rels: Dict[str, Relation]) -> Dict[str, TableStats]:
+    """Collect statistics for every relation (see ``table_stats``)."""
+    return {name: table_stats(rel) for name, rel in rels.items()}
+
+
+def table_stats(rel: Relation) -> TableStats:
+    """Row count and per-attribute distinct count, null count and min/max.
+
+    Computed once and kept on the relation: relations are values, so the
+    numbers stay valid for as long as the relation does.
+    """
+    if rel.stats is None:
+        rows = rel.rows
+        if isinstance(rows, ColumnarRows):
+            columns = {a: _column_stats(rows.columns[a]) for a in rel.header}
+        elif isinstance(rows, FileRows):
+            # One pass over the file for all columns.
+            columns = {a: _column_stats(c) for a, c in rows.columns(rel.header).items()}
+        else:
+            columns = {a: _column_stats([r[a] for r in rows]) for a in rel.header}
+        rel.stats = TableStats(len(rows), columns)
+    return rel.stats
+
+
+def _column_stats(col: Any) -> ColumnStats:
+    if is_numpy_column(col):
+        if not len(col):
+            return ColumnStats(0)
+        lo, hi = col.min().item(), col.max().item()
+        if lo != lo or hi != hi:  # NaN: no usable range
+            lo = hi = None
+        return ColumnStats(len(set(col.tolist())), 0, lo, hi)
+    column = list(iter_column(col))
+    values = set(column)
+    nulls = column.count(None) if None in values else 0
+    values.discard(None)
+    lo = hi = None
+    if values and (_all_numbers(values) or all(isinstance(v, str) for v in values)):
+        lo, hi = min(values), max(values)
+    return ColumnStats(len(values) + (nulls > 0), nulls, lo, hi)
+
+
+def _all_numbers(values: Iterable[Any]) -> bool:
+    return all(isinstance(v, (int, float)) and not isinstance(v, bool) and v == v for v in values)
+
+
+@dataclass
+class Estimate:
+    """Estimated size of an intermediate result and of its attributes' domains."""
+
+    rows: float
+    columns: Dict[str, ColumnStats]
+
+
+class Estimator:
+    """Cardinality estimates for RA trees from the statistics of the base relations.
+
+    Uses the textbook independence and containment assumptions: conjuncts
+    are independent, an equality keeps 1/distinct of the rows, a range keeps
+    the fraction of [min, max] it covers, and a join on shared attributes
+    matches 1/max(distinct) of the pairs per attribute.
+    """
+
+    def __init__(self, rels: Dict[str, Relation]):
+        self.rels = rels
+        self.memo: Dict[int, tuple] = {}
+
+    def estimate(self, node: RAType) -> Estimate:
+        # Keyed by identity; the node is kept in the entry so the id stays unique.
+        hit = self.memo.get(id(node))
+        if hit is not None and hit[0] is node:
+            return hit[1]
+        est = self._estimate(node)
+        self.memo[id(node)] = (node, est)
+        return est
+
+    def rows(self, node: RAType) -> float:
+        return self.estimate(node).rows
+
+    def _estimate(self, node: RAType) -> Estimate:
+        if isinstance(node, RARef):
+            if node.name not in self.rels:
+                raise KeyError(f"Unknown relation: {node.name}")
+            stats = table_stats(self.rels[node.name])
+            return Estimate(float(stats.rows), dict(stats.columns))
+        if isinstance(node, RASelect):
+            return self.select(self.estimate(node.child), node.predicate)
+        if isinstance(node, RAProject):
+            return self.project(self.estimate(node.child), node.attrs)
+        if isinstance(node, RAJoin):
+            return self.join(self.estimate(node.left), self.header(node.left),
+                             self.estimate(node.right), self.header(node.right), node.predicate)
+        if isinstance(node, RASetOp):
+            left, right = self.estimate(node.left), self.estimate(node.right)
+            if node.op == 'union':
+                rows = left.rows + right.rows
+                columns = {a: _merge_union(s, right.columns.get(a)) for a, s in left.columns.items()}
+                return Estimate(rows, _cap(columns, rows))
+            rows = min(left.rows, right.rows) if node.op == 'intersect' else left.rows
+            return Estimate(rows, _cap(left.columns, rows))
+        raise ValueError(f"Unsupported RA node: {node}")
+
+    def header(self, node: RAType) -> List[str]:
+        return list(self.estimate(node).columns)
+
+    # -- operators --------------------------------------------------------
+
+    def select(self, child: Estimate, predicate: PredNode) -> Estimate:
+        rows = child.rows * self.selectivity(predicate, child.columns)
+        columns = dict(child.columns)
+        for name, value in _pinned(predicate):
+            if name in columns:
+                columns[name] = ColumnStats(1, 0, value, value)
+        return Estimate(rows, _cap(columns, rows))
+
+    def project(self, child: Estimate, attrs: List[str]) -> Estimate:
+        columns = {a: child.columns[a] for a in attrs}
+        # Duplicate elimination: at most one row per combination of values.
+        combos = 1.0
+        for s in columns.values():
+            combos *= max(s.distinct, 1)
+        return Estimate(min(child.rows, combos), columns)
+
+    def join(
+        self,
+        left: Estimate,
+        left_header: List[str],
+        right: Estimate,
+        right_header: List[str],
+        predicate: Optional[PredNode],
+    ) -> Estimate:
+        if predicate is None:
+            rows = left.rows * right.rows
+            columns = {}
+            for a in natural_join_header(left_header, right_header):
+                ls, rs = left.columns.get(a), right.columns.get(a)
+                if ls is not None and rs is not None:
+                    rows /= max(ls.distinct, rs.distinct, 1)
+                    columns[a] = ColumnStats(min(ls.distinct, rs.distinct), 0, _max(ls.min, rs.min), _min(ls.max, rs.max))
+                else:
+                    columns[a] = ls or rs
+            return Estimate(rows, _cap(columns, rows))
+        out, right_out = theta_join_header(left_header, right_header)
+        scope: Dict[str, ColumnStats] = {}
+        columns = {}
+        for a in left_header:
+            scope[a] = scope[f"left.{a}"] = columns[a] = left.columns[a]
+        for a, o in zip(right_header, right_out):
+            scope.setdefault(a, right.columns[a])
+            scope[f"right.{a}"] = columns[o] = right.columns[a]
+        rows = left.rows * right.rows * self.selectivity(predicate, scope)
+        return Estimate(rows, _cap(columns, rows))
+
+    # -- selectivity ------------------------------------------------------
+
+    def selectivity(self, pred: PredNode, columns: Dict[str, ColumnStats]) -> float:
+        if isinstance(pred, PConst):
+            return 1.0 if pred.value else 0.0
+        if isinstance(pred, PUnary) and pred.op == 'not':
+            return 1.0 - self.selectivity(pred.expr, columns)
+        if isinstance(pred, PBinary):
+            if pred.op == 'and':
+                return self.selectivity(pred.left, columns) * self.selectivity(pred.right, columns)
+            if pred.op == 'or':
+                a = self.selectivity(pred.left, columns)
+                b = self.selectivity(pred.right, columns)
+                return a + b - a * b
+            if pred.op in ('=', '==', '!='):
+                eq = self._equality(pred, columns)
+                return 1.0 - eq if pred.op == '!=' else eq
+            if pred.op in ('<', '<=', '>', '>='):
+                return self._range(pred, columns)
+        return DEFAULT_SELECTIVITY
+
+    def _equality(self, pred: PBinary, columns: Dict[str, ColumnStats]) -> float:
+        ls, rs = _stats_of(pred.left, columns), _stats_of(pred.right, columns)
+        if ls is not None and rs is not None:
+            return 1.0 / max(ls.distinct, rs.distinct, 1)
+        s, const = (ls, pred.right) if ls is not None else (rs, pred.left)
+        if s is None or not isinstance(const, PConst):
+            return DEFAULT_EQ_SELECTIVITY
+        v = const.value
+        if _comparable(s, v) and not s.min <= v <= s.max:
+            return 0.0
+        return 1.0 / max(s.distinct, 1)
+
+    def _range(self, pred: PBinary, columns: Dict[str, ColumnStats]) -> float:
+        op = pred.op
+        s, const = _stats_of(pred.left, columns), pred.right
+        if s is None:
+            # const < attr is attr > const
+            s, const = _stats_of(pred.right, columns), pred.left
+            op = {'<': '>', '<=': '>=', '>': '<', '>=': '<='}[op]
+        if s is None or not isinstance(const, PConst):
+            return DEFAULT_RANGE_SELECTIVITY
+        v = const.value
+        if not (_comparable(s, v) and isinstance(v, (int, float))):
+            return DEFAULT_RANGE_SELECTIVITY
+        if s.max == s.min:
+            below = 0.0 if v <= s.min else 1.0
+        else:
+            below = (v - s.min) / (s.max - s.min)
+            if below != below:  # infinite bounds
+                return DEFAULT_RANGE_SELECTIVITY
+            below = min(max(below, 0.0), 1.0)
+        return below if op in ('<', '<=') else 1.0 - below
+
+
+def _stats_of(node: PredNode, columns: Dict[str, ColumnStats]) -> Optional[ColumnStats]:
+    if not isinstance(node, PAttr):
+        return None
+    try:
+        return _lookup_attr(columns, node.name)
+    except KeyError:
+        return None
+
+
+def _comparable(s: ColumnStats, v: Any) -> bool:
+    if s.min is None or v is None or isinstance(v, bool):
+        return False
+    return isinstance(v, str) == isinstance(s.min, str)
+
+
+def _pinned(pred: PredNode) -> List[tuple]:
+    """(attribute, constant) pairs an ``attr = const`` conjunct fixes."""
+    if isinstance(pred, PBinary) and pred.op == 'and':
+        return _pinned(pred.left) + _pinned(pred.right)
+    if isinstance(pred, PBinary) and pred.op in ('=', '=='):
+        if isinstance(pred.left, PAttr) and isinstance(pred.right, PConst):
+            return [(pred.left.name, pred.right.value)]
+        if isinstance(pred.right, PAttr) and isinstance(pred.left, PConst):
+            return [(pred.right.name, pred.left.value)]
+    return []
+
+
+def _cap(columns: Dict[str, ColumnStats], rows: float) -> Dict[str, ColumnStats]:
+    """An attribute cannot have more distinct values than the result has rows."""
+    limit = max(int(rows + 0.5), 1)
+    return {
+        a: s if s.distinct <= limit else ColumnStats(limit, min(s.nulls, limit), s.min, s.max)
+        for a, s in columns.items()
+    }
+
+
+def _merge_union(a: ColumnStats, b: Optional[ColumnStats]) -> ColumnStats:
+    if b is None:
+        return a
+    lo = hi = None
+    if a.min is not None and b.min is not None and isinstance(a.min, str) == isinstance(b.min, str):
+        lo, hi = min(a.min, b.min), max(a.max, b.max)
+    return ColumnStats(a.distinct + b.distinct, a.nulls + b.nulls, lo, hi)
+
+
+def _min(a: Any, b: Any) -> Any:
+    try:
+        return min(a, b) if a is not None and b is not None else None
+    except TypeError:
+        return None
+
+
+def _max(a: Any, b: Any) -> Any:
+    try:
+        return max(a, b) if a is not None and b is not None else None
+    except TypeError:
+        return None
@@ -1,10 +1,50 @@
 from __future__ import annotations
 
+import re
 from typing import List, Tuple, Optional
 
 
 TOKEN = tuple[str, str]  # (type, value)
 
+_KEYWORDS = frozenset(("select", "project", "join", "union", "intersect", "minus", "on", "and", "or", "not", "true", "false", "null"))
+_SYMBOL_KEYWORDS = {'¬': 'not', '∧': 'and', '∨': 'or'}
+
+# One alternative per token kind, tried in the order the character loop
+# below checks them, each after any whitespace; the group name is the token
+# type. ``\s``/``\w`` match exactly ``isspace``/``isalnum`` (plus ``_``),
+# but ``\d`` is narrower than ``isdigit`` and ``[^\W\d]`` wider than
+# ``isalpha``, so non-ASCII numbers and identifiers are left to the
+# character loop, as are unterminated strings ending in a backslash and
+# unexpected characters (OTHER). Keywords are matched case-insensitively
+# in ASCII only, as ``str.lower`` maps no other letter to theirs. Trailing
+# whitespace matches nothing.
+_TOKEN_RE = re.compile(r"""
+    \s*(?:
+    (?P<STRING>(?P<quote>["'])(?P<body>(?:\\.|(?!(?P=quote))[^\\])*)(?:(?P=quote)|\Z))
+  | (?P<NUMBER>\d[\d.]*)
+  | (?P<PARAM>\$\d+|:[^\W\d]\w*)
+  | (?P<OP><=|>=|!=|==|&&|\|\||[<>=])
+  | (?P<LPAREN>\() | (?P<RPAREN>\)) | (?P<LBRACK>\[) | (?P<RBRACK>\])
+  | (?P<COMMA>,) | (?P<DOT>\.)
+  | (?P<SIGMA>σ) | (?P<PI>π) | (?P<JOIN_SYM>⋈) | (?P<UNION_SYM>[∪⋃])
+  | (?P<INTERSECT_SYM>∩) | (?P<DIFF_SYM>[−-])
+  | (?P<KW>(?ai:select|project|join|union|intersect|minus|on|and|or|not|true|false|null))(?!\w)
+  | (?P<IDENT>[^\W\d]\w*)
+  | (?P<KW_SYM>[¬∧∨])
+  | (?P<OTHER>\S)
+    )""", re.VERBOSE | re.DOTALL)
+_ESCAPE_RE = re.compile(r"\\(.)", re.DOTALL)
+_KW, _IDENT, _NUMBER, _PARAM, _STRING = (
+    _TOKEN_RE.groupindex[g] for g in ("KW", "IDENT", "NUMBER", "PARAM", "STRING")
+)
+# Token type of each group whose text is the token value as matched.
+_GROUP_NAMES = {g: name for name, g in _TOKEN_RE.groupindex.items()}
+_PLAIN: List[Optional[str]] = [
+    None if _GROUP_NAMES.get(g) in ("KW", "IDENT", "NUMBER", "PARAM", "STRING", "quote", "body", "KW_SYM", "OTHER")
+    else _GROUP_NAMES.get(g)
+    for g in range(_TOKEN_RE.groups + 1)
+]
+
 
 def _is_ident_start(ch: str) -> bool:
     return ch.isalpha() or ch == '_'
@@ -15,9 +55,38 @@ def _is_ident_part(ch: str) -> bool:
 
 
 def tokenize(expr: str) -> List[TOKEN]:
-    s = expr
-    i = 0
     tokens: List[TOKEN] = []
+    append = tokens.append
+    plain = _PLAIN
+    for m in _TOKEN_RE.finditer(expr):
+        g = m.lastindex
+        ttype = plain[g]
+        if ttype is not None:
+            append((ttype, m[g]))
+        elif g == _IDENT:
+            if not m[g].isascii():
+                return _tokenize_chars(expr, m.start(g), tokens)
+            append(("IDENT", m[g]))
+        elif g == _KW:
+            append(("KW", m[g].lower()))
+        elif g == _STRING:
+            body = m["body"]
+            append(("STRING", _ESCAPE_RE.sub(r"\1", body) if "\\" in body else body))
+        elif g == _NUMBER or g == _PARAM:
+            # The character loop also continues a number with non-decimal digits.
+            if not expr[m.start(g):m.end() + 1].isascii():
+                return _tokenize_chars(expr, m.start(g), tokens)
+            append(("NUMBER" if g == _NUMBER else "PARAM", m[g]))
+        elif m[g] in _SYMBOL_KEYWORDS:
+            append(("KW", _SYMBOL_KEYWORDS[m[g]]))
+        else:
+            return _tokenize_chars(expr, m.start(g), tokens)
+    return tokens
+
+
+def _tokenize_chars(expr: str, i: int, tokens: List[TOKEN]) -> List[TOKEN]:
+    """Tokenize ``expr[i:]`` one character at a time, appending to ``tokens``."""
+    s = expr
     while i < len(s):
         ch = s[i]
         if ch.isspace():
@@ -47,6 +116,21 @@ def tokenize(expr: str) -> List[TOKEN]:
                 i += 1
             tokens.append(("NUMBER", s[start:i]))
             continue
+        # Parameters: $1 (by position) or :name
+        if ch == '$' and i + 1 < len(s) and s[i + 1].isdigit():
+            start = i
+            i += 1
+            while i < len(s) and s[i].isdigit():
+                i += 1
+            tokens.append(("PARAM", s[start:i]))
+            continue
+        if ch == ':' and i + 1 < len(s) and _is_ident_start(s[i + 1]):
+            start = i
+            i += 1
+            while i < len(s) and _is_ident_part(s[i]):
+                i += 1
+            tokens.append(("PARAM", s[start:i]))
+            continue
         # Multi-char operators
         two = s[i:i+2]
         if two in ("<=", ">=", "!=", "==", "&&", "||"):
@@ -104,15 +188,14 @@ def tokenize(expr: str) -> List[TOKEN]:
                 i += 1
             ident = s[start:i]
             low = ident.lower()
-            if low in ("select", "project", "join", "union", "intersect", "minus", "on", "and", "or", "not", "true", "false", "null"):
+            if low in _KEYWORDS:
                 tokens.append(("KW", low))
             else:
                 tokens.append(("IDENT", ident))
             continue
 
         if ch in ('¬', '∧', '∨'):
-            mapping = {'¬': 'not', '∧': 'and', '∨': 'or'}
-            tokens.append(("KW", mapping[ch]))
+            tokens.append(("KW", _SYMBOL_KEYWORDS[ch]))
             i += 1
             continue
 
@@ -0,0 +1,143 @@
+"""Splitting of definition rows into cells and conversion of cells to values."""
+from __future__ import annotations
+
+import csv
+import io
+from itertools import repeat
+from operator import contains, itemgetter
+from typing import Any, List, Optional, Sequence
+
+# Rows of the first batch used to pick each column's conversion.
+_SAMPLE_ROWS = 100
+# Words starting with a letter that _convert_value does not return as strings.
+_SPECIAL_INITIALS = "iInNtTfF"
+_SPECIAL_WORDS = frozenset(("inf", "infinity", "nan", "true", "false", "null", "none"))
+_INITIAL = itemgetter(slice(0, 1))
+_KEYWORDS = {"true": True, "false": False, "null": None, "none": None}
+
+
+def _convert_value(tok: str) -> Any:
+    s = tok.strip()
+    if (len(s) >= 2 and ((s[0] == '"' and s[-1] == '"') or (s[0] == "'" and s[-1] == "'"))):
+        return s[1:-1]
+    low = s.lower()
+    # No keyword parses as a number, so they can be looked up first.
+    if low in _KEYWORDS:
+        return _KEYWORDS[low]
+    try:
+        if low.startswith("0x"):
+            return int(s, 16)
+        return int(s)
+    except ValueError:
+        pass
+    try:
+        return float(s)
+    except ValueError:
+        pass
+    return s
+
+
+def _parse_csv_row(line: str, delimiter: str = ",") -> List[str]:
+    reader = csv.reader(io.StringIO(line), delimiter=delimiter, skipinitialspace=True)
+    return next(reader)
+
+
+def _split_rows(name: str, width: int, lines: List[str], delimiter: str = ",") -> List[List[str]]:
+    """Split non-empty row lines into fields as ``_parse_csv_row`` splits each one.
+
+    The whole batch goes through one ``csv.reader``, or ``str.split`` when it
+    holds no quotes. Raises ValueError unless every row has ``width`` fields.
+    """
+    if not any(map(contains, lines, repeat('"'))):
+        # Without quotes the reader only splits on the delimiter; the leading
+        # spaces it would skip are stripped by every conversion.
+        rows = list(map(str.split, lines, repeat(delimiter)))
+    else:
+        rows = list(csv.reader(lines, delimiter=delimiter, skipinitialspace=True))
+        if len(rows) != len(lines):
+            # A quoted field ran past the end of its line, so the reader joined
+            # lines; rows never span lines, so split them one by one.
+            rows = [_parse_csv_row(ln, delimiter) for ln in lines]
+    lengths = list(map(len, rows))
+    if lengths.count(width) != len(lengths):
+        i = next(i for i, n in enumerate(lengths) if n != width)
+        raise ValueError(f"Row arity mismatch for relation {name}: expected {width} values, got {lengths[i]} in line: {lines[i]}")
+    return rows
+
+
+# -- typed column conversion --------------------------------------------------
+#
+# Each fast path gives exactly what ``_convert_value`` gives on the cells it
+# accepts: ``int()`` accepts only what the int branch would (hex needs the
+# ``0x`` branch, which ``int()`` rejects); a cell holding ``.`` can never be
+# an int, so ``float()`` is next; and a cell starting with a letter is a
+# string unless it is inf/infinity/nan (float) or true/false/null/none.
+
+
+def _column_kind(sample: Sequence[str]) -> Optional[str]:
+    """The fast path covering most of ``sample`` ("int", "float", "word"), or None."""
+    counts = {"int": 0, "float": 0, "word": 0}
+    for tok in sample:
+        if _is_word(tok.strip()):
+            counts["word"] += 1
+        elif '.' in tok:
+            try:
+                float(tok)
+                counts["float"] += 1
+            except ValueError:
+                pass
+        else:
+            try:
+                int(tok)
+                counts["int"] += 1
+            except ValueError:
+                pass
+    kind = max(counts, key=counts.__getitem__)
+    return kind if counts[kind] * 2 > len(sample) else None
+
+
+def _convert_column(col: Sequence[str], kind: Optional[str]) -> List[Any]:
+    if kind == "int":
+        try:
+            return list(map(int, col))
+        except ValueError:
+            return list(map(_int_cell, col))
+    if kind == "float":
+        if all(map(contains, col, repeat('.'))):
+            try:
+                return list(map(float, col))
+            except ValueError:
+                pass
+        return list(map(_float_cell, col))
+    if kind == "word":
+        values = list(map(str.strip, col))
+        # One isalpha() call over all the first letters instead of one per cell.
+        initials = "".join(map(_INITIAL, values))
+        if len(initials) == len(values) and initials.isalpha():
+            lowered = list(map(str.lower, values))
+            if _SPECIAL_WORDS.isdisjoint(lowered):
+                return values
+            return [s if low not in _SPECIAL_WORDS else _convert_value(s) for s, low in zip(values, lowered)]
+        return [s if _is_word(s) else _convert_value(s) for s in values]
+    return list(map(_convert_value, col))
+
+
+def _is_word(s: str) -> bool:
+    c = s[:1]
+    return c.isalpha() and (c not in _SPECIAL_INITIALS or s.lower() not in _SPECIAL_WORDS)
+
+
+def _int_cell(tok: str) -> Any:
+    try:
+        return int(tok)
+    except ValueError:
+        return _convert_value(tok)
+
+
+def _float_cell(tok: str) -> Any:
+    if '.' in tok:
+        try:
+            return float(tok)
+        except ValueError:
+            pass
+    return _convert_value(tok)
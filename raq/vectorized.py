@@ -0,0 +1,205 @@
+from __future__ import annotations
+
+from array import array
+from typing import Any, Dict, List, Optional, Tuple
+
+from .columnar import Column, DictColumn, is_numpy_column, np, shares_dictionary
+from .predicate import PredNode, PConst, PAttr, PUnary, PBinary, _COMPARE_OPS
+
+# Python compares ints and floats exactly; NumPy goes through float64, which is
+# only exact up to 2**53.
+_EXACT_FLOAT_INT = 1 << 53
+_INT64_MIN = -(1 << 63)
+_INT64_MAX = (1 << 63) - 1
+
+
+class _NotVectorizable(Exception):
+    pass
+
+
+def numeric_array(col: Column) -> Optional["np.ndarray"]:
+    """View a typed column as a NumPy array (zero-copy for array.array)."""
+    if np is None:
+        return None
+    if is_numpy_column(col):
+        return col if col.dtype.kind in 'if' else None
+    if isinstance(col, array) and col.typecode in ('q', 'd'):
+        return np.frombuffer(col, dtype=np.int64 if col.typecode == 'q' else np.float64)
+    return None
+
+
+def conjunct_masks(
+    conjuncts: List[PredNode], columns: Dict[str, Column], length: int
+) -> Tuple[Optional["np.ndarray"], List[PredNode]]:
+    """Lower the leading run of vectorizable conjuncts to one boolean mask.
+
+    Returns (mask or None, conjuncts that must still be evaluated row-wise).
+    Lowering stops at the first conjunct that cannot be vectorized, so the
+    row-wise remainder sees exactly the rows short-circuiting ``and`` would
+    hand it. Only int64/float64 columns, numeric/bool constants,
+    comparisons, and/or/not and unary minus are lowered, plus ``=``/``!=``
+    between a dictionary-encoded column and a constant or a column sharing
+    its dictionary, which compare codes.
+    """
+    if np is None:
+        return None, list(conjuncts)
+    lowering = _Lowering(columns, length)
+    mask = None
+    for i, c in enumerate(conjuncts):
+        try:
+            m = lowering.mask(c)
+        except _NotVectorizable:
+            return mask, list(conjuncts[i:])
+        mask = m if mask is None else mask & m
+    return mask, []
+
+
+class _Lowering:
+    def __init__(self, columns: Dict[str, Column], length: int):
+        self.columns = columns
+        self.length = length
+        self.arrays: Dict[str, "np.ndarray"] = {}
+
+    def column(self, name: str) -> "np.ndarray":
+        if name not in self.arrays:
+            col = self.columns.get(name)
+            arr = numeric_array(col) if col is not None else None
+            if arr is None:
+                raise _NotVectorizable(name)
+            self.arrays[name] = arr
+        return self.arrays[name]
+
+    def mask(self, pred: PredNode) -> "np.ndarray":
+        if isinstance(pred, PConst):
+            return np.full(self.length, bool(pred.value), dtype=bool)
+        if isinstance(pred, PUnary):
+            if pred.op == 'not':
+                return ~self.mask(pred.expr)
+            if pred.op == 'neg':
+                return self.value(pred) != 0
+            raise _NotVectorizable(pred.op)
+        if isinstance(pred, PBinary):
+            if pred.op == 'and':
+                return self.mask(pred.left) & self.mask(pred.right)
+            if pred.op == 'or':
+                return self.mask(pred.left) | self.mask(pred.right)
+            op = _COMPARE_OPS.get(pred.op)
+            if op is None:
+                raise _NotVectorizable(pred.op)
+            if pred.op in ('=', '==', '!='):
+                equal = self.code_equality(pred.left, pred.right)
+                if equal is not None:
+                    return ~equal if pred.op == '!=' else equal
+            lv = self.value(pred.left)
+            rv = self.value(pred.right)
+            self._check_exact(lv, rv)
+            out = op(lv, rv)
+            if not isinstance(out, np.ndarray):
+                return np.full(self.length, bool(out), dtype=bool)
+            return out
+        if isinstance(pred, PAttr):
+            return self.column(pred.name) != 0
+        raise _NotVectorizable(pred)
+
+    def code_equality(self, left: PredNode, right: PredNode) -> Optional["np.ndarray"]:
+        """``left = right`` over dictionary codes, or None when neither side is an encoded column."""
+        if isinstance(right, PAttr) and not isinstance(left, PAttr):
+            left, right = right, left
+        col = self.columns.get(left.name) if isinstance(left, PAttr) else None
+        if not isinstance(col, DictColumn):
+            return None
+        codes = np.frombuffer(col.codes, dtype=np.intc)
+        if isinstance(right, PConst):
+            # Encoded columns hold only strings and None, so any other
+            # constant (and any absent string) equals no row.
+            code = col.dictionary.code(right.value)
+            if code is None:
+                return np.zeros(self.length, dtype=bool)
+            return codes == code
+        if isinstance(right, PAttr):
+            other = self.columns.get(right.name)
+            if other is not None and shares_dictionary(col, other):
+                return codes == np.frombuffer(other.codes, dtype=np.intc)
+        return None
+
+    def value(self, node: PredNode) -> Any:
+        if isinstance(node, PConst):
+            v = node.value
+            if type(v) is bool or (type(v) is float):
+                return v
+            if type(v) is int and _INT64_MIN <= v <= _INT64_MAX:
+                return v
+            raise _NotVectorizable(v)
+        if isinstance(node, PAttr):
+            return self.column(node.name)
+        if isinstance(node, PUnary) and node.op == 'neg':
+            v = self.value(node.expr)
+            if isinstance(v, np.ndarray):
+                if v.dtype.kind == 'b' or (v.dtype.kind == 'i' and len(v) and v.min() == _INT64_MIN):
+                    raise _NotVectorizable(node)
+            elif type(v) is bool or v == _INT64_MIN:
+                raise _NotVectorizable(node)
+            return -v
+        return self.mask(node)
+
+    def _check_exact(self, lv: Any, rv: Any) -> None:
+        """Reject int/float mixes NumPy would compare through a lossy float64."""
+        kinds = {_kind(lv), _kind(rv)}
+        if not ('f' in kinds and 'i' in kinds):
+            return
+        for v in (lv, rv):
+            if _kind(v) != 'i':
+                continue
+            if isinstance(v, np.ndarray):
+                if len(v) and (v.min() < -_EXACT_FLOAT_INT or v.max() > _EXACT_FLOAT_INT):
+                    raise _NotVectorizable(v)
+            elif not -_EXACT_FLOAT_INT <= v <= _EXACT_FLOAT_INT:
+                raise _NotVectorizable(v)
+
+
+def _kind(v: Any) -> str:
+    if isinstance(v, np.ndarray):
+        return v.dtype.kind
+    if type(v) is float:
+        return 'f'
+    if type(v) is int:
+        return 'i'
+    return 'b'
+
+
+def code_join_positions(
+    left_codes: List[array], right_codes: List[array], sizes: List[int]
+) -> Optional[Tuple["np.ndarray", "np.ndarray"]]:
+    """Row positions (left, right) of an equi-join on dictionary codes.
+
+    ``left_codes[k]`` and ``right_codes[k]`` are the codes of the k-th key
+    column on each side, drawn from a dictionary of ``sizes[k]`` values.
+    Pairs come out left-major with right rows in input order, as
+    ``executor._hash_join_pairs`` yields them. None without NumPy or when
+    the combined key would not fit in int64.
+    """
+    if np is None:
+        return None
+    lk = np.zeros(len(left_codes[0]), dtype=np.int64)
+    rk = np.zeros(len(right_codes[0]), dtype=np.int64)
+    span = 1
+    for lc, rc, size in zip(left_codes, right_codes, sizes):
+        span *= max(size, 1)
+        if span > _INT64_MAX:
+            return None
+        lk = lk * size + np.frombuffer(lc, dtype=np.intc)
+        rk = rk * size + np.frombuffer(rc, dtype=np.intc)
+    if len(left_codes) > 1:
+        # Renumber the combined keys densely so they can index bincount.
+        _, inverse = np.unique(np.concatenate([lk, rk]), return_inverse=True)
+        lk, rk = inverse[:len(lk)], inverse[len(lk):]
+        span = int(inverse.max()) + 1 if len(inverse) else 1
+    order = np.argsort(rk, kind="stable")
+    counts = np.bincount(rk, minlength=span)
+    starts = np.cumsum(counts) - counts
+    per_left = counts[lk]
+    left_pos = np.repeat(np.arange(len(lk)), per_left)
+    first = np.cumsum(per_left) - per_left
+    within = np.arange(len(left_pos)) - np.repeat(first, per_left)
+    right_pos = order[np.repeat(starts[lk], per_left) + within]
+    return left_pos, right_pos
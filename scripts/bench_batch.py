@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import random
+import sys
+import time
+from pathlib import Path
+
+# Ensure project root is on sys.path when running from scripts/
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from raq import evaluate, evaluate_batch, parse_query
+from raq.datatypes import Relation
+from raq.executor import BatchStats
+
+
+def make_relations(n: int) -> dict:
+    rng = random.Random(0)
+    customers = [{"Cust": f"C{i}", "Region": f"R{rng.randrange(20)}", "Tier": rng.randint(1, 3)} for i in range(n // 10)]
+    orders = [{"OID": i, "Cust": f"C{rng.randrange(n // 10)}", "Amount": rng.randint(1, 1000),
+               "Status": rng.choice(["open", "shipped", "paid"])} for i in range(n)]
+    return {
+        "Customers": Relation("Customers", ["Cust", "Region", "Tier"], customers, distinct=True),
+        "Orders": Relation("Orders", ["OID", "Cust", "Amount", "Status"], orders, distinct=True),
+    }
+
+
+def make_report(count: int) -> list[str]:
+    """``count`` report queries built over a few shared joins and filters."""
+    rng = random.Random(1)
+    bases = [
+        "(Orders ⋈ Customers)",
+        "(σ Status = 'open' (Orders) ⋈ Customers)",
+        "(σ Tier = 1 (Customers) ⋈ Orders)",
+    ]
+    shapes = [
+        "π Region ({base})",
+        "π Cust, Amount (σ Amount > {a} {base})",
+        "σ Region = 'R{r}' {base}",
+        "π Status (σ Region = 'R{r}' {base})",
+    ]
+    return [
+        rng.choice(shapes).format(base=rng.choice(bases), a=rng.randrange(0, 1000, 100), r=rng.randrange(20))
+        for _ in range(count)
+    ]
+
+
+def main(argv: list[str]) -> int:
+    n = int(argv[1]) if len(argv) > 1 else 50_000
+    count = int(argv[2]) if len(argv) > 2 else 200
+    rels = make_relations(n)
+    queries = make_report(count)
+    asts = [parse_query(q) for q in queries]
+
+    t0 = time.perf_counter()
+    separate = [evaluate(ast, rels) for ast in asts]
+    one_by_one = time.perf_counter() - t0
+
+    stats = BatchStats()
+    batched = list(evaluate_batch(asts, rels, stats=stats))
+
+    assert [(r.name, r.rows) for r in separate] == [(r.name, r.rows) for r in batched]
+    print(f"{count} queries over {n} orders, {len(set(queries))} distinct")
+    print(f"one by one  {one_by_one:7.2f} s")
+    print(f"batch       {stats.seconds:7.2f} s  ({one_by_one / stats.seconds:.1f}x); {stats.shared} shared subplans "
+          f"reused {stats.reused} times, saving about {stats.saved:.2f} s")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv))
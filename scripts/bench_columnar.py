@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import random
+import sys
+import time
+from pathlib import Path
+
+# Ensure project root is on sys.path when running from scripts/
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from raq import parse_definitions, parse_query, evaluate
+from raq.columnar import ColumnarRows, is_numpy_column, numpy_available
+
+
+def make_text(n: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    depts = ["Sales", "HR", "Engineering", "Support", "Finance"]
+    lines = ["Employees (EID, Name, Dept, Age, Salary) = {"]
+    for i in range(n):
+        lines.append(f"  E{i}, N{rng.randrange(50000)}, {rng.choice(depts)}, {rng.randint(18, 65)}, {rng.uniform(1000, 9000):.2f}")
+    lines.append("}")
+    return "\n".join(lines)
+
+
+def deep_size(rels) -> int:
+    """Bytes held by the relations' row storage, counting each object once."""
+    seen: set[int] = set()
+
+    def size(obj) -> int:
+        if id(obj) in seen:
+            return 0
+        seen.add(id(obj))
+        if is_numpy_column(obj):
+            # getsizeof only includes the data buffer when the array owns it
+            return sys.getsizeof(obj) + (obj.nbytes if obj.base is not None else 0)
+        total = sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            total += sum(size(k) + size(v) for k, v in obj.items())
+        elif isinstance(obj, (list, tuple)):
+            total += sum(size(v) for v in obj)
+        elif isinstance(obj, ColumnarRows):
+            total += sum(size(c) for c in obj.columns.values())
+        return total
+
+    return sum(size(r.rows) for r in rels.values())
+
+
+def measure(text: str, use_numpy: bool | None) -> tuple[float, int, float]:
+    t0 = time.perf_counter()
+    if use_numpy is None:
+        rels = parse_definitions(text)
+    else:
+        rels = parse_definitions(text, layout="columnar")
+        rels = {k: v.to_columnar(use_numpy=use_numpy) for k, v in rels.items()}
+    load = time.perf_counter() - t0
+    held = deep_size(rels)
+
+    query = parse_query("σ Age > 30 and Salary <= 5000 (Employees)")
+    t0 = time.perf_counter()
+    evaluate(query, rels)
+    return load, held, time.perf_counter() - t0
+
+
+def main(argv: list[str]) -> int:
+    n = int(argv[1]) if len(argv) > 1 else 200_000
+    text = make_text(n)
+    configs = [("rows", None), ("columnar (array)", False)]
+    if numpy_available():
+        configs.append(("columnar (numpy)", True))
+
+    print(f"Relation: Employees (EID, Name, Dept, Age, Salary), {n} rows")
+    print(f"{'layout':<18} {'held MiB':>9} {'B/row':>7} {'load s':>7} {'select s':>9}")
+    for label, use_numpy in configs:
+        load, held, q = measure(text, use_numpy)
+        print(f"{label:<18} {held / 2**20:9.1f} {held / n:7.0f} {load:7.2f} {q:9.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv))
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import random
+import sys
+import time
+from pathlib import Path
+
+# Ensure project root is on sys.path when running from scripts/
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from raq import parse_definitions, parse_query, evaluate
+from raq.columnar import ColumnarRows, DictColumn, StringDictionary, is_numpy_column
+
+QUERIES = [
+    ("join", "Orders ⋈ Regions"),
+    ("dedup", "π Region, Status (Orders)"),
+    ("intersect", "π Region, Status (Orders) ∩ π Region, Status (σ Status = 'paid' (Orders))"),
+    ("select", "σ Status = 'open' (Orders)"),
+]
+
+
+def make_text(n: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    regions = [f"Region{i}" for i in range(200)]
+    lines = ["Orders (OID, Region, Status, Amount) = {"]
+    for i in range(n):
+        lines.append(f"  {i}, {rng.choice(regions)}, {rng.choice(['open', 'shipped', 'paid', 'returned'])}, "
+                     f"{rng.randint(1, 1000)}")
+    lines.append("}")
+    lines.append("Regions (Region, Manager) = {")
+    lines.extend(f"  {r}, M{rng.randrange(50)}" for r in regions)
+    lines.append("}")
+    return "\n".join(lines)
+
+
+def deep_size(rels) -> int:
+    """Bytes held by the relations' row storage, counting each object once."""
+    seen: set[int] = set()
+
+    def size(obj) -> int:
+        if id(obj) in seen:
+            return 0
+        seen.add(id(obj))
+        if is_numpy_column(obj):
+            return sys.getsizeof(obj) + (obj.nbytes if obj.base is not None else 0)
+        total = sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            total += sum(size(k) + size(v) for k, v in obj.items())
+        elif isinstance(obj, (list, tuple)):
+            total += sum(size(v) for v in obj)
+        elif isinstance(obj, ColumnarRows):
+            total += sum(size(c) for c in obj.columns.values())
+        elif isinstance(obj, DictColumn):
+            total += size(obj.codes) + size(obj.dictionary)
+        elif isinstance(obj, StringDictionary):
+            total += size(obj.codes) + size(obj.values)
+        return total
+
+    return sum(size(r.rows) for r in rels.values())
+
+
+def main(argv: list[str]) -> int:
+    n = int(argv[1]) if len(argv) > 1 else 1_000_000
+    text = make_text(n)
+    print(f"Orders (OID, Region, Status, Amount) {n} rows, Regions 200 rows")
+    print(f"{'layout':<11} {'held MiB':>9} " + " ".join(f"{label + ' s':>11}" for label, _ in QUERIES))
+    expected = None
+    for layout in ("rows", "columnar", "dictionary"):
+        rels = parse_definitions(text, layout)
+        held = deep_size(rels)
+        cells = []
+        results = []
+        for _, q in QUERIES:
+            ast = parse_query(q)
+            t0 = time.perf_counter()
+            res = evaluate(ast, rels)
+            cells.append(time.perf_counter() - t0)
+            results.append(list(res.rows))
+        if expected is None:
+            expected = results
+        assert results == expected
+        print(f"{layout:<11} {held / 2**20:9.1f} " + " ".join(f"{c:11.3f}" for c in cells))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv))
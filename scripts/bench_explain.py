@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import random
+import sys
+import time
+from pathlib import Path
+
+# Ensure project root is on sys.path when running from scripts/
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from raq import evaluate, parse_query
+from raq.datatypes import Relation
+from raq.explain import explain, explain_analyze, format_explain
+
+QUERY = "π Region, Amount (σ Amount > 500 (Orders ⋈ Customers) ⋈[left.Amount >= right.Lo and left.Amount < right.Hi] Bands)"
+
+
+def main(argv: list[str]) -> int:
+    n = int(argv[1]) if len(argv) > 1 else 50_000
+    rng = random.Random(0)
+    customers = max(n // 10, 1)
+    rels = {
+        "Orders": Relation("Orders", ["OID", "CID", "Amount"], [
+            {"OID": i, "CID": rng.randrange(customers), "Amount": rng.randint(1, 1000)} for i in range(n)
+        ], distinct=True),
+        "Customers": Relation("Customers", ["CID", "Region"], [
+            {"CID": i, "Region": rng.choice("NESW")} for i in range(customers)
+        ], distinct=True),
+        "Bands": Relation("Bands", ["Lo", "Hi"], [{"Lo": lo, "Hi": lo + 100} for lo in range(0, 1000, 100)],
+                          distinct=True),
+    }
+    ast = parse_query(QUERY)
+
+    print(f"Orders {n} rows, Customers {customers} rows")
+    print("Explain:")
+    print(format_explain(explain(ast, rels)))
+
+    t0 = time.perf_counter()
+    expected = evaluate(ast, rels)
+    plain = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    res, _ = explain_analyze(ast, rels, trace_memory=False)
+    timed = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    res2, tree = explain_analyze(ast, rels)
+    traced = time.perf_counter() - t0
+    assert res.rows == expected.rows and res2.rows == expected.rows
+
+    print("Explain analyze:")
+    print(format_explain(tree))
+    print(f"evaluate                  {plain:7.3f} s")
+    print(f"explain analyze           {timed:7.3f} s  ({timed / plain:.2f}x)")
+    print(f"  with memory tracing     {traced:7.3f} s  ({traced / plain:.2f}x)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv))
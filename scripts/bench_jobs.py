@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+# Ensure project root is on sys.path when running from scripts/
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from raq.datatypes import Relation
+from raq.parallel import fork_available, run_queries
+from raq.printer import format_relation
+
+SHAPES = [
+    "π Region (σ Amount > {a} (Orders ⋈ Customers))",
+    "σ CID = {c} (Orders)",
+    "π CID (σ Amount >= {a} and Amount < {b} (Orders))",
+    "Orders ⋈[left.CID = right.CID and Amount > Limit] σ Region = '{r}' (Customers)",
+]
+
+
+def main(argv: list[str]) -> int:
+    if not fork_available():
+        print("fork is unavailable on this platform; queries run serially.")
+        return 1
+    n = int(argv[1]) if len(argv) > 1 else 50_000
+    count = int(argv[2]) if len(argv) > 2 else 100
+    rng = random.Random(0)
+    customers = max(n // 10, 1)
+    rels = {
+        "Orders": Relation("Orders", ["OID", "CID", "Amount"], [
+            {"OID": i, "CID": rng.randrange(customers), "Amount": rng.randint(1, 1000)} for i in range(n)
+        ], distinct=True),
+        "Customers": Relation("Customers", ["CID", "Region", "Limit"], [
+            {"CID": i, "Region": rng.choice("NESW"), "Limit": rng.randint(100, 900)} for i in range(customers)
+        ], distinct=True),
+    }
+    queries = []
+    for _ in range(count):
+        a = rng.randint(1, 900)
+        queries.append(rng.choice(SHAPES).format(a=a, b=a + 50, c=rng.randrange(customers), r=rng.choice("NESW")))
+    cpus = os.cpu_count() or 1
+    counts = [j for j in (2, 4, 8, 16, 32, 64) if j <= cpus] or [2]
+
+    t0 = time.perf_counter()
+    expected = list(run_queries(queries, rels, 1, render=format_relation))
+    serial = time.perf_counter() - t0
+    print(f"{count} queries, Orders {n} rows, Customers {customers} rows, {cpus} CPUs")
+    print(f"{'jobs':>5} {'s':>8} {'speedup':>8}")
+    print(f"{1:>5} {serial:8.2f} {1:7.2f}x")
+    for j in counts:
+        t0 = time.perf_counter()
+        got = list(run_queries(queries, rels, j, render=format_relation))
+        elapsed = time.perf_counter() - t0
+        assert got == expected
+        print(f"{j:>5} {elapsed:8.2f} {serial / elapsed:7.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv))
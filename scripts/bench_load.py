@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Ensure project root is on sys.path when running from scripts/
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from raq.datatypes import Relation
+from raq.defs_parser import parse_definitions_file
+from raq.values import _convert_value, _parse_csv_row
+
+
+def write_defs(path: str, n: int) -> None:
+    rng = random.Random(0)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("Orders (OID, CID, Amount, Status) = {\n")
+        for i in range(n):
+            f.write(f"  {i}, {rng.randrange(n // 10 + 1)}, {rng.randint(1, 1000)}.{rng.randint(0, 99):02d}, "
+                    f"{rng.choice(['open', 'shipped', 'paid', 'null'])}\n")
+        f.write("}\n\nPeople (PID, Name, Age) = {\n")
+        for i in range(n // 2):
+            f.write(f"  P{i}, \"Name {i}\", {rng.randint(18, 90)}\n")
+        f.write("}\n")
+
+
+def load_per_cell(path: str) -> dict:
+    """The row-at-a-time loader: one csv reader per line, every cell through _convert_value."""
+    rels = {}
+    lines = Path(path).read_text(encoding="utf-8").splitlines()
+    i = 0
+    while i < len(lines):
+        line = lines[i].strip()
+        i += 1
+        if '(' in line and '=' in line and '{' in line:
+            name, rest = line.split('(', 1)
+            attrs = [a.strip() for a in rest.split(')', 1)[0].split(',')]
+            rows = []
+            while '}' not in lines[i]:
+                cols = _parse_csv_row(lines[i].strip().removesuffix(','))
+                rows.append(dict(zip(attrs, map(_convert_value, cols))))
+                i += 1
+            rel = Relation(name.strip(), attrs, rows)
+            rel.dedup()
+            rels[rel.name] = rel
+    return rels
+
+
+def main(argv: list[str]) -> int:
+    n = int(argv[1]) if len(argv) > 1 else 1_000_000
+    total = n + n // 2
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "defs.txt")
+        write_defs(path, n)
+        print(f"{total} rows, {os.path.getsize(path) / (1 << 20):.1f} MiB")
+        print(f"{'seconds':>8} {'rows/s':>12}  loader")
+        t0 = time.perf_counter()
+        expected = load_per_cell(path)
+        base = time.perf_counter() - t0
+        print(f"{base:8.2f} {total / base:12,.0f}  per cell")
+        for layout in ("rows", "columnar"):
+            t0 = time.perf_counter()
+            got = parse_definitions_file(path, layout)
+            elapsed = time.perf_counter() - t0
+            assert all(list(got[k].rows) == expected[k].rows for k in expected)
+            print(f"{elapsed:8.2f} {total / elapsed:12,.0f}  parse_definitions_file(layout={layout!r}), "
+                  f"{base / elapsed:.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv))
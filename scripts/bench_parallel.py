@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+# Ensure project root is on sys.path when running from scripts/
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from raq import parse_query, evaluate
+from raq.datatypes import Relation
+from raq.parallel import evaluate_parallel, fork_available
+
+QUERIES = [
+    "Orders ⋈ Customers",
+    "Orders ⋈[left.CID = right.CID and Amount > Limit] Customers",
+    "σ Amount > 500 and CID != 17 or OID < 1000 (Orders)",
+]
+
+
+def main(argv: list[str]) -> int:
+    if not fork_available():
+        print("fork is unavailable on this platform; evaluation runs serially.")
+        return 1
+    n = int(argv[1]) if len(argv) > 1 else 1_000_000
+    rng = random.Random(0)
+    customers = max(n // 10, 1)
+    rels = {
+        "Orders": Relation("Orders", ["OID", "CID", "Amount"], [
+            {"OID": i, "CID": rng.randrange(customers), "Amount": rng.randint(1, 1000)} for i in range(n)
+        ], distinct=True),
+        "Customers": Relation("Customers", ["CID", "Region", "Limit"], [
+            {"CID": i, "Region": rng.choice("NESW"), "Limit": rng.randint(100, 900)} for i in range(customers)
+        ], distinct=True),
+    }
+    cpus = os.cpu_count() or 1
+    counts = [w for w in (2, 4, 8, 16, 32) if w <= cpus] or [2]
+
+    print(f"Orders {n} rows, Customers {customers} rows, {cpus} CPUs")
+    print(f"{'serial s':>9} " + " ".join(f"{f'{w} workers':>10}" for w in counts) + "  query")
+    for q in QUERIES:
+        ast = parse_query(q)
+        t0 = time.perf_counter()
+        expected = evaluate(ast, rels)
+        serial = time.perf_counter() - t0
+        cells = []
+        for w in counts:
+            t0 = time.perf_counter()
+            got = evaluate_parallel(ast, rels, workers=w)
+            elapsed = time.perf_counter() - t0
+            assert got.rows == expected.rows
+            cells.append(f"{serial / elapsed:9.2f}x")
+        print(f"{serial:9.3f} " + " ".join(cells) + f"  {q}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv))
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import random
+import sys
+import time
+from pathlib import Path
+
+# Ensure project root is on sys.path when running from scripts/
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from raq.ra_parser import Parser, clear_parse_cache, parse_cache_info, parse_query, parse_query_uncached
+from raq.tokens import _tokenize_chars, tokenize
+
+# Timed runs per measurement; the fastest is reported.
+REPEAT = 3
+
+
+def make_queries(n: int) -> list[str]:
+    """``n`` distinct short queries of the shapes clients send."""
+    rng = random.Random(0)
+    shapes = [
+        "σ Age > {a} (Employees)",
+        "π Name, Dept (σ Age >= {a} and Dept = 'D{b}' (Employees))",
+        "Employees ⋈ Departments",
+        "join [left.Dept = right.Dept and left.Age < {a}] (Employees, Departments)",
+        "select Salary <= {a}.5 or not Dept != \"D{b}\" (Employees)",
+        "π EID (Employees) − π EID (σ Age < {a} (Employees))",
+        "union(σ Dept = 'D{b}' (Employees), σ Age > {a} (Employees))",
+    ]
+    queries: set[str] = set()
+    while len(queries) < n:
+        queries.add(rng.choice(shapes).format(a=rng.randint(18, 90), b=rng.randint(0, 99)))
+    return sorted(queries)
+
+
+def parse_chars(expr: str):
+    """``parse_query`` before: the character-loop tokenizer and no cache."""
+    parser = Parser(_tokenize_chars(expr, 0, []))
+    ast = parser.parse_rel_expr()
+    if parser.peek() is not None:
+        raise ValueError(f"Unexpected input after end of expression: {parser.peek()}")
+    return ast
+
+
+def latencies(parse, stream: list[str]) -> list[float]:
+    out = []
+    clock = time.perf_counter_ns
+    for q in stream:
+        t0 = clock()
+        parse(q)
+        out.append(clock() - t0)
+    out.sort()
+    return out
+
+
+def pct(sorted_ns: list[float], p: float) -> float:
+    return sorted_ns[min(int(len(sorted_ns) * p), len(sorted_ns) - 1)] / 1000
+
+
+def main(argv: list[str]) -> int:
+    n = int(argv[1]) if len(argv) > 1 else 50_000
+    distinct = make_queries(500)
+    rng = random.Random(1)
+    stream = [rng.choice(distinct) for _ in range(n)]
+    assert all(tokenize(q) == _tokenize_chars(q, 0, []) for q in distinct)
+    assert all(parse_query(q) == parse_chars(q) for q in distinct)
+
+    ntokens = sum(len(tokenize(q)) for q in stream)
+    print(f"{n} queries ({len(distinct)} distinct), {ntokens / n:.1f} tokens each")
+    print(f"{'tokenizer':<22} {'tokens/s':>12}")
+    for label, tok in (("character loop", lambda q: _tokenize_chars(q, 0, [])), ("regex", tokenize)):
+        best = float("inf")
+        for _ in range(REPEAT):
+            t0 = time.perf_counter()
+            for q in stream:
+                tok(q)
+            best = min(best, time.perf_counter() - t0)
+        print(f"{label:<22} {ntokens / best:12,.0f}")
+
+    # The cached runs after the first are all hits.
+    print(f"{'parse':<22} {'p50 us':>8} {'p99 us':>8} {'queries/s':>12}")
+    clear_parse_cache()
+    for label, parse in (
+        ("before (no cache)", parse_chars),
+        ("regex (no cache)", parse_query_uncached),
+        ("regex + cache", parse_query),
+    ):
+        ns = min((latencies(parse, stream) for _ in range(REPEAT)), key=sum)
+        print(f"{label:<22} {pct(ns, 0.50):8.1f} {pct(ns, 0.99):8.1f} {n / (sum(ns) / 1e9):12,.0f}")
+    info = parse_cache_info()
+    print(f"cache: {info.hits} hits, {info.misses} misses, {info.currsize}/{info.maxsize} entries")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv))
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import random
+import sys
+import time
+from pathlib import Path
+
+# Ensure project root is on sys.path when running from scripts/
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from raq import evaluate, parse_query, prepare
+from raq.datatypes import Relation
+from raq.indexes import build_index
+
+
+def make_orders(n: int) -> dict:
+    rng = random.Random(0)
+    rows = [{"OID": i, "Cust": f"C{rng.randrange(n // 10 + 1)}", "Amount": rng.randint(1, 1000)} for i in range(n)]
+    rel = Relation("Orders", ["OID", "Cust", "Amount"], rows, distinct=True)
+    build_index(rel, "Cust", "hash")
+    return {"Orders": rel}
+
+
+def main(argv: list[str]) -> int:
+    n = int(argv[1]) if len(argv) > 1 else 100_000
+    runs = 5_000
+    rels = make_orders(n)
+    rng = random.Random(1)
+    params = [(f"C{rng.randrange(n // 10 + 1)}", rng.randint(1, 1000)) for _ in range(runs)]
+    text = "σ Cust = {!r} and Amount > {} (Orders)"
+
+    t0 = time.perf_counter()
+    formatted = [evaluate(parse_query(text.format(c, a)), rels).rows for c, a in params]
+    before = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    query = prepare("σ Cust = $1 and Amount > $2 (Orders)", rels)
+    prepared = [query.execute(p, rels).rows for p in params]
+    after = time.perf_counter() - t0
+
+    assert formatted == prepared
+    print(f"{runs} executions over {n} indexed rows")
+    print(f"{'formatted text':<16} {before / runs * 1e6:8.1f} us/query")
+    print(f"{'prepared':<16} {after / runs * 1e6:8.1f} us/query  ({before / after:.1f}x)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv))
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import sys
+import time
+from pathlib import Path
+
+# Ensure project root is on sys.path when running from scripts/
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from raq import parse_query, evaluate
+from raq.columnar import ColumnarRows, numpy_available, np
+from raq.datatypes import Relation
+
+QUERIES = [
+    "σ Age > 30 and Salary <= 5000 (Employees)",
+    "σ (Age < 25 or Age >= 60) and not (Salary > 8000) (Employees)",
+    "σ -Age < -40 and EID != 17 (Employees)",
+]
+
+
+def main(argv: list[str]) -> int:
+    if not numpy_available():
+        print("NumPy is not installed; vectorized selection is unavailable.")
+        return 1
+    n = int(argv[1]) if len(argv) > 1 else 1_000_000
+    rng = np.random.default_rng(0)
+    header = ["EID", "Age", "Salary"]
+    columns = {
+        "EID": np.arange(n, dtype=np.int64),
+        "Age": rng.integers(18, 66, n),
+        "Salary": np.round(rng.uniform(1000, 9000, n), 2),
+    }
+    columnar = Relation("Employees", header, ColumnarRows(header, columns), distinct=True)
+    rows = columnar.to_rows()
+    rows.distinct = True
+
+    print(f"Employees (EID, Age, Salary), {n} rows")
+    print(f"{'row-wise s':>10} {'vector s':>9} {'speedup':>8}  query")
+    for q in QUERIES:
+        ast = parse_query(q)
+        t0 = time.perf_counter()
+        expected = evaluate(ast, {"Employees": rows})
+        row_wise = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        got = evaluate(ast, {"Employees": columnar})
+        vector = time.perf_counter() - t0
+        assert len(got.rows) == len(expected.rows)
+        print(f"{row_wise:10.3f} {vector:9.3f} {row_wise / vector:7.1f}x  {q}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv))
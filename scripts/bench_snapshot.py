@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Ensure project root is on sys.path when running from scripts/
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from raq.defs_parser import parse_definitions_file
+from raq.snapshot import load_snapshot, save_snapshot, source_digest
+
+
+def write_defs(path: str, n: int) -> None:
+    rng = random.Random(0)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("Orders (OID, CID, Amount, Status) = {\n")
+        for i in range(n):
+            f.write(f"  {i}, {rng.randrange(n // 10 + 1)}, {rng.randint(1, 1000)}.{rng.randint(0, 99):02d}, "
+                    f"{rng.choice(['open', 'shipped', 'paid', 'null'])}\n")
+        f.write("}\n")
+
+
+def main(argv: list[str]) -> int:
+    n = int(argv[1]) if len(argv) > 1 else 1_000_000
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "defs.txt")
+        snap = path + ".snap"
+        write_defs(path, n)
+        print(f"{n} rows, text {os.path.getsize(path) / (1 << 20):.1f} MiB")
+        print(f"{'parse s':>8} {'hash s':>7} {'load s':>7}  layout")
+        for layout in ("rows", "columnar"):
+            t0 = time.perf_counter()
+            expected = parse_definitions_file(path, layout)
+            parse = time.perf_counter() - t0
+            save_snapshot(expected, snap, source_digest(path))
+            t0 = time.perf_counter()
+            source_digest(path)
+            digest = time.perf_counter() - t0
+            t0 = time.perf_counter()
+            got = load_snapshot(snap, layout)
+            load = time.perf_counter() - t0
+            assert all(list(got[k].rows) == list(expected[k].rows) for k in expected)
+            print(f"{parse:8.2f} {digest:7.2f} {load:7.2f}  {layout} "
+                  f"(snapshot {os.path.getsize(snap) / (1 << 20):.1f} MiB, {parse / (digest + load):.1f}x)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv))
@@ -9,17 +9,20 @@ ROOT = Path(__file__).resolve().parents[1]
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
-from raq import parse_definitions, parse_query, evaluate, print_relation
+from raq import parse_definitions, parse_query, evaluate, evaluate_batch, print_relation
 
 
 def main(argv: list[str]) -> int:
+    # --batch evaluates all queries together, computing shared subplans once
+    batch = "--batch" in argv[1:]
+    argv = [a for a in argv if a != "--batch"]
     # Accept optional path; default to examples/test.txt if present
     if len(argv) < 2:
         default = ROOT / 'examples' / 'test.txt'
         if default.exists():
             path = str(default)
         else:
-            print("Usage: python3 scripts/echo_run.py <input-file>")
+            print("Usage: python3 scripts/echo_run.py [--batch] <input-file>")
             return 2
     else:
         path = argv[1]
@@ -40,10 +43,12 @@ def main(argv: list[str]) -> int:
         return 1
 
     print("\n=== Output ===")
-    for idx, q in enumerate(queries, 1):
+    if batch:
+        results = evaluate_batch([parse_query(q) for q in queries], relations)
+    else:
+        results = (evaluate(parse_query(q), relations) for q in queries)
+    for idx, (q, result) in enumerate(zip(queries, results), 1):
         print(f"\n--- Query {idx} ---\n{q}")
-        ast = parse_query(q)
-        result = evaluate(ast, relations)
         print_relation(result)
         print(f"Rows: {len(result.rows)}\n")
 
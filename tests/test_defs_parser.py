@@ -0,0 +1,31 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from raq.defs_parser import load_definitions, reload_definitions
+
+SAMPLE = (ROOT / "examples" / "sample.txt").read_text(encoding="utf-8")
+
+
+def _dictionary(rels, name, attr):
+    return rels[name].rows.columns[attr].dictionary
+
+
+def test_load_definitions_shares_dictionaries_between_blocks():
+    rels, _ = load_definitions(SAMPLE, "dictionary")
+    assert _dictionary(rels, "Employees", "EID") is _dictionary(rels, "EmpDept", "EID")
+
+
+def test_reloaded_block_keeps_sharing_dictionaries():
+    rels, blocks = load_definitions(SAMPLE, "dictionary")
+    # Any edit to the block's text makes :reload parse it again.
+    text = SAMPLE.replace("EmpDept (", "EmpDept  (")
+    new_rels, _, changed = reload_definitions(text, blocks, rels, "dictionary")
+    assert "EmpDept" in changed
+    assert new_rels["EmpDept"] is not rels["EmpDept"]
+    assert _dictionary(new_rels, "Employees", "EID") is _dictionary(new_rels, "EmpDept", "EID")
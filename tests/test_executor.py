@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from raq import evaluate, evaluate_pipelined, parse_query
+from raq.defs_parser import parse_definitions
+from raq.parallel import evaluate_parallel
+
+
+def _rows(rel):
+    return [[r[a] for a in rel.header] for r in rel.rows]
+
+
+@pytest.fixture(params=["rows", "columnar"])
+def nan_rels(request):
+    return parse_definitions("R0 (D) = {\n  nan\n  x\n}\n", request.param)
+
+
+def test_natural_self_join_does_not_match_nan(nan_rels):
+    ast = parse_query("R0 ⋈ R0")
+    assert _rows(evaluate(ast, nan_rels)) == [["x"]]
+    assert _rows(evaluate(ast, nan_rels, join_strategy="nested_loop")) == [["x"]]
+
+
+@pytest.mark.parametrize("run", [evaluate, evaluate_pipelined])
+def test_theta_hash_join_does_not_match_nan(nan_rels, run):
+    ast = parse_query("join [left.D = right.D] (R0, R0)")
+    expected = run(ast, nan_rels, join_strategy="nested_loop")
+    assert _rows(expected) == [["x", "x"]]
+    assert _rows(run(ast, nan_rels)) == _rows(expected)
+
+
+def test_pipelined_natural_join_does_not_match_nan(nan_rels):
+    assert _rows(evaluate_pipelined(parse_query("R0 ⋈ R0"), nan_rels)) == [["x"]]
+
+
+@pytest.mark.parametrize("query", ["R0 ⋈ R0", "join [left.D = right.D] (R0, R0)"])
+def test_partitioned_join_does_not_match_nan(nan_rels, query):
+    ast = parse_query(query)
+    expected = evaluate(ast, nan_rels, join_strategy="nested_loop")
+    assert _rows(evaluate_parallel(ast, nan_rels, workers=2, min_rows=0)) == _rows(expected)
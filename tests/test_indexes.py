@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from raq import evaluate, evaluate_pipelined, parse_query
+from raq.datatypes import Relation
+from raq.explain import explain, explain_analyze
+from raq.indexes import build_index
+
+
+def _employees(kind):
+    rel = Relation("Employees", ["EID", "Age"], [
+        {"EID": "E1", "Age": 32}, {"EID": "E2", "Age": 28}, {"EID": "E3", "Age": 29},
+    ], distinct=True)
+    build_index(rel, "EID", kind)
+    return {"Employees": rel}
+
+
+@pytest.mark.parametrize("kind", ["hash", "sorted"])
+@pytest.mark.parametrize("query", ['σ EID = "E1" (Employees)', 'σ EID == "E1" (Employees)',
+                                   'σ "E1" == EID (Employees)'])
+def test_both_equality_spellings_use_the_index(kind, query):
+    rels = _employees(kind)
+    ast = parse_query(query)
+    res, tree = explain_analyze(ast, rels, trace_memory=False)
+    assert tree.algorithm == "index lookup"
+    assert explain(ast, rels).algorithm == "index lookup"
+    assert [r["Age"] for r in res.rows] == [32]
+
+
+@pytest.mark.parametrize("query", ["R0 ⋈ R0", "join [left.D = right.D] (R0, R0)"])
+def test_indexed_join_does_not_match_nan(query):
+    rels = {"R0": Relation("R0", ["D"], [{"D": float("nan")}, {"D": "x"}], distinct=True)}
+    build_index(rels["R0"], "D", "hash")
+    ast = parse_query(query)
+    expected = evaluate(ast, rels, join_strategy="nested_loop")
+    assert len(expected.rows) == 1
+    assert evaluate(ast, rels).rows == expected.rows
+    assert evaluate_pipelined(ast, rels).rows == expected.rows
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import random
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from raq import evaluate, optimize, parse_query
+from raq.datatypes import Relation
+from raq.ra_ast import RAJoin, RASelect
+
+
+def _rows(rel):
+    return sorted(tuple(repr(r[a]) for a in rel.header) for r in rel.rows)
+
+
+def test_selection_on_mixed_column_is_not_pushed_into_join():
+    rels = {
+        "R": Relation("R", ["A", "B"], [{"A": 1, "B": "x"}, {"A": 2, "B": 5}]),
+        "S": Relation("S", ["A"], [{"A": 2}]),
+    }
+    ast = parse_query("σ B > 3 (R ⋈ S)")
+    plan = optimize(ast, rels)
+    assert isinstance(plan, RASelect) and isinstance(plan.child, RAJoin)
+    assert _rows(evaluate(plan, rels)) == _rows(evaluate(ast, rels)) == [("2", "5")]
+
+
+def test_selection_on_uniform_column_is_pushed_into_join():
+    rels = {
+        "R": Relation("R", ["A", "B"], [{"A": 1, "B": 7}, {"A": 2, "B": 5}]),
+        "S": Relation("S", ["A"], [{"A": 2}]),
+    }
+    plan = optimize(parse_query("σ B > 3 (R ⋈ S)"), rels)
+    assert isinstance(plan, RAJoin) and isinstance(plan.left, RASelect)
+
+
+def test_selection_on_mixed_column_is_not_pushed_into_minus():
+    rels = {
+        "R": Relation("R", ["A"], [{"A": 1}, {"A": "x"}]),
+        "S": Relation("S", ["A"], [{"A": "x"}]),
+    }
+    ast = parse_query("σ A > 0 (R − S)")
+    assert _rows(evaluate(optimize(ast, rels), rels)) == _rows(evaluate(ast, rels)) == [("1",)]
+
+
+VALUES = [0, 1, 2, 3, 1.5, -1, "a", "b", "x", None, True]
+
+QUERIES = [
+    "σ B > 1 (R ⋈ S)",
+    "σ B < 'b' (R ⋈ S)",
+    "σ C >= 2 and B > 0 (R ⋈ S)",
+    "σ -B < 0 (R ⋈ S)",
+    "σ not B > 1 (R ⋈ S)",
+    "σ B > 1 or C = 'a' (R ⋈ S)",
+    "σ B > C (R ⋈ S)",
+    "σ B > 1 (R ⋈[A = right.A] S)",
+    "σ C > 1 (R ⋈[left.A < right.A] S)",
+    "σ B > 1 (π A, B (R ⋈ S))",
+    "σ A > 1 ((π A (R)) − (π A (S)))",
+    "σ A > 1 ((π A (R)) ∩ (π A (S)))",
+    "σ A > 1 ((π A (R)) ∪ (π A (S)))",
+    "σ B > 1 (σ A = 1 (R) ⋈ S)",
+]
+
+
+def _relations(rng, pools):
+    def rel(name, header):
+        rows = [{a: rng.choice(pools[a]) for a in header} for _ in range(rng.randint(0, 6))]
+        return Relation(name, header, rows)
+
+    return {"R": rel("R", ["A", "B"]), "S": rel("S", ["A", "C"])}
+
+
+def test_optimized_results_match_on_mixed_types():
+    rng = random.Random(0)
+    checked = 0
+    for _ in range(400):
+        # Some columns hold one type and some mix them, so some pushes are safe.
+        pools = {a: rng.choice([VALUES, VALUES[:5], VALUES[6:9], VALUES[:3] + [None]]) for a in "ABC"}
+        rels = _relations(rng, pools)
+        for text in QUERIES:
+            ast = parse_query(text)
+            try:
+                expected = evaluate(ast, rels)
+            except (TypeError, ValueError):
+                continue
+            assert _rows(evaluate(optimize(ast, rels), rels)) == _rows(expected), text
+            checked += 1
+    assert checked > 1000
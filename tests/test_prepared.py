@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import random
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from raq import evaluate, parse_query, prepare
+from raq.defs_parser import parse_definitions
+from raq.indexes import build_index
+from raq.predicate import PCompiled, split_conjuncts
+from raq.printer import repr_value
+
+QUERIES = [
+    "σ Cust = $1 and Amount > $2 (Orders)",
+    "σ Amount > $2 and Cust = $1 (Orders)",
+    "σ $2 <= Amount or not Cust != $1 (Orders)",
+    "σ -Amount < -$2 (Orders)",
+    "π Cust (σ Amount >= $2 (Orders ⋈ Customers))",
+    "σ Cust = $1 (Orders ⋈[left.Cust = right.Cust and left.Amount < $2] Customers)",
+]
+
+
+def _relations(layout):
+    rng = random.Random(0)
+    orders = "\n".join(f"  {i}, C{rng.randrange(5)}, {rng.randint(1, 50)}" for i in range(40))
+    customers = "\n".join(f"  C{i}, R{i % 2}" for i in range(5))
+    text = f"Orders (OID, Cust, Amount) = {{\n{orders}\n}}\n\nCustomers (Cust, Region) = {{\n{customers}\n}}\n"
+    return parse_definitions(text, layout)
+
+
+def _formatted(query, cust, amount):
+    return query.replace("$1", repr_value(cust)).replace("$2", repr_value(amount))
+
+
+@pytest.mark.parametrize("layout", ["rows", "columnar", "indexed"])
+def test_prepared_results_match_formatted_queries(layout):
+    rels = _relations("rows" if layout == "indexed" else layout)
+    if layout == "indexed":
+        build_index(rels["Orders"], "Cust", "hash")
+        build_index(rels["Orders"], "Amount", "sorted")
+    rng = random.Random(1)
+    for query in QUERIES:
+        prepared = prepare(query, rels)
+        for _ in range(20):
+            cust, amount = f"C{rng.randrange(6)}", rng.randint(0, 55)
+            expected = evaluate(parse_query(_formatted(query, cust, amount)), rels)
+            assert list(prepared.execute([cust, amount], rels).rows) == list(expected.rows), query
+
+
+def test_selection_is_compiled_once_at_prepare_time():
+    rels = _relations("rows")
+    prepared = prepare("σ Cust = $1 and Amount > $2 (Orders)", rels)
+    first = prepared.bind(["C1", 10])
+    second = prepared.bind(["C2", 20])
+    assert isinstance(first.predicate, PCompiled)
+    assert first.predicate is second.predicate
+    assert all(r["Cust"] == "C2" and r["Amount"] > 20 for r in evaluate(second, rels).rows)
+
+
+def test_indexed_conjunct_is_bound_to_a_constant():
+    rels = _relations("rows")
+    build_index(rels["Orders"], "Cust", "hash")
+    prepared = prepare("σ Cust = $1 and Amount > $2 (Orders)", rels)
+    lookup, rest = split_conjuncts(prepared.bind(["C3", 5]).predicate)
+    assert lookup.right.value == "C3"
+    assert isinstance(rest, PCompiled)
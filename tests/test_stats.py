@@ -0,0 +1,25 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from raq import parse_query
+from raq.datatypes import Relation
+from raq.stats import Estimator
+
+
+def _rels():
+    return {"R": Relation("R", ["A", "B"], [{"A": i, "B": i % 4} for i in range(100)], distinct=True)}
+
+
+@pytest.mark.parametrize("op", ["=", "=="])
+def test_both_equality_spellings_estimate_alike(op):
+    est = Estimator(_rels()).estimate(parse_query(f"σ B {op} 2 (R)"))
+    assert est.rows == 25.0
+    assert est.columns["B"].distinct == 1